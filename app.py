@@ -4,6 +4,10 @@ from datetime import datetime
 import os
 from utils.data_manager import DataManager
 from utils.email_sender import EmailSender
+from utils.validacion import (
+    OPCIONES_PERIODICIDAD, OPCIONES_DEPARTAMENTO, OPCIONES_CRITICIDAD, OPCIONES_AUTOMATIZADO,
+    OPCIONES_FORMATO_ENTREGA, email_valido
+)
 
 # Configuración de la página
 st.set_page_config(
@@ -41,7 +45,7 @@ def main():
             
             periodicidad_reporte = st.selectbox(
                 "Periodicidad del Reporte *",
-                ["", "Diario", "Semanal", "Quincenal", "Mensual", "Bimestral", "Trimestral", "Semestral", "Anual", "Ad-hoc"],
+                OPCIONES_PERIODICIDAD,
                 help="Seleccione la frecuencia de generación del reporte"
             )
             
@@ -68,25 +72,25 @@ def main():
             
             periodicidad_auditoria = st.selectbox(
                 "Periodicidad de la Auditoría",
-                ["", "Diario", "Semanal", "Quincenal", "Mensual", "Bimestral", "Trimestral", "Semestral", "Anual", "Ad-hoc"],
+                OPCIONES_PERIODICIDAD,
                 help="Frecuencia con la que se realiza la auditoría"
             )
             
             departamento = st.selectbox(
                 "Departamento *",
-                ["", "Finanzas", "Recursos Humanos", "Operaciones", "IT", "Ventas", "Marketing", "Legal", "Auditoría Interna", "Otro"],
+                OPCIONES_DEPARTAMENTO,
                 help="Departamento al que pertenece el reporte"
             )
             
             criticidad = st.selectbox(
                 "Nivel de Criticidad *",
-                ["", "Alto", "Medio", "Bajo"],
+                OPCIONES_CRITICIDAD,
                 help="Nivel de importancia del reporte para el negocio"
             )
             
             formato_entrega = st.multiselect(
                 "Formato de Entrega",
-                ["Excel", "PDF", "CSV", "Dashboard", "Email", "Portal Web", "Otro"],
+                OPCIONES_FORMATO_ENTREGA,
                 help="Seleccione todos los formatos aplicables"
             )
         
@@ -108,7 +112,7 @@ def main():
         with col4:
             automatizado = st.selectbox(
                 "¿Está Automatizado?",
-                ["", "Sí", "No", "Parcialmente"],
+                OPCIONES_AUTOMATIZADO,
                 help="Indique si el reporte se genera automáticamente"
             )
             
@@ -143,7 +147,7 @@ def main():
                 st.error(f"❌ Por favor complete los siguientes campos obligatorios: {', '.join(campos_faltantes)}")
             else:
                 # Validar formato de email
-                if "@" not in email_responsable or "." not in email_responsable:
+                if not email_valido(email_responsable):
                     st.error("❌ Por favor ingrese un email válido")
                 else:
                     # Preparar datos para guardar
@@ -0,0 +1,159 @@
+"""Benchmark de envío de emails contra el servidor SMTP local.
+
+Mide enviar_confirmacion, enviar_notificacion_admin y enviar_recordatorio_masivo
+(mensajes/seg, latencia p50/p99 y conexiones abiertas) sin red ni relay real.
+
+Uso (desde la raíz del repositorio):
+    python -m benchmarks.benchmark_email --mensajes 200 --latencia-ms 2 --tasa-fallos 0.01
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import time
+from datetime import datetime
+
+from utils.smtp_local import ServidorSMTPLocal
+
+
+def percentil(valores, p):
+    """Percentil p (0-100) por el método del rango más cercano"""
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    indice = max(0, min(len(ordenados) - 1, int(round(p / 100 * len(ordenados) + 0.5)) - 1))
+    return ordenados[indice]
+
+
+def _resumir(nombre, latencias, duracion, exitosos, total, stats):
+    return {
+        'escenario': nombre,
+        'mensajes': total,
+        'exitosos': exitosos,
+        'duracion_s': round(duracion, 4),
+        'mensajes_por_segundo': round(exitosos / duracion, 2) if duracion > 0 else 0.0,
+        'p50_ms': round(percentil(latencias, 50) * 1000, 3),
+        'p99_ms': round(percentil(latencias, 99) * 1000, 3),
+        'conexiones_abiertas': stats['conexiones_abiertas'],
+        'mensajes_rechazados': stats['mensajes_rechazados']
+    }
+
+
+def _medir_individual(servidor, nombre, enviar, total):
+    """Medir un método que envía un mensaje (y abre una conexión) por llamada"""
+    servidor.reiniciar_contadores()
+    latencias = []
+    exitosos = 0
+
+    inicio = time.perf_counter()
+    for i in range(total):
+        t0 = time.perf_counter()
+        if enviar(i):
+            exitosos += 1
+        latencias.append(time.perf_counter() - t0)
+    duracion = time.perf_counter() - inicio
+
+    return _resumir(nombre, latencias, duracion, exitosos, total, servidor.estadisticas())
+
+
+def _medir_masivo(servidor, email_sender, total):
+    """Medir el envío masivo; la latencia por mensaje sale de los tiempos de recepción"""
+    servidor.reiniciar_contadores()
+    emails = [f"usuario{i}@ejemplo.local" for i in range(total)]
+
+    inicio = time.perf_counter()
+    email_sender.enviar_recordatorio_masivo(emails)
+    duracion = time.perf_counter() - inicio
+
+    marcas = [inicio] + list(servidor.tiempos_recepcion)
+    latencias = [b - a for a, b in zip(marcas, marcas[1:])]
+    stats = servidor.estadisticas()
+
+    return _resumir('enviar_recordatorio_masivo', latencias, duracion,
+                    stats['mensajes_aceptados'], total, stats)
+
+
+def ejecutar(mensajes=200, latencia_ms=0.0, tasa_fallos=0.0, semilla=42):
+    """Ejecutar los tres escenarios y devolver los resultados"""
+    with ServidorSMTPLocal(latencia_ms=latencia_ms, tasa_fallos=tasa_fallos, semilla=semilla) as servidor:
+        os.environ.update({
+            'SMTP_SERVER': servidor.host,
+            'SMTP_PORT': str(servidor.puerto),
+            'SMTP_STARTTLS': 'false',
+            'EMAIL_USER': 'benchmark',
+            'EMAIL_PASSWORD': 'benchmark',
+            'EMAIL_FROM': 'benchmark@ejemplo.local',
+            'ADMIN_EMAIL': 'admin@ejemplo.local'
+        })
+
+        # Importar después de configurar el entorno
+        from utils.email_sender import EmailSender
+        email_sender = EmailSender()
+
+        datos_encuesta = {
+            'nombre_reporte': 'Reporte de benchmark',
+            'persona_responsable': 'Usuario Benchmark',
+            'email_responsable': 'usuario@ejemplo.local',
+            'departamento': 'IT',
+            'criticidad': 'Medio',
+            'periodicidad_reporte': 'Mensual',
+            'sistema_origen': 'SAP',
+            'fecha_envio': datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        }
+
+        # EmailSender imprime una línea por envío; se descarta para no distorsionar la medición
+        with contextlib.redirect_stdout(io.StringIO()):
+            resultados = [
+                _medir_individual(
+                    servidor, 'enviar_confirmacion',
+                    lambda i: email_sender.enviar_confirmacion(f"usuario{i}@ejemplo.local", f"Reporte {i}"),
+                    mensajes
+                ),
+                _medir_individual(
+                    servidor, 'enviar_notificacion_admin',
+                    lambda i: email_sender.enviar_notificacion_admin(datos_encuesta),
+                    mensajes
+                ),
+                _medir_masivo(servidor, email_sender, mensajes)
+            ]
+
+    return {
+        'fecha': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'plataforma': platform.platform(),
+        'parametros': {
+            'mensajes': mensajes,
+            'latencia_ms': latencia_ms,
+            'tasa_fallos': tasa_fallos,
+            'semilla': semilla
+        },
+        'resultados': resultados
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de envío de emails")
+    parser.add_argument("--mensajes", type=int, default=200)
+    parser.add_argument("--latencia-ms", type=float, default=0.0)
+    parser.add_argument("--tasa-fallos", type=float, default=0.0)
+    parser.add_argument("--semilla", type=int, default=42)
+    parser.add_argument("--salida", default="benchmarks/resultados/email.json")
+    args = parser.parse_args()
+
+    informe = ejecutar(args.mensajes, args.latencia_ms, args.tasa_fallos, args.semilla)
+
+    print(f"{'Escenario':<28}{'msg/s':>10}{'p50 ms':>10}{'p99 ms':>10}{'conexiones':>12}{'exitosos':>10}")
+    for r in informe['resultados']:
+        print(f"{r['escenario']:<28}{r['mensajes_por_segundo']:>10}{r['p50_ms']:>10}"
+              f"{r['p99_ms']:>10}{r['conexiones_abiertas']:>12}{r['exitosos']:>10}")
+
+    os.makedirs(os.path.dirname(args.salida) or ".", exist_ok=True)
+    with open(args.salida, 'w', encoding='utf-8') as archivo:
+        json.dump(informe, archivo, indent=2, ensure_ascii=False)
+    print(f"Resultados guardados en {args.salida}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""Benchmark de fichas PDF individuales en lote (fichas/seg).
+
+Compara el enfoque anterior (un PDFExporter nuevo por ficha) con
+generar_lote_individual en ZIP (procesos en paralelo) y en un PDF combinado.
+
+Uso (desde la raíz del repositorio):
+    python -m benchmarks.benchmark_fichas --fichas 2000 --workers 4
+"""
+import argparse
+import json
+import os
+import platform
+import tempfile
+import time
+from datetime import datetime
+
+from benchmarks.datos_sinteticos import generar_encuestas
+from utils import pdf_exporter as modulo_pdf
+from utils.pdf_exporter import PDFExporter
+from utils.reportes_lote import generar_lote_individual, _registros_encuestas
+
+
+def _medir_una_a_una(df):
+    """Comportamiento anterior: estilos reconstruidos en cada PDFExporter"""
+    inicio = time.perf_counter()
+    for encuesta_data in _registros_encuestas(df):
+        modulo_pdf._hoja_estilos = None
+        PDFExporter().generar_reporte_individual(encuesta_data)
+    return time.perf_counter() - inicio
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de fichas individuales en lote")
+    parser.add_argument("--fichas", type=int, default=2000)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--salida", default="benchmarks/resultados/fichas.json")
+    args = parser.parse_args()
+
+    df = generar_encuestas(args.fichas)
+    resultados = []
+
+    duracion = _medir_una_a_una(df)
+    resultados.append({'modo': 'una_a_una', 'duracion_s': round(duracion, 3),
+                       'fichas_por_segundo': round(args.fichas / duracion, 2)})
+
+    with tempfile.TemporaryDirectory() as directorio:
+        for formato in ('zip', 'pdf'):
+            resumen = generar_lote_individual(
+                df, os.path.join(directorio, f"fichas.{formato}"), formato=formato, max_workers=args.workers
+            )
+            resultados.append({'modo': f"lote_{formato}", 'duracion_s': resumen['tiempo_total_s'],
+                               'fichas_por_segundo': resumen['fichas_por_segundo'],
+                               'workers': resumen['workers']})
+
+    for r in resultados:
+        print(f"{r['modo']:<12}{r['duracion_s']:>10} s {r['fichas_por_segundo']:>10} fichas/s")
+
+    informe = {
+        'fecha': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'plataforma': platform.platform(),
+        'cpus': os.cpu_count(),
+        'fichas': args.fichas,
+        'resultados': resultados
+    }
+
+    os.makedirs(os.path.dirname(args.salida) or ".", exist_ok=True)
+    with open(args.salida, 'w', encoding='utf-8') as archivo:
+        json.dump(informe, archivo, indent=2, ensure_ascii=False)
+    print(f"Resultados guardados en {args.salida}")
+
+
+if __name__ == "__main__":
+    main()
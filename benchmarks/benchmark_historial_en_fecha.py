@@ -0,0 +1,217 @@
+"""Benchmark de reconstrucción de encuestas a una fecha desde historial_cambios.
+
+Compara obtener_catalogo_en_fecha / obtener_encuesta_en_fecha (ROW_NUMBER sobre
+los cambios posteriores a la fecha) con la reconstrucción manual: cargar todo el
+historial y deshacer los cambios uno a uno desde el estado actual.
+
+Necesita DATABASE_URL; trabaja en un esquema propio (benchmark_historial) que se
+crea y se elimina, sin tocar las tablas de la aplicación.
+
+Uso (desde la raíz del repositorio):
+    python -m benchmarks.benchmark_historial_en_fecha --encuestas 20000 --cambios 200000
+"""
+import argparse
+import json
+import os
+import platform
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+import psycopg2
+from psycopg2.extensions import make_dsn
+from psycopg2.extras import execute_values
+
+from benchmarks.datos_sinteticos import generar_encuestas, DEPARTAMENTOS, CRITICIDADES, AUTOMATIZADO, PERIODICIDADES
+from benchmarks.benchmark_email import percentil
+
+ESQUEMA = "benchmark_historial"
+
+# Campos editados en el historial sintético y los valores que pueden tomar
+VALORES_CAMPOS = {
+    'departamento': DEPARTAMENTOS,
+    'criticidad': CRITICIDADES,
+    'automatizado': AUTOMATIZADO,
+    'periodicidad_reporte': PERIODICIDADES,
+    'observaciones': [f"Observación de seguimiento {i}" for i in range(50)]
+}
+
+
+def _preparar_esquema(database_url, encuestas, cambios, semilla=7):
+    """Crear el esquema de prueba con encuestas e historial sintéticos"""
+    with psycopg2.connect(database_url) as conn:
+        with conn.cursor() as cursor:
+            cursor.execute(f"DROP SCHEMA IF EXISTS {ESQUEMA} CASCADE")
+            cursor.execute(f"CREATE SCHEMA {ESQUEMA}")
+
+    dsn = make_dsn(database_url, options=f"-c search_path={ESQUEMA}")
+    os.environ["DATABASE_URL"] = dsn
+
+    from utils.database import Database
+    db = Database()
+
+    df = generar_encuestas(encuestas, dias=730)
+    # Las encuestas se envían antes de cualquier cambio del historial
+    df['fecha_envio'] = df['fecha_envio'] - pd.Timedelta(days=365)
+    columnas = list(df.columns)
+
+    rng = np.random.default_rng(semilla)
+    campos = rng.choice(list(VALORES_CAMPOS), size=cambios)
+    ids = rng.integers(1, encuestas + 1, size=cambios)
+    segundos = rng.integers(0, 365 * 24 * 3600, size=cambios)
+    fechas = pd.Timestamp(datetime.now().replace(microsecond=0)) - pd.to_timedelta(segundos, unit="s")
+    historial = [
+        (int(i), str(campo), str(rng.choice(VALORES_CAMPOS[campo])), str(rng.choice(VALORES_CAMPOS[campo])),
+         f"usuario{int(i) % 20}", fecha.to_pydatetime())
+        for i, campo, fecha in zip(ids, campos, fechas)
+    ]
+
+    with db.get_connection() as conn:
+        cursor = conn.cursor()
+        execute_values(
+            cursor,
+            f"INSERT INTO encuestas ({', '.join(columnas)}) VALUES %s",
+            [tuple(v.to_pydatetime() if isinstance(v, pd.Timestamp) else (v.item() if hasattr(v, 'item') else v)
+                   for v in fila) for fila in df.itertuples(index=False)],
+            page_size=2000
+        )
+        execute_values(
+            cursor,
+            """INSERT INTO historial_cambios
+               (encuesta_id, campo_modificado, valor_anterior, valor_nuevo, usuario_modificacion, fecha_modificacion)
+               VALUES %s""",
+            historial,
+            page_size=5000
+        )
+        cursor.execute("ANALYZE encuestas")
+        cursor.execute("ANALYZE historial_cambios")
+        cursor.close()
+
+    return db
+
+
+def _reconstruir_reproduciendo(db, fecha):
+    """Reconstrucción manual: todo el historial y los cambios deshechos uno a uno"""
+    with db.get_connection() as conn:
+        actuales = pd.read_sql_query("SELECT * FROM encuestas WHERE fecha_envio <= %s", conn, params=(fecha,))
+        historial = pd.read_sql_query(
+            "SELECT encuesta_id, campo_modificado, valor_anterior, fecha_modificacion, id FROM historial_cambios",
+            conn
+        )
+
+    estado = {fila['id']: fila for fila in actuales.to_dict('records')}
+    posteriores = historial[historial['fecha_modificacion'] > fecha].sort_values(
+        ['fecha_modificacion', 'id'], ascending=False
+    )
+    for cambio in posteriores.itertuples(index=False):
+        if cambio.encuesta_id in estado:
+            estado[cambio.encuesta_id][cambio.campo_modificado] = cambio.valor_anterior or None
+    return pd.DataFrame(list(estado.values()))
+
+
+def _medir(funcion, repeticiones):
+    duraciones = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        resultado = funcion()
+        duraciones.append(time.perf_counter() - inicio)
+    return resultado, duraciones
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de consultas 'a una fecha' sobre el historial")
+    parser.add_argument("--encuestas", type=int, default=20000)
+    parser.add_argument("--cambios", type=int, default=200000)
+    parser.add_argument("--consultas", type=int, default=200, help="consultas de una encuesta a una fecha")
+    parser.add_argument("--repeticiones", type=int, default=5)
+    parser.add_argument("--conservar", action="store_true", help="no eliminar el esquema de prueba al terminar")
+    parser.add_argument("--salida", default="benchmarks/resultados/historial_en_fecha.json")
+    args = parser.parse_args()
+
+    database_url = os.getenv("DATABASE_URL")
+    if not database_url:
+        raise SystemExit("DATABASE_URL no está configurada")
+
+    inicio = time.perf_counter()
+    db = _preparar_esquema(database_url, args.encuestas, args.cambios)
+    print(f"Esquema {ESQUEMA}: {args.encuestas} encuestas, {args.cambios} cambios "
+          f"({time.perf_counter() - inicio:.1f} s)")
+
+    resultados = []
+    try:
+        # Referencia: leer el catálogo actual completo, sin reconstrucción
+        actual, duraciones = _medir(db.obtener_todas_encuestas, args.repeticiones)
+        resultados.append({
+            'consulta': 'catalogo_actual',
+            'encuestas': len(actual),
+            'mediana_ms': round(float(np.median(duraciones)) * 1000, 2)
+        })
+
+        ahora = datetime.now()
+        for dias in (7, 90, 300):
+            fecha = ahora - timedelta(days=dias)
+            catalogo, duraciones = _medir(lambda: db.obtener_catalogo_en_fecha(fecha), args.repeticiones)
+            reproducido, duraciones_replay = _medir(lambda: _reconstruir_reproduciendo(db, fecha), 1)
+
+            columnas = list(VALORES_CAMPOS)
+            a = catalogo.set_index('id')[columnas].sort_index().fillna('')
+            b = reproducido.set_index('id')[columnas].sort_index().fillna('')
+            coincide = a.equals(b)
+
+            resultados.append({
+                'consulta': f"catalogo_hace_{dias}_dias",
+                'encuestas': len(catalogo),
+                'mediana_ms': round(float(np.median(duraciones)) * 1000, 2),
+                'reproduccion_ms': round(duraciones_replay[0] * 1000, 2),
+                'coincide_con_reproduccion': coincide
+            })
+
+        rng = np.random.default_rng(11)
+        latencias = []
+        for _ in range(args.consultas):
+            encuesta_id = int(rng.integers(1, args.encuestas + 1))
+            fecha = ahora - timedelta(seconds=int(rng.integers(0, 365 * 24 * 3600)))
+            t0 = time.perf_counter()
+            db.obtener_encuesta_en_fecha(encuesta_id, fecha)
+            latencias.append(time.perf_counter() - t0)
+
+        resultados.append({
+            'consulta': 'encuesta_en_fecha',
+            'consultas': args.consultas,
+            'p50_ms': round(percentil(latencias, 50) * 1000, 2),
+            'p99_ms': round(percentil(latencias, 99) * 1000, 2)
+        })
+    finally:
+        if not args.conservar:
+            with psycopg2.connect(database_url) as conn:
+                with conn.cursor() as cursor:
+                    cursor.execute(f"DROP SCHEMA IF EXISTS {ESQUEMA} CASCADE")
+
+    for r in resultados:
+        if r['consulta'] == 'catalogo_actual':
+            print(f"{r['consulta']:<26}{r['mediana_ms']:>10} ms   (lectura sin reconstrucción)")
+        elif 'mediana_ms' in r:
+            print(f"{r['consulta']:<26}{r['mediana_ms']:>10} ms   reproducción {r['reproduccion_ms']:>10} ms   "
+                  f"coincide: {r['coincide_con_reproduccion']}")
+        else:
+            print(f"{r['consulta']:<26}p50 {r['p50_ms']} ms   p99 {r['p99_ms']} ms")
+
+    informe = {
+        'fecha': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'plataforma': platform.platform(),
+        'cpus': os.cpu_count(),
+        'encuestas': args.encuestas,
+        'cambios': args.cambios,
+        'resultados': resultados
+    }
+
+    os.makedirs(os.path.dirname(args.salida) or ".", exist_ok=True)
+    with open(args.salida, 'w', encoding='utf-8') as archivo:
+        json.dump(informe, archivo, indent=2, ensure_ascii=False)
+    print(f"Resultados guardados en {args.salida}")
+
+
+if __name__ == "__main__":
+    main()
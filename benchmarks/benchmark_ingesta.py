@@ -0,0 +1,217 @@
+"""Prueba de carga del servicio de ingesta (utils/api_ingesta.py).
+
+Levanta el servicio como subproceso contra un esquema propio (benchmark_ingesta),
+que se crea y se elimina sin tocar las tablas de la aplicación, y lo carga con
+varios clientes concurrentes con conexiones persistentes. Mide peticiones/seg,
+encuestas/seg y latencia p50/p99 de envíos individuales y por lotes.
+
+Necesita DATABASE_URL. Uso (desde la raíz del repositorio):
+    python -m benchmarks.benchmark_ingesta --clientes 16 --peticiones 5000 --lotes 200 --tamano-lote 100
+"""
+import argparse
+import http.client
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+import psycopg2
+from psycopg2.extensions import make_dsn
+
+from benchmarks.datos_sinteticos import generar_encuestas
+from benchmarks.benchmark_email import percentil
+
+ESQUEMA = "benchmark_ingesta"
+TOKEN = "token-benchmark"
+
+
+def _puerto_libre():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _iniciar_servicio(database_url, conexiones):
+    """Crear el esquema de prueba y arrancar el servicio apuntando a él"""
+    with psycopg2.connect(database_url) as conn:
+        with conn.cursor() as cursor:
+            cursor.execute(f"DROP SCHEMA IF EXISTS {ESQUEMA} CASCADE")
+            cursor.execute(f"CREATE SCHEMA {ESQUEMA}")
+
+    puerto = _puerto_libre()
+    entorno = dict(
+        os.environ,
+        DATABASE_URL=make_dsn(database_url, options=f"-c search_path={ESQUEMA}"),
+        PYTHONPATH=os.getcwd()
+    )
+    # Directorio vacío: sin encuestas_reportes.csv, el servicio no migra el CSV del repositorio al esquema
+    proceso = subprocess.Popen(
+        [sys.executable, "-m", "utils.api_ingesta", "--puerto", str(puerto),
+         "--conexiones", str(conexiones), "--token", TOKEN],
+        env=entorno,
+        cwd=tempfile.mkdtemp(prefix="benchmark_ingesta_"),
+        stdout=subprocess.DEVNULL
+    )
+
+    # Esperar a que el servicio responda (la inicialización crea las tablas)
+    limite = time.time() + 60
+    while time.time() < limite:
+        if proceso.poll() is not None:
+            raise SystemExit("El servicio de ingesta terminó al iniciar")
+        try:
+            conexion = http.client.HTTPConnection("127.0.0.1", puerto, timeout=1)
+            conexion.request("GET", "/salud")
+            if conexion.getresponse().status == 200:
+                conexion.close()
+                return proceso, puerto
+        except OSError:
+            time.sleep(0.2)
+    proceso.terminate()
+    raise SystemExit("El servicio de ingesta no respondió a tiempo")
+
+
+def _cargas(total, semilla):
+    """Encuestas sintéticas como diccionarios JSON"""
+    df = generar_encuestas(total, semilla=semilla, dias=30)
+    df['fecha_envio'] = df['fecha_envio'].dt.strftime("%Y-%m-%d %H:%M:%S")
+    return df.fillna("").to_dict('records')
+
+
+def _ejecutar(puerto, ruta, cuerpos, clientes):
+    """Enviar los cuerpos repartidos entre varios clientes; devuelve latencias, errores y duración"""
+    siguiente = iter(range(len(cuerpos)))
+    lock = threading.Lock()
+    latencias = []
+    errores = []
+
+    def cliente():
+        conexion = http.client.HTTPConnection("127.0.0.1", puerto, timeout=30)
+        cabeceras = {"Content-Type": "application/json", "Authorization": f"Bearer {TOKEN}"}
+        propias = []
+        while True:
+            with lock:
+                indice = next(siguiente, None)
+            if indice is None:
+                break
+            inicio = time.perf_counter()
+            try:
+                conexion.request("POST", ruta, body=cuerpos[indice], headers=cabeceras)
+                respuesta = conexion.getresponse()
+                respuesta.read()
+                if respuesta.status >= 300:
+                    with lock:
+                        errores.append(respuesta.status)
+            except (OSError, http.client.HTTPException) as e:
+                with lock:
+                    errores.append(type(e).__name__)
+                conexion.close()
+                conexion = http.client.HTTPConnection("127.0.0.1", puerto, timeout=30)
+            propias.append(time.perf_counter() - inicio)
+        conexion.close()
+        with lock:
+            latencias.extend(propias)
+
+    hilos = [threading.Thread(target=cliente) for _ in range(clientes)]
+    inicio = time.perf_counter()
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    return latencias, errores, time.perf_counter() - inicio
+
+
+def _resumir(escenario, peticiones, encuestas, latencias, errores, duracion):
+    return {
+        'escenario': escenario,
+        'peticiones': peticiones,
+        'encuestas': encuestas,
+        'errores': len(errores),
+        'duracion_s': round(duracion, 3),
+        'peticiones_por_segundo': round(peticiones / duracion, 1),
+        'encuestas_por_segundo': round(encuestas / duracion, 1),
+        'p50_ms': round(percentil(latencias, 50) * 1000, 2),
+        'p99_ms': round(percentil(latencias, 99) * 1000, 2)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prueba de carga del servicio de ingesta")
+    parser.add_argument("--clientes", type=int, default=16, help="clientes concurrentes")
+    parser.add_argument("--conexiones", type=int, default=10, help="tamaño del pool de conexiones del servicio")
+    parser.add_argument("--peticiones", type=int, default=5000, help="envíos individuales")
+    parser.add_argument("--lotes", type=int, default=200, help="envíos por lotes")
+    parser.add_argument("--tamano-lote", type=int, default=100)
+    parser.add_argument("--conservar", action="store_true", help="no eliminar el esquema de prueba al terminar")
+    parser.add_argument("--salida", default="benchmarks/resultados/ingesta.json")
+    args = parser.parse_args()
+
+    database_url = os.getenv("DATABASE_URL")
+    if not database_url:
+        raise SystemExit("DATABASE_URL no está configurada")
+
+    individuales = [json.dumps(c).encode("utf-8") for c in _cargas(args.peticiones, 1)]
+    lotes_encuestas = _cargas(args.lotes * args.tamano_lote, 2)
+    lotes = [
+        json.dumps(lotes_encuestas[i:i + args.tamano_lote]).encode("utf-8")
+        for i in range(0, len(lotes_encuestas), args.tamano_lote)
+    ]
+
+    proceso, puerto = _iniciar_servicio(database_url, args.conexiones)
+    print(f"Servicio en el puerto {puerto} (esquema {ESQUEMA}, pool de {args.conexiones} conexiones, "
+          f"{args.clientes} clientes)")
+
+    resultados = []
+    try:
+        # Calentamiento: abre las conexiones del pool y carga los módulos del servicio
+        _ejecutar(puerto, "/encuestas", individuales[:args.clientes * 2], args.clientes)
+
+        latencias, errores, duracion = _ejecutar(puerto, "/encuestas", individuales, args.clientes)
+        resultados.append(_resumir("individual", len(individuales), len(individuales), latencias, errores, duracion))
+
+        latencias, errores, duracion = _ejecutar(puerto, "/encuestas/lote", lotes, args.clientes)
+        resultados.append(_resumir(f"lote_{args.tamano_lote}", len(lotes), len(lotes_encuestas), latencias, errores, duracion))
+
+        with psycopg2.connect(database_url) as conn:
+            with conn.cursor() as cursor:
+                cursor.execute(f"SELECT COUNT(*) FROM {ESQUEMA}.encuestas")
+                guardadas = cursor.fetchone()[0]
+        esperadas = args.clientes * 2 + len(individuales) + len(lotes_encuestas)
+    finally:
+        proceso.terminate()
+        proceso.wait(timeout=10)
+        if not args.conservar:
+            with psycopg2.connect(database_url) as conn:
+                with conn.cursor() as cursor:
+                    cursor.execute(f"DROP SCHEMA IF EXISTS {ESQUEMA} CASCADE")
+
+    for r in resultados:
+        print(f"{r['escenario']:<12}{r['peticiones_por_segundo']:>10} pet/s {r['encuestas_por_segundo']:>10} enc/s   "
+              f"p50 {r['p50_ms']} ms   p99 {r['p99_ms']} ms   errores {r['errores']}")
+    print(f"Encuestas en la base: {guardadas} de {esperadas} enviadas")
+
+    informe = {
+        'fecha': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'plataforma': platform.platform(),
+        'cpus': os.cpu_count(),
+        'clientes': args.clientes,
+        'conexiones': args.conexiones,
+        'encuestas_guardadas': guardadas,
+        'encuestas_enviadas': esperadas,
+        'resultados': resultados
+    }
+
+    os.makedirs(os.path.dirname(args.salida) or ".", exist_ok=True)
+    with open(args.salida, 'w', encoding='utf-8') as archivo:
+        json.dump(informe, archivo, indent=2, ensure_ascii=False)
+    print(f"Resultados guardados en {args.salida}")
+
+
+if __name__ == "__main__":
+    main()
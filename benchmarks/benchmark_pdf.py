@@ -0,0 +1,81 @@
+"""Benchmark de PDFExporter.generar_reporte_completo con catálogos grandes.
+
+Cada tamaño se ejecuta en un proceso aparte para medir la memoria pico de forma aislada.
+
+Uso (desde la raíz del repositorio):
+    python -m benchmarks.benchmark_pdf --filas 1000 10000 100000
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+from benchmarks.datos_sinteticos import generar_encuestas
+
+
+def _medir(filas, modo_grande):
+    from utils.pdf_exporter import PDFExporter
+
+    df = generar_encuestas(filas)
+    pdf_exporter = PDFExporter()
+
+    inicio = time.perf_counter()
+    if modo_grande:
+        ruta, _ = pdf_exporter.generar_reporte_completo_en_archivo(df)
+        tamano = os.path.getsize(ruta)
+        os.remove(ruta)
+    else:
+        contenido, _ = pdf_exporter.generar_reporte_completo(df, modo_grande=False)
+        tamano = len(contenido)
+    duracion = time.perf_counter() - inicio
+
+    return {
+        'filas': filas,
+        'modo': 'archivo' if modo_grande else 'memoria',
+        'duracion_s': round(duracion, 3),
+        'filas_por_segundo': round(filas / duracion, 1),
+        'tamano_pdf_kb': round(tamano / 1024, 1),
+        # ru_maxrss está en KB en Linux
+        'memoria_pico_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+    }
+
+
+def ejecutar(tamanos, modos=(False, True)):
+    resultados = []
+    for filas in tamanos:
+        for modo_grande in modos:
+            with ProcessPoolExecutor(max_workers=1) as executor:
+                resultado = executor.submit(_medir, filas, modo_grande).result()
+            print(f"{resultado['filas']:>8} filas  {resultado['modo']:<8} {resultado['duracion_s']:>9} s "
+                  f"{resultado['filas_por_segundo']:>10} filas/s {resultado['memoria_pico_mb']:>8} MB", flush=True)
+            resultados.append(resultado)
+    return resultados
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del reporte PDF completo")
+    parser.add_argument("--filas", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--solo-archivo", action="store_true", help="Medir solo la construcción en disco")
+    parser.add_argument("--salida", default="benchmarks/resultados/pdf.json")
+    args = parser.parse_args()
+
+    modos = (True,) if args.solo_archivo else (False, True)
+    informe = {
+        'fecha': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'plataforma': platform.platform(),
+        'resultados': ejecutar(args.filas, modos)
+    }
+
+    os.makedirs(os.path.dirname(args.salida) or ".", exist_ok=True)
+    with open(args.salida, 'w', encoding='utf-8') as archivo:
+        json.dump(informe, archivo, indent=2, ensure_ascii=False)
+    print(f"Resultados guardados en {args.salida}")
+
+
+if __name__ == "__main__":
+    main()
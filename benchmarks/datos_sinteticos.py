@@ -0,0 +1,43 @@
+"""Generación de encuestas sintéticas para los benchmarks."""
+import numpy as np
+import pandas as pd
+from datetime import datetime
+
+PERIODICIDADES = ["Diario", "Semanal", "Quincenal", "Mensual", "Bimestral", "Trimestral", "Semestral", "Anual", "Ad-hoc"]
+DEPARTAMENTOS = ["Finanzas", "Recursos Humanos", "Operaciones", "IT", "Ventas", "Marketing", "Legal", "Auditoría Interna", "Otro"]
+CRITICIDADES = ["Alto", "Medio", "Bajo"]
+AUTOMATIZADO = ["Sí", "No", "Parcialmente"]
+SISTEMAS = ["SAP", "Oracle", "Salesforce", "Power BI", "Excel", "Tableau", "Workday", "Dynamics", "SQL Server", "Qlik"]
+FORMATOS = ["Excel", "PDF", "CSV", "Dashboard", "Email", "Portal Web"]
+
+
+def generar_encuestas(filas, semilla=42, dias=365):
+    """Generar un DataFrame con la estructura de la tabla encuestas"""
+    rng = np.random.default_rng(semilla)
+    indices = np.arange(filas)
+
+    fin = datetime.now().replace(microsecond=0)
+    segundos = rng.integers(0, dias * 24 * 3600, size=filas)
+    fechas = pd.to_datetime(fin) - pd.to_timedelta(segundos, unit="s")
+
+    responsables = rng.integers(0, max(1, filas // 5), size=filas)
+
+    return pd.DataFrame({
+        "id": indices + 1,
+        "fecha_envio": fechas,
+        "nombre_reporte": [f"Reporte de control {i}" for i in indices],
+        "periodicidad_reporte": rng.choice(PERIODICIDADES, size=filas),
+        "sistema_origen": rng.choice(SISTEMAS, size=filas),
+        "persona_responsable": [f"Responsable {r}" for r in responsables],
+        "email_responsable": [f"responsable{r}@ejemplo.local" for r in responsables],
+        "auditoria_utilizacion": "Auditoría de cierre mensual y revisión de controles internos",
+        "periodicidad_auditoria": rng.choice(PERIODICIDADES, size=filas),
+        "departamento": rng.choice(DEPARTAMENTOS, size=filas),
+        "criticidad": rng.choice(CRITICIDADES, size=filas),
+        "formato_entrega": rng.choice(FORMATOS, size=filas),
+        "descripcion_reporte": "Detalle de movimientos y conciliación de saldos del período",
+        "stakeholders": "Gerencia, Contraloría",
+        "automatizado": rng.choice(AUTOMATIZADO, size=filas),
+        "observaciones": ""
+    })
+
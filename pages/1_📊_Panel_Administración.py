@@ -1,9 +1,7 @@
 import streamlit as st
 import pandas as pd
-from datetime import datetime, timedelta
-import io
 from utils.data_manager import DataManager
-from utils.pdf_exporter import PDFExporter
+from utils.exportaciones import GestorExportaciones
 from utils.auth import Auth
 
 # Configuración de la página
@@ -17,6 +15,137 @@ st.set_page_config(
 data_manager = DataManager()
 auth = Auth()
 
+@st.cache_resource
+def obtener_gestor_exportaciones():
+    """Gestor de exportaciones compartido entre sesiones"""
+    return GestorExportaciones()
+
+def mostrar_progreso(etiqueta, tarea):
+    """Barra de progreso si la tarea informa la fracción completada; si no, solo su estado"""
+    if tarea.progreso is None:
+        st.info(f"⏳ {etiqueta}: {tarea.mensaje}")
+    else:
+        st.progress(tarea.progreso, text=f"{etiqueta}: {tarea.mensaje}")
+
+def mostrar_exportaciones(df_filtrado, filtros_aplicados, version_datos):
+    """Área de exportación: cada archivo se genera en segundo plano al solicitarlo.
+    
+    Se ejecuta como fragmento; solo mientras hay una exportación en curso se refresca
+    cada segundo (sin reejecutar la página) para mostrar el progreso.
+    """
+    st.subheader("📤 Exportar Datos")
+    
+    gestor = obtener_gestor_exportaciones()
+    exportaciones = [
+        ('csv', "📄 CSV"),
+        ('excel', "📊 Excel"),
+        ('pdf', "📕 PDF"),
+        ('zip_departamentos', "🗂️ PDFs por Dpto."),
+        ('zip_fichas', "📑 Fichas")
+    ]
+    
+    columnas = st.columns(len(exportaciones) + 1)
+    en_curso = False
+    
+    for (tipo, etiqueta), columna in zip(exportaciones, columnas):
+        with columna:
+            clave = gestor.calcular_clave(tipo, filtros_aplicados, version_datos)
+            tarea = gestor.obtener(clave)
+            
+            if tarea is None:
+                if st.button(f"{etiqueta}: Generar", key=f"generar_{tipo}"):
+                    tarea = gestor.solicitar(clave, tipo, df_filtrado, data_manager, filtros_aplicados, version_datos)
+                    mostrar_progreso(etiqueta, tarea)
+                    en_curso = True
+            elif tarea.en_curso:
+                mostrar_progreso(etiqueta, tarea)
+                en_curso = True
+            elif tarea.error:
+                st.error(f"❌ {etiqueta}: {tarea.error}")
+                if st.button(f"{etiqueta}: Reintentar", key=f"reintentar_{tipo}"):
+                    gestor.solicitar(clave, tipo, df_filtrado, data_manager, filtros_aplicados, version_datos)
+                    en_curso = True
+            else:
+                st.download_button(
+                    label=f"{etiqueta}: Descargar",
+                    data=tarea.contenido,
+                    file_name=tarea.nombre_archivo,
+                    mime=tarea.mime,
+                    key=f"descargar_{tipo}"
+                )
+    
+    with columnas[-1]:
+        if st.button("🗑️ Limpiar Filtros"):
+            st.rerun()
+    
+    stats_cache = data_manager.cache_artefactos.estadisticas()
+    if stats_cache['aciertos'] + stats_cache['fallos'] > 0:
+        st.caption(
+            f"Caché de exportaciones: {stats_cache['tasa_aciertos']*100:.0f}% de aciertos · "
+            f"{stats_cache['bytes_ahorrados']/1024/1024:.1f} MB servidos sin regenerar"
+        )
+    
+    # El intervalo de refresco del fragmento solo cambia en una ejecución completa de la página
+    if en_curso != st.session_state.get('exportacion_en_curso', False):
+        st.session_state['exportacion_en_curso'] = en_curso
+        st.rerun()
+
+def mostrar_detalle_encuesta(encuesta_seleccionada):
+    """Ficha completa de una encuesta"""
+    col_det1, col_det2 = st.columns(2)
+    
+    with col_det1:
+        st.write("**Información General:**")
+        st.write(f"• **Fecha:** {pd.to_datetime(encuesta_seleccionada['fecha_envio']).strftime('%d/%m/%Y %H:%M')}")
+        st.write(f"• **Nombre:** {encuesta_seleccionada['nombre_reporte']}")
+        st.write(f"• **Responsable:** {encuesta_seleccionada['persona_responsable']}")
+        st.write(f"• **Email:** {encuesta_seleccionada['email_responsable']}")
+        st.write(f"• **Departamento:** {encuesta_seleccionada['departamento']}")
+        st.write(f"• **Criticidad:** {encuesta_seleccionada['criticidad']}")
+    
+    with col_det2:
+        st.write("**Detalles Técnicos:**")
+        st.write(f"• **Sistema Origen:** {encuesta_seleccionada['sistema_origen']}")
+        st.write(f"• **Periodicidad:** {encuesta_seleccionada['periodicidad_reporte']}")
+        st.write(f"• **Automatizado:** {encuesta_seleccionada['automatizado']}")
+        if 'formato_entrega' in encuesta_seleccionada and encuesta_seleccionada['formato_entrega']:
+            st.write(f"• **Formatos:** {encuesta_seleccionada['formato_entrega']}")
+    
+    if 'auditoria_utilizacion' in encuesta_seleccionada and encuesta_seleccionada['auditoria_utilizacion']:
+        st.write("**Auditoría:**")
+        st.write(encuesta_seleccionada['auditoria_utilizacion'])
+    
+    if 'descripcion_reporte' in encuesta_seleccionada and encuesta_seleccionada['descripcion_reporte']:
+        st.write("**Descripción:**")
+        st.write(encuesta_seleccionada['descripcion_reporte'])
+    
+    if 'observaciones' in encuesta_seleccionada and encuesta_seleccionada['observaciones']:
+        st.write("**Observaciones:**")
+        st.write(encuesta_seleccionada['observaciones'])
+
+def mostrar_historial_encuesta(encuesta_id):
+    """Historial de cambios de una encuesta (se consulta solo al desplegarlo)"""
+    historial = data_manager.obtener_historial(encuesta_id)
+    
+    if historial.empty:
+        st.info("No hay cambios registrados para esta encuesta")
+        return
+    
+    historial_mostrar = historial[['fecha_modificacion', 'campo_modificado', 'valor_anterior', 'valor_nuevo', 'usuario_modificacion']].copy()
+    historial_mostrar['fecha_modificacion'] = pd.to_datetime(historial_mostrar['fecha_modificacion']).dt.strftime('%d/%m/%Y %H:%M:%S')
+    st.dataframe(
+        historial_mostrar,
+        use_container_width=True,
+        hide_index=True,
+        column_config={
+            "fecha_modificacion": st.column_config.TextColumn("Fecha"),
+            "campo_modificado": st.column_config.TextColumn("Campo"),
+            "valor_anterior": st.column_config.TextColumn("Valor Anterior"),
+            "valor_nuevo": st.column_config.TextColumn("Valor Nuevo"),
+            "usuario_modificacion": st.column_config.TextColumn("Usuario")
+        }
+    )
+
 def main():
     # Verificar autenticación
     if not auth.login():
@@ -44,11 +173,9 @@ def main():
         st.metric("Total Encuestas", len(df))
     
     with col2:
-        # Encuestas de la última semana
-        fecha_semana = datetime.now() - timedelta(days=7)
-        df['fecha_envio'] = pd.to_datetime(df['fecha_envio'])
-        encuestas_semana = len(df[df['fecha_envio'] >= fecha_semana])
-        st.metric("Última Semana", encuestas_semana)
+        # Encuestas de los últimos 7 días frente a los 7 anteriores (rollup diario)
+        semana = data_manager.obtener_comparacion_periodos(7, df)
+        st.metric("Última Semana", semana['actual'], delta=semana['variacion'])
     
     with col3:
         # Departamento más activo
@@ -104,12 +231,8 @@ def main():
         df_filtrado = df_filtrado[df_filtrado['periodicidad_reporte'] == filtro_periodicidad]
     
     if busqueda_texto:
-        mask = (
-            df_filtrado['nombre_reporte'].str.contains(busqueda_texto, case=False, na=False) |
-            df_filtrado['persona_responsable'].str.contains(busqueda_texto, case=False, na=False) |
-            df_filtrado['sistema_origen'].str.contains(busqueda_texto, case=False, na=False)
-        )
-        df_filtrado = df_filtrado[mask]
+        # Búsqueda indexada, sin distinguir mayúsculas ni acentos
+        df_filtrado = data_manager.filtrar_por_texto(df_filtrado, busqueda_texto)
     
     st.write(f"**Mostrando {len(df_filtrado)} de {len(df)} encuestas**")
     
@@ -117,60 +240,16 @@ def main():
         st.warning("No se encontraron resultados con los filtros aplicados.")
         return
     
-    # Botones de exportación
-    st.subheader("📤 Exportar Datos")
-    col_export1, col_export2, col_export3, col_export4 = st.columns(4)
-    
-    with col_export1:
-        # Exportar a CSV
-        csv_data = df_filtrado.to_csv(index=False)
-        st.download_button(
-            label="📄 Descargar CSV",
-            data=csv_data,
-            file_name=f"encuestas_reportes_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
-            mime="text/csv"
-        )
-    
-    with col_export2:
-        # Exportar a Excel
-        excel_buffer = io.BytesIO()
-        with pd.ExcelWriter(excel_buffer, engine='openpyxl') as writer:
-            df_filtrado.to_excel(writer, sheet_name='Encuestas', index=False)
-            
-            # Crear hoja de resumen
-            resumen_data = {
-                'Métrica': ['Total Encuestas', 'Encuestas Críticas', 'Departamentos Únicos', 'Sistemas Únicos'],
-                'Valor': [
-                    len(df_filtrado),
-                    len(df_filtrado[df_filtrado['criticidad'] == 'Alto']) if 'criticidad' in df_filtrado.columns else 0,
-                    df_filtrado['departamento'].nunique() if 'departamento' in df_filtrado.columns else 0,
-                    df_filtrado['sistema_origen'].nunique() if 'sistema_origen' in df_filtrado.columns else 0
-                ]
-            }
-            pd.DataFrame(resumen_data).to_excel(writer, sheet_name='Resumen', index=False)
-        
-        excel_buffer.seek(0)
-        st.download_button(
-            label="📊 Descargar Excel",
-            data=excel_buffer.getvalue(),
-            file_name=f"encuestas_reportes_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx",
-            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-        )
-    
-    with col_export3:
-        # Exportar a PDF
-        pdf_exporter = PDFExporter()
-        pdf_content, pdf_filename = pdf_exporter.generar_reporte_completo(df_filtrado, incluir_estadisticas=True)
-        st.download_button(
-            label="📕 Descargar PDF",
-            data=pdf_content,
-            file_name=pdf_filename,
-            mime="application/pdf"
-        )
-    
-    with col_export4:
-        if st.button("🗑️ Limpiar Filtros"):
-            st.rerun()
+    # Botones de exportación (los artefactos se generan solo cuando se solicitan)
+    filtros_aplicados = {
+        'departamento': filtro_departamento,
+        'criticidad': filtro_criticidad,
+        'periodicidad': filtro_periodicidad,
+        'busqueda': busqueda_texto
+    }
+    version_datos = data_manager.obtener_version_datos()
+    refresco = 1 if st.session_state.get('exportacion_en_curso', False) else None
+    st.fragment(mostrar_exportaciones, run_every=refresco)(df_filtrado.copy(), filtros_aplicados, version_datos)
     
     st.markdown("---")
     
@@ -187,6 +266,7 @@ def main():
     # Filtrar solo las columnas que existen en el DataFrame
     columnas_existentes = [col for col in columnas_mostrar if col in df_filtrado.columns]
     
+    filas_seleccionadas = []
     if columnas_existentes:
         df_mostrar = df_filtrado[columnas_existentes].copy()
         
@@ -194,11 +274,18 @@ def main():
         if 'fecha_envio' in df_mostrar.columns:
             df_mostrar['fecha_envio'] = pd.to_datetime(df_mostrar['fecha_envio']).dt.strftime('%d/%m/%Y %H:%M')
         
-        # Mostrar tabla con configuración personalizada
-        st.dataframe(
+        # La selección guarda la posición de la fila: la clave de la tabla cambia con los filtros
+        # y con los datos, de modo que una selección nunca se aplica a otra lista de encuestas
+        clave_tabla = "tabla_encuestas_" + GestorExportaciones.calcular_clave('tabla', filtros_aplicados, version_datos)[:16]
+        
+        # Mostrar tabla con configuración personalizada (una fila seleccionable para ver el detalle)
+        seleccion_tabla = st.dataframe(
             df_mostrar,
             use_container_width=True,
             hide_index=True,
+            on_select="rerun",
+            selection_mode="single-row",
+            key=clave_tabla,
             column_config={
                 "fecha_envio": st.column_config.TextColumn("Fecha Envío"),
                 "nombre_reporte": st.column_config.TextColumn("Nombre Reporte"),
@@ -210,49 +297,30 @@ def main():
                 "automatizado": st.column_config.TextColumn("Automatizado")
             }
         )
+        filas_seleccionadas = seleccion_tabla.selection.rows
     
     # Detalles de encuesta seleccionada
     st.markdown("---")
     st.subheader("🔍 Detalles de Encuesta")
     
-    if len(df_filtrado) > 0:
-        opciones_detalle = [f"{row['nombre_reporte']} - {row['persona_responsable']}" for _, row in df_filtrado.iterrows()]
-        seleccion_detalle = st.selectbox("Seleccione una encuesta para ver detalles completos:", ["Seleccione una encuesta..."] + opciones_detalle)
+    posicion = filas_seleccionadas[0] if filas_seleccionadas else None
+    if posicion is None or posicion >= len(df_filtrado):
+        st.info("👆 Seleccione una fila de la tabla para ver los detalles completos de la encuesta")
+    elif 'id' in df_filtrado.columns:
+        # Registro completo por clave primaria, solo de la encuesta seleccionada
+        encuesta_id = int(df_filtrado['id'].iloc[posicion])
+        encuesta_seleccionada = data_manager.obtener_encuesta_por_id(encuesta_id)
         
-        if seleccion_detalle != "Seleccione una encuesta...":
-            indice_seleccionado = opciones_detalle.index(seleccion_detalle)
-            encuesta_seleccionada = df_filtrado.iloc[indice_seleccionado]
-            
-            col_det1, col_det2 = st.columns(2)
-            
-            with col_det1:
-                st.write("**Información General:**")
-                st.write(f"• **Fecha:** {pd.to_datetime(encuesta_seleccionada['fecha_envio']).strftime('%d/%m/%Y %H:%M')}")
-                st.write(f"• **Nombre:** {encuesta_seleccionada['nombre_reporte']}")
-                st.write(f"• **Responsable:** {encuesta_seleccionada['persona_responsable']}")
-                st.write(f"• **Email:** {encuesta_seleccionada['email_responsable']}")
-                st.write(f"• **Departamento:** {encuesta_seleccionada['departamento']}")
-                st.write(f"• **Criticidad:** {encuesta_seleccionada['criticidad']}")
-            
-            with col_det2:
-                st.write("**Detalles Técnicos:**")
-                st.write(f"• **Sistema Origen:** {encuesta_seleccionada['sistema_origen']}")
-                st.write(f"• **Periodicidad:** {encuesta_seleccionada['periodicidad_reporte']}")
-                st.write(f"• **Automatizado:** {encuesta_seleccionada['automatizado']}")
-                if 'formato_entrega' in encuesta_seleccionada and encuesta_seleccionada['formato_entrega']:
-                    st.write(f"• **Formatos:** {encuesta_seleccionada['formato_entrega']}")
-            
-            if 'auditoria_utilizacion' in encuesta_seleccionada and encuesta_seleccionada['auditoria_utilizacion']:
-                st.write("**Auditoría:**")
-                st.write(encuesta_seleccionada['auditoria_utilizacion'])
-            
-            if 'descripcion_reporte' in encuesta_seleccionada and encuesta_seleccionada['descripcion_reporte']:
-                st.write("**Descripción:**")
-                st.write(encuesta_seleccionada['descripcion_reporte'])
+        if encuesta_seleccionada is None:
+            st.warning("La encuesta seleccionada ya no existe.")
+        else:
+            mostrar_detalle_encuesta(encuesta_seleccionada)
             
-            if 'observaciones' in encuesta_seleccionada and encuesta_seleccionada['observaciones']:
-                st.write("**Observaciones:**")
-                st.write(encuesta_seleccionada['observaciones'])
+            if st.toggle("📜 Ver historial de cambios", key=f"ver_historial_{encuesta_id}"):
+                mostrar_historial_encuesta(encuesta_id)
+    else:
+        # Modo CSV: sin clave primaria, se usa la fila ya cargada
+        mostrar_detalle_encuesta(df_filtrado.iloc[posicion])
 
     # Gráficos y análisis
     st.markdown("---")
@@ -1,7 +1,13 @@
 import streamlit as st
 import pandas as pd
-from datetime import datetime
+import difflib
+from datetime import datetime, time
 from utils.data_manager import DataManager
+from utils.database import ConflictoEdicion
+from utils.validacion import (
+    OPCIONES_PERIODICIDAD, OPCIONES_DEPARTAMENTO, OPCIONES_CRITICIDAD, OPCIONES_AUTOMATIZADO,
+    OPCIONES_FORMATO_ENTREGA, CAMPOS_OBLIGATORIOS, email_valido
+)
 from utils.auth import Auth
 
 st.set_page_config(
@@ -13,6 +19,406 @@ st.set_page_config(
 data_manager = DataManager()
 auth = Auth()
 
+# Máximo de coincidencias que se muestran en el selector
+LIMITE_RESULTADOS_BUSQUEDA = 20
+
+# Sesiones de edición por página del historial
+SESIONES_HISTORIAL_POR_PAGINA = 5
+
+# Máximo de encuestas cargadas en la edición en tabla
+LIMITE_EDICION_TABLA = 500
+
+# Columnas visibles en la edición en tabla (los textos largos se editan en el formulario)
+COLUMNAS_TABLA = [
+    'nombre_reporte', 'periodicidad_reporte', 'sistema_origen', 'persona_responsable',
+    'email_responsable', 'periodicidad_auditoria', 'departamento', 'criticidad',
+    'automatizado', 'observaciones'
+]
+
+CAMPOS_OBLIGATORIOS_TABLA = {campo: nombre for campo, nombre in CAMPOS_OBLIGATORIOS.items() if campo in COLUMNAS_TABLA}
+
+def diferencias_texto(anterior, nuevo):
+    """Diferencias línea a línea entre dos valores de texto (formato unified diff)"""
+    lineas = difflib.unified_diff(
+        (anterior or "").splitlines(),
+        (nuevo or "").splitlines(),
+        fromfile="Valor anterior",
+        tofile="Valor nuevo",
+        lineterm=""
+    )
+    return "\n".join(lineas)
+
+def mostrar_cambio_completo(cambio_id):
+    """Valores completos y diferencias de un cambio largo (se consultan solo al pedirlos)"""
+    cambio = data_manager.obtener_cambio_historial(cambio_id)
+    if cambio is None:
+        st.warning("El cambio ya no existe en el historial")
+        return
+    
+    anterior = cambio['valor_anterior'] if pd.notna(cambio['valor_anterior']) else ""
+    nuevo = cambio['valor_nuevo'] if pd.notna(cambio['valor_nuevo']) else ""
+    st.code(diferencias_texto(anterior, nuevo) or "(sin diferencias de texto)", language="diff")
+
+def mostrar_historial(encuesta_id):
+    """Historial paginado, una sesión de edición (mismo usuario y fecha) por bloque"""
+    pagina = st.session_state.get(f"historial_pagina_{encuesta_id}", 1)
+    cambios, total_sesiones = data_manager.obtener_sesiones_historial(
+        encuesta_id, SESIONES_HISTORIAL_POR_PAGINA, (pagina - 1) * SESIONES_HISTORIAL_POR_PAGINA
+    )
+    
+    if total_sesiones == 0:
+        st.info("No hay cambios registrados para esta encuesta")
+        return
+    
+    for (fecha, usuario), sesion in cambios.groupby(['fecha_modificacion', 'usuario_modificacion'], sort=False, dropna=False):
+        fecha_str = pd.to_datetime(fecha).strftime('%d/%m/%Y %H:%M:%S')
+        campos = ", ".join(sesion['campo_modificado'])
+        
+        with st.expander(f"🕐 {fecha_str} - {usuario} ({len(sesion)} {'campo' if len(sesion) == 1 else 'campos'}: {campos})"):
+            for cambio in sesion.itertuples(index=False):
+                st.write(f"**{cambio.campo_modificado}**")
+                
+                col_h1, col_h2 = st.columns(2)
+                
+                with col_h1:
+                    st.caption("Valor Anterior")
+                    st.text((cambio.valor_anterior or "(vacío)") + (" …" if cambio.anterior_truncado else ""))
+                
+                with col_h2:
+                    st.caption("Valor Nuevo")
+                    st.text((cambio.valor_nuevo or "(vacío)") + (" …" if cambio.nuevo_truncado else ""))
+                
+                if (cambio.anterior_truncado or cambio.nuevo_truncado) and st.toggle("Ver diferencias completas", key=f"diferencias_{cambio.id}"):
+                    mostrar_cambio_completo(cambio.id)
+            
+            motivos = [motivo for motivo in sesion['motivo_cambio'].dropna().unique() if motivo]
+            if motivos:
+                st.write(f"**Motivo:** {'; '.join(motivos)}")
+    
+    total_paginas = (total_sesiones + SESIONES_HISTORIAL_POR_PAGINA - 1) // SESIONES_HISTORIAL_POR_PAGINA
+    if total_paginas > 1:
+        col_p1, col_p2 = st.columns([1, 3])
+        with col_p1:
+            st.number_input(
+                "Página del historial:",
+                min_value=1,
+                max_value=total_paginas,
+                step=1,
+                key=f"historial_pagina_{encuesta_id}"
+            )
+        with col_p2:
+            st.caption(f"{total_sesiones} sesiones de edición · página {pagina} de {total_paginas}")
+
+def mostrar_encuesta_en_fecha(encuesta, encuesta_id):
+    """Comparar el registro actual con su estado en una fecha, reconstruido desde el historial"""
+    col_f1, col_f2 = st.columns(2)
+    
+    with col_f1:
+        fecha = st.date_input("Fecha:", value=datetime.now().date(), key=f"fecha_consulta_{encuesta_id}")
+    
+    with col_f2:
+        hora = st.time_input("Hora:", value=time(0, 0), key=f"hora_consulta_{encuesta_id}")
+    
+    encuesta_en_fecha = data_manager.obtener_encuesta_en_fecha(encuesta_id, datetime.combine(fecha, hora))
+    
+    if encuesta_en_fecha is None:
+        st.info("La encuesta aún no se había enviado en esa fecha")
+        return
+    
+    campos = [campo for campo in encuesta_en_fecha.index if campo in encuesta.index and campo != 'id']
+    comparacion = pd.DataFrame({
+        'Campo': campos,
+        'Valor en la fecha': [str(encuesta_en_fecha[campo]) if pd.notna(encuesta_en_fecha[campo]) else "" for campo in campos],
+        'Valor actual': [str(encuesta[campo]) if pd.notna(encuesta[campo]) else "" for campo in campos]
+    })
+    comparacion['Cambió'] = comparacion['Valor en la fecha'] != comparacion['Valor actual']
+    
+    st.dataframe(comparacion, use_container_width=True, hide_index=True)
+
+def valor_texto(valor):
+    return str(valor) if valor is not None and pd.notna(valor) else ""
+
+def comparar_tres_versiones(base, mios, actuales):
+    """Filas de la comparación entre lo cargado, lo editado y lo guardado por otro usuario"""
+    filas = []
+    for campo, mio in mios.items():
+        valor_base, valor_mio, valor_actual = valor_texto(base[campo]), valor_texto(mio), valor_texto(actuales[campo])
+        if valor_base == valor_mio == valor_actual:
+            continue
+        if valor_mio == valor_actual:
+            estado = "Mismo valor"
+        elif valor_mio == valor_base:
+            estado = "Cambiado por otro usuario"
+        elif valor_actual == valor_base:
+            estado = "Solo su cambio"
+        else:
+            estado = "⚠️ Ambos cambiaron"
+        filas.append({
+            'Campo': campo,
+            'Al abrir': valor_base,
+            'Su cambio': valor_mio,
+            'Valor actual': valor_actual,
+            'Estado': estado
+        })
+    return filas
+
+def recargar_encuesta(encuesta_id):
+    """Descartar la versión cargada (y el conflicto pendiente) para editar la actual"""
+    st.session_state.pop(f"encuesta_base_{encuesta_id}", None)
+    st.session_state.pop(f"conflicto_{encuesta_id}", None)
+
+def guardar_sobre_version_actual(encuesta_id, usuario):
+    """Aplicar solo los campos que cambió el editor sobre la versión guardada por otro usuario"""
+    base = st.session_state[f"encuesta_base_{encuesta_id}"]
+    conflicto = st.session_state[f"conflicto_{encuesta_id}"]
+    mis_cambios = {
+        campo: valor for campo, valor in conflicto['mios'].items()
+        if valor_texto(base[campo]) != valor_texto(valor)
+    }
+    
+    try:
+        data_manager.actualizar_encuesta(
+            encuesta_id, mis_cambios, usuario=usuario, version_esperada=conflicto['actual']['version']
+        )
+        recargar_encuesta(encuesta_id)
+        st.session_state[f"mensaje_edicion_{encuesta_id}"] = "✅ Sus cambios se guardaron sobre la versión actual"
+    except ConflictoEdicion as e:
+        # Hubo otro cambio mientras se revisaba el conflicto
+        conflicto['actual'] = e.conflictos[encuesta_id]
+    except Exception as e:
+        st.error(f"❌ Error al actualizar la encuesta: {str(e)}")
+
+def mostrar_conflicto(encuesta_id, base, usuario):
+    """Comparación a tres bandas cuando otro usuario guardó la encuesta durante la edición"""
+    conflicto = st.session_state[f"conflicto_{encuesta_id}"]
+    
+    st.error(
+        f"⚠️ Otro usuario guardó esta encuesta mientras usted la editaba (versión {int(base['version'])} → "
+        f"{conflicto['actual']['version']}). Sus cambios no se guardaron."
+    )
+    st.dataframe(
+        pd.DataFrame(comparar_tres_versiones(base, conflicto['mios'], conflicto['actual']['valores'])),
+        use_container_width=True,
+        hide_index=True
+    )
+    
+    col_c1, col_c2 = st.columns(2)
+    
+    with col_c1:
+        st.button(
+            "💾 Guardar mis cambios sobre la versión actual",
+            help="Solo se aplican los campos que usted modificó; el resto conserva el valor actual",
+            on_click=guardar_sobre_version_actual,
+            args=(encuesta_id, usuario),
+            type="primary",
+            use_container_width=True
+        )
+    
+    with col_c2:
+        st.button(
+            "🔄 Descartar mis cambios y recargar",
+            on_click=recargar_encuesta,
+            args=(encuesta_id,),
+            use_container_width=True
+        )
+
+def calcular_cambios(original, editado):
+    """Celdas modificadas en la tabla: {encuesta_id: {campo: valor_nuevo}}"""
+    original = original.set_index('id')
+    editado = editado.set_index('id')
+    cambios = {}
+    
+    for campo in COLUMNAS_TABLA:
+        anterior = original[campo].fillna('').astype(str)
+        nuevo = editado[campo].fillna('').astype(str)
+        for encuesta_id, valor in nuevo[anterior != nuevo].items():
+            cambios.setdefault(int(encuesta_id), {})[campo] = valor
+    
+    return cambios
+
+def validar_cambios(editado, cambios):
+    """Errores de validación de las filas modificadas (mismas reglas que el formulario)"""
+    filas = editado.set_index('id').loc[list(cambios)]
+    errores = []
+    
+    for encuesta_id, fila in filas.iterrows():
+        faltantes = [nombre for campo, nombre in CAMPOS_OBLIGATORIOS_TABLA.items()
+                     if pd.isna(fila[campo]) or str(fila[campo]).strip() == ""]
+        if faltantes:
+            errores.append(f"ID {encuesta_id}: complete {', '.join(faltantes)}")
+        
+        email = str(fila['email_responsable']) if pd.notna(fila['email_responsable']) else ""
+        if email and not email_valido(email):
+            errores.append(f"ID {encuesta_id}: email no válido ({email})")
+    
+    return errores
+
+def descartar_edicion_tabla():
+    """Descartar las celdas editadas sin volver a consultar la tabla"""
+    st.session_state['edicion_tabla_generacion'] = st.session_state.get('edicion_tabla_generacion', 0) + 1
+
+def recargar_edicion_tabla():
+    """Volver a consultar las encuestas descartando las celdas editadas"""
+    st.session_state.pop('edicion_tabla', None)
+    st.session_state.pop('conflicto_tabla', None)
+
+def rebasar_edicion_tabla():
+    """Tomar como base los valores actuales de las encuestas en conflicto, conservando las celdas editadas"""
+    datos = st.session_state['edicion_tabla']['datos']
+    for encuesta_id, actual in st.session_state.pop('conflicto_tabla').items():
+        fila = datos.index[datos['id'] == encuesta_id]
+        for campo, valor in actual['valores'].items():
+            datos.loc[fila, campo] = valor
+        datos.loc[fila, 'version'] = actual['version']
+
+def mostrar_conflicto_tabla(datos, cambios):
+    """Comparación a tres bandas de las encuestas que otro usuario guardó durante la edición"""
+    conflictos = st.session_state['conflicto_tabla']
+    originales = datos.set_index('id')
+    
+    st.error(
+        f"⚠️ Otro usuario guardó {len(conflictos)} de las encuestas editadas mientras usted trabajaba. "
+        "No se guardó ningún cambio."
+    )
+    st.dataframe(
+        pd.DataFrame([
+            {'ID': encuesta_id, **fila}
+            for encuesta_id, actual in conflictos.items()
+            for fila in comparar_tres_versiones(originales.loc[encuesta_id], cambios.get(encuesta_id, {}), actual['valores'])
+        ]),
+        use_container_width=True,
+        hide_index=True
+    )
+    
+    col_c1, col_c2 = st.columns(2)
+    
+    with col_c1:
+        st.button(
+            "🔀 Conservar mis cambios sobre la versión actual",
+            help="Las filas en conflicto toman los valores actuales y se mantienen las celdas que usted editó; revise y vuelva a guardar",
+            on_click=rebasar_edicion_tabla,
+            use_container_width=True
+        )
+    
+    with col_c2:
+        st.button("🔄 Descartar mis cambios y recargar", on_click=recargar_edicion_tabla, use_container_width=True)
+
+def mostrar_edicion_en_tabla():
+    """Edición de varias encuestas a la vez; los cambios se guardan en una sola transacción"""
+    st.subheader("📊 Edición en Tabla")
+    
+    if 'mensaje_edicion_tabla' in st.session_state:
+        st.success(st.session_state.pop('mensaje_edicion_tabla'))
+    
+    col_f1, col_f2 = st.columns([1, 2])
+    
+    with col_f1:
+        departamento = st.selectbox("Departamento:", ["Todos"] + OPCIONES_DEPARTAMENTO[1:], key='tabla_departamento')
+    
+    with col_f2:
+        texto = st.text_input(
+            "Buscar:",
+            placeholder="Nombre del reporte, responsable o sistema",
+            key='tabla_texto'
+        )
+    
+    # Las encuestas cargadas se conservan entre ejecuciones mientras no cambien los filtros
+    filtros = (departamento, texto.strip())
+    sesion = st.session_state.get('edicion_tabla')
+    if sesion is None or sesion['filtros'] != filtros:
+        datos = data_manager.obtener_encuestas_para_edicion(
+            None if departamento == "Todos" else departamento, texto, LIMITE_EDICION_TABLA
+        )
+        sesion = {'filtros': filtros, 'datos': datos}
+        st.session_state['edicion_tabla'] = sesion
+        st.session_state.pop('conflicto_tabla', None)
+        descartar_edicion_tabla()
+    
+    datos = sesion['datos']
+    if datos.empty:
+        st.info("No hay encuestas que coincidan con los filtros")
+        return
+    
+    if len(datos) == LIMITE_EDICION_TABLA:
+        st.caption(f"Se muestran las primeras {LIMITE_EDICION_TABLA} encuestas; refine los filtros para ver otras.")
+    
+    editado = st.data_editor(
+        datos,
+        key=f"editor_tabla_{st.session_state['edicion_tabla_generacion']}",
+        column_order=['id'] + COLUMNAS_TABLA,
+        disabled=['id'],
+        hide_index=True,
+        num_rows="fixed",
+        use_container_width=True,
+        column_config={
+            "id": st.column_config.NumberColumn("ID"),
+            "nombre_reporte": st.column_config.TextColumn("Nombre Reporte"),
+            "periodicidad_reporte": st.column_config.SelectboxColumn("Periodicidad", options=OPCIONES_PERIODICIDAD),
+            "sistema_origen": st.column_config.TextColumn("Sistema Origen"),
+            "persona_responsable": st.column_config.TextColumn("Responsable"),
+            "email_responsable": st.column_config.TextColumn("Email"),
+            "periodicidad_auditoria": st.column_config.SelectboxColumn("Periodicidad Auditoría", options=OPCIONES_PERIODICIDAD),
+            "departamento": st.column_config.SelectboxColumn("Departamento", options=OPCIONES_DEPARTAMENTO),
+            "criticidad": st.column_config.SelectboxColumn("Criticidad", options=OPCIONES_CRITICIDAD),
+            "automatizado": st.column_config.SelectboxColumn("Automatizado", options=OPCIONES_AUTOMATIZADO),
+            "observaciones": st.column_config.TextColumn("Observaciones")
+        }
+    )
+    
+    cambios = calcular_cambios(datos, editado)
+    if not cambios:
+        st.caption("Sin cambios pendientes")
+        return
+    
+    total_celdas = sum(len(campos) for campos in cambios.values())
+    st.write(f"**{total_celdas} celdas modificadas en {len(cambios)} encuestas**")
+    
+    with st.expander("Ver cambios pendientes"):
+        originales = datos.set_index('id')
+        st.dataframe(
+            pd.DataFrame([
+                {'ID': encuesta_id, 'Campo': campo, 'Valor Anterior': originales.at[encuesta_id, campo], 'Valor Nuevo': valor}
+                for encuesta_id, campos in cambios.items() for campo, valor in campos.items()
+            ]),
+            use_container_width=True,
+            hide_index=True
+        )
+    
+    errores = validar_cambios(editado, cambios)
+    for error in errores:
+        st.error(f"❌ {error}")
+    
+    motivo_cambio = st.text_input("Motivo del Cambio (Opcional)", key='tabla_motivo')
+    
+    col_btn1, col_btn2 = st.columns(2)
+    
+    with col_btn1:
+        guardar = st.button("💾 Guardar Cambios", type="primary", disabled=bool(errores), use_container_width=True)
+    
+    with col_btn2:
+        st.button("❌ Descartar Cambios", on_click=descartar_edicion_tabla, use_container_width=True)
+    
+    if guardar:
+        # Versión cargada de cada encuesta editada; si otra persona la guardó después, hay conflicto
+        versiones = datos.set_index('id').loc[list(cambios), 'version'].to_dict()
+        try:
+            resultado = data_manager.actualizar_encuestas_lote(
+                cambios, usuario=st.session_state.get('username', 'Sistema'), motivo=motivo_cambio, versiones=versiones
+            )
+            st.session_state['mensaje_edicion_tabla'] = (
+                f"✅ {resultado['encuestas']} encuestas actualizadas ({resultado['campos']} campos registrados en el historial)"
+            )
+            # Recargar las encuestas con los valores guardados
+            recargar_edicion_tabla()
+            st.rerun()
+        except ConflictoEdicion as e:
+            st.session_state['conflicto_tabla'] = e.conflictos
+        except Exception as e:
+            st.error(f"❌ Error al guardar los cambios: {str(e)}")
+    
+    if 'conflicto_tabla' in st.session_state:
+        mostrar_conflicto_tabla(datos, cambios)
+
 def main():
     # Verificar autenticación
     if not auth.login():
@@ -28,47 +434,95 @@ def main():
         st.info("Por favor contacte al administrador para habilitar PostgreSQL.")
         return
     
-    # Cargar todas las encuestas
-    df = data_manager.cargar_datos()
+    modo = st.radio("Modo de edición:", ["📝 Una encuesta", "📊 Edición en tabla"], horizontal=True, key='modo_edicion')
     
-    if df.empty:
-        st.warning("📭 No hay encuestas registradas para editar.")
+    if modo == "📊 Edición en tabla":
+        mostrar_edicion_en_tabla()
         return
     
     # Selector de encuesta
     st.subheader("📋 Seleccionar Encuesta para Editar")
     
-    # Crear opciones de selección
-    opciones = []
-    for _, row in df.iterrows():
-        opcion = f"ID: {row['id']} | {row['nombre_reporte']} - {row['persona_responsable']}"
-        opciones.append(opcion)
+    col_busqueda, col_id = st.columns([3, 1])
     
-    seleccion = st.selectbox(
-        "Encuesta:",
-        ["Seleccione una encuesta..."] + opciones,
-        help="Seleccione la encuesta que desea editar"
-    )
+    with col_busqueda:
+        texto_busqueda = st.text_input(
+            "Buscar encuesta:",
+            placeholder="Nombre del reporte, responsable o ID",
+            help="Escriba parte del nombre del reporte o del responsable y presione Enter"
+        )
     
-    if seleccion == "Seleccione una encuesta...":
-        st.info("👆 Seleccione una encuesta de la lista para comenzar a editarla")
-        return
+    with col_id:
+        id_directo = st.number_input(
+            "Abrir por ID:",
+            min_value=1,
+            step=1,
+            value=None,
+            help="Abra directamente una encuesta conociendo su ID"
+        )
     
-    # Extraer ID de la selección
-    encuesta_id = int(seleccion.split("|")[0].replace("ID:", "").strip())
+    if id_directo:
+        encuesta_id = int(id_directo)
+    else:
+        # Solo se consultan las primeras coincidencias, no el catálogo completo
+        resultados = data_manager.buscar_encuestas_resumen(texto_busqueda, LIMITE_RESULTADOS_BUSQUEDA)
+        
+        if resultados.empty:
+            if texto_busqueda:
+                st.warning(f"🔍 No se encontraron encuestas para \"{texto_busqueda}\"")
+            else:
+                st.warning("📭 No hay encuestas registradas para editar.")
+            return
+        
+        etiquetas = {
+            int(row.id): f"ID: {row.id} | {row.nombre_reporte} - {row.persona_responsable}"
+            for row in resultados.itertuples(index=False)
+        }
+        
+        encuesta_id = st.selectbox(
+            "Encuesta:",
+            [None] + list(etiquetas),
+            format_func=lambda id_encuesta: "Seleccione una encuesta..." if id_encuesta is None else etiquetas[id_encuesta],
+            help="Seleccione la encuesta que desea editar"
+        )
+        
+        if len(resultados) == LIMITE_RESULTADOS_BUSQUEDA:
+            st.caption(f"Mostrando las primeras {LIMITE_RESULTADOS_BUSQUEDA} coincidencias; refine la búsqueda para ver otras.")
+        
+        if encuesta_id is None:
+            st.info("👆 Busque y seleccione una encuesta de la lista para comenzar a editarla")
+            return
     
     # Cargar datos de la encuesta
-    encuesta = data_manager.obtener_encuesta_por_id(encuesta_id)
+    encuesta_actual = data_manager.obtener_encuesta_por_id(encuesta_id)
     
-    if encuesta is None:
-        st.error("Error al cargar la encuesta seleccionada")
+    if encuesta_actual is None:
+        recargar_encuesta(encuesta_id)
+        st.error(f"❌ No existe una encuesta con ID {encuesta_id}")
         return
     
+    # El formulario edita la versión cargada al abrir la encuesta hasta guardar o recargar
+    clave_base = f"encuesta_base_{encuesta_id}"
+    if clave_base not in st.session_state:
+        st.session_state[clave_base] = encuesta_actual
+    encuesta = st.session_state[clave_base]
+    clave_conflicto = f"conflicto_{encuesta_id}"
+    
     st.markdown("---")
     st.subheader("📝 Editar Información")
     
-    # Formulario de edición
-    with st.form("editar_encuesta"):
+    if f"mensaje_edicion_{encuesta_id}" in st.session_state:
+        st.success(st.session_state.pop(f"mensaje_edicion_{encuesta_id}"))
+    
+    if int(encuesta_actual['version']) != int(encuesta['version']) and clave_conflicto not in st.session_state:
+        col_aviso, col_recargar = st.columns([3, 1])
+        with col_aviso:
+            st.warning("⚠️ Otro usuario modificó esta encuesta después de que usted la abrió.")
+        with col_recargar:
+            st.button("🔄 Recargar", on_click=recargar_encuesta, args=(encuesta_id,), use_container_width=True)
+    
+    # Formulario de edición (la versión forma parte de la clave para reiniciar los campos al recargar)
+    with st.form(f"editar_encuesta_{encuesta_id}_{int(encuesta['version'])}"):
         col1, col2 = st.columns(2)
         
         with col1:
@@ -79,10 +533,10 @@ def main():
             
             periodicidad_reporte = st.selectbox(
                 "Periodicidad del Reporte *",
-                ["", "Diario", "Semanal", "Quincenal", "Mensual", "Bimestral", "Trimestral", "Semestral", "Anual", "Ad-hoc"],
-                index=["", "Diario", "Semanal", "Quincenal", "Mensual", "Bimestral", "Trimestral", "Semestral", "Anual", "Ad-hoc"].index(
+                OPCIONES_PERIODICIDAD,
+                index=OPCIONES_PERIODICIDAD.index(
                     str(encuesta['periodicidad_reporte']) if pd.notna(encuesta['periodicidad_reporte']) else ""
-                ) if pd.notna(encuesta['periodicidad_reporte']) and str(encuesta['periodicidad_reporte']) in ["", "Diario", "Semanal", "Quincenal", "Mensual", "Bimestral", "Trimestral", "Semestral", "Anual", "Ad-hoc"] else 0
+                ) if pd.notna(encuesta['periodicidad_reporte']) and str(encuesta['periodicidad_reporte']) in OPCIONES_PERIODICIDAD else 0
             )
             
             sistema_origen = st.text_input(
@@ -108,26 +562,26 @@ def main():
             
             periodicidad_auditoria = st.selectbox(
                 "Periodicidad de la Auditoría",
-                ["", "Diario", "Semanal", "Quincenal", "Mensual", "Bimestral", "Trimestral", "Semestral", "Anual", "Ad-hoc"],
-                index=["", "Diario", "Semanal", "Quincenal", "Mensual", "Bimestral", "Trimestral", "Semestral", "Anual", "Ad-hoc"].index(
+                OPCIONES_PERIODICIDAD,
+                index=OPCIONES_PERIODICIDAD.index(
                     str(encuesta['periodicidad_auditoria']) if pd.notna(encuesta['periodicidad_auditoria']) else ""
-                ) if pd.notna(encuesta['periodicidad_auditoria']) and str(encuesta['periodicidad_auditoria']) in ["", "Diario", "Semanal", "Quincenal", "Mensual", "Bimestral", "Trimestral", "Semestral", "Anual", "Ad-hoc"] else 0
+                ) if pd.notna(encuesta['periodicidad_auditoria']) and str(encuesta['periodicidad_auditoria']) in OPCIONES_PERIODICIDAD else 0
             )
             
             departamento = st.selectbox(
                 "Departamento *",
-                ["", "Finanzas", "Recursos Humanos", "Operaciones", "IT", "Ventas", "Marketing", "Legal", "Auditoría Interna", "Otro"],
-                index=["", "Finanzas", "Recursos Humanos", "Operaciones", "IT", "Ventas", "Marketing", "Legal", "Auditoría Interna", "Otro"].index(
+                OPCIONES_DEPARTAMENTO,
+                index=OPCIONES_DEPARTAMENTO.index(
                     str(encuesta['departamento']) if pd.notna(encuesta['departamento']) else ""
-                ) if pd.notna(encuesta['departamento']) and str(encuesta['departamento']) in ["", "Finanzas", "Recursos Humanos", "Operaciones", "IT", "Ventas", "Marketing", "Legal", "Auditoría Interna", "Otro"] else 0
+                ) if pd.notna(encuesta['departamento']) and str(encuesta['departamento']) in OPCIONES_DEPARTAMENTO else 0
             )
             
             criticidad = st.selectbox(
                 "Nivel de Criticidad *",
-                ["", "Alto", "Medio", "Bajo"],
-                index=["", "Alto", "Medio", "Bajo"].index(
+                OPCIONES_CRITICIDAD,
+                index=OPCIONES_CRITICIDAD.index(
                     str(encuesta['criticidad']) if pd.notna(encuesta['criticidad']) else ""
-                ) if pd.notna(encuesta['criticidad']) and str(encuesta['criticidad']) in ["", "Alto", "Medio", "Bajo"] else 0
+                ) if pd.notna(encuesta['criticidad']) and str(encuesta['criticidad']) in OPCIONES_CRITICIDAD else 0
             )
             
             # Parsear formato_entrega desde string
@@ -137,7 +591,7 @@ def main():
             
             formato_entrega = st.multiselect(
                 "Formato de Entrega",
-                ["Excel", "PDF", "CSV", "Dashboard", "Email", "Portal Web", "Otro"],
+                OPCIONES_FORMATO_ENTREGA,
                 default=formatos_actuales
             )
         
@@ -159,10 +613,10 @@ def main():
         with col4:
             automatizado = st.selectbox(
                 "¿Está Automatizado?",
-                ["", "Sí", "No", "Parcialmente"],
-                index=["", "Sí", "No", "Parcialmente"].index(
+                OPCIONES_AUTOMATIZADO,
+                index=OPCIONES_AUTOMATIZADO.index(
                     str(encuesta['automatizado']) if pd.notna(encuesta['automatizado']) else ""
-                ) if pd.notna(encuesta['automatizado']) and str(encuesta['automatizado']) in ["", "Sí", "No", "Parcialmente"] else 0
+                ) if pd.notna(encuesta['automatizado']) and str(encuesta['automatizado']) in OPCIONES_AUTOMATIZADO else 0
             )
             
             observaciones = st.text_area(
@@ -216,7 +670,7 @@ def main():
                 st.error(f"❌ Por favor complete los siguientes campos obligatorios: {', '.join(campos_faltantes)}")
             else:
                 # Validar email
-                if "@" not in email_responsable or "." not in email_responsable:
+                if not email_valido(email_responsable):
                     st.error("❌ Por favor ingrese un email válido")
                 else:
                     # Preparar datos actualizados
@@ -241,8 +695,10 @@ def main():
                         data_manager.actualizar_encuesta(
                             encuesta_id, 
                             datos_actualizados, 
-                            usuario=persona_responsable
+                            usuario=persona_responsable,
+                            version_esperada=int(encuesta['version'])
                         )
+                        st.session_state.pop(clave_base, None)
                         st.success("✅ ¡Encuesta actualizada exitosamente!")
                         st.balloons()
                         
@@ -255,37 +711,25 @@ def main():
                         if motivo_cambio:
                             st.write(f"**Motivo:** {motivo_cambio}")
                         
+                    except ConflictoEdicion as e:
+                        st.session_state[clave_conflicto] = {
+                            'mios': datos_actualizados,
+                            'actual': e.conflictos[encuesta_id]
+                        }
                     except Exception as e:
                         st.error(f"❌ Error al actualizar la encuesta: {str(e)}")
     
+    if clave_conflicto in st.session_state:
+        mostrar_conflicto(encuesta_id, encuesta, persona_responsable)
+    
     # Mostrar historial de cambios
     st.markdown("---")
     st.subheader("📜 Historial de Cambios")
     
-    historial = data_manager.obtener_historial(encuesta_id)
+    mostrar_historial(encuesta_id)
     
-    if historial.empty:
-        st.info("No hay cambios registrados para esta encuesta")
-    else:
-        # Mostrar en formato expandible
-        for _, cambio in historial.iterrows():
-            fecha_str = pd.to_datetime(cambio['fecha_modificacion']).strftime('%d/%m/%Y %H:%M:%S')
-            
-            with st.expander(f"🕐 {fecha_str} - {cambio['campo_modificado']}"):
-                col_h1, col_h2 = st.columns(2)
-                
-                with col_h1:
-                    st.write("**Valor Anterior:**")
-                    st.text(cambio['valor_anterior'] if pd.notna(cambio['valor_anterior']) else "(vacío)")
-                
-                with col_h2:
-                    st.write("**Valor Nuevo:**")
-                    st.text(cambio['valor_nuevo'] if pd.notna(cambio['valor_nuevo']) else "(vacío)")
-                
-                st.write(f"**Usuario:** {cambio['usuario_modificacion']}")
-                
-                if pd.notna(cambio['motivo_cambio']) and cambio['motivo_cambio']:
-                    st.write(f"**Motivo:** {cambio['motivo_cambio']}")
+    if st.toggle("🕰️ Ver la encuesta en una fecha anterior", key=f"en_fecha_{encuesta_id}"):
+        mostrar_encuesta_en_fecha(encuesta_actual, encuesta_id)
 
 if __name__ == "__main__":
     main()
@@ -5,6 +5,9 @@ import plotly.graph_objects as go
 from datetime import datetime, timedelta
 from utils.data_manager import DataManager
 from utils.auth import Auth
+from utils.agregaciones import ORDEN_CRITICIDAD
+from utils.cache_figuras import obtener_cache_figuras
+from utils.insights import obtener_insights
 
 st.set_page_config(
     page_title="Dashboard y Estadísticas",
@@ -15,12 +18,15 @@ st.set_page_config(
 data_manager = DataManager()
 auth = Auth()
 
-def crear_grafico_periodicidad(df):
+# Reportes por página en el ranking de automatización
+TAMANO_PAGINA_PRIORIDAD = 10
+
+def crear_grafico_periodicidad(agregados):
     """Crear gráfico de periodicidad de reportes"""
-    if 'periodicidad_reporte' not in df.columns or df.empty:
+    if agregados.conteo('periodicidad_reporte').empty:
         return None
     
-    periodicidad_counts = df['periodicidad_reporte'].value_counts().reset_index()
+    periodicidad_counts = agregados.conteo('periodicidad_reporte').reset_index()
     periodicidad_counts.columns = ['Periodicidad', 'Cantidad']
     
     fig = px.bar(
@@ -40,12 +46,12 @@ def crear_grafico_periodicidad(df):
     
     return fig
 
-def crear_grafico_departamentos(df):
+def crear_grafico_departamentos(agregados):
     """Crear gráfico circular de departamentos"""
-    if 'departamento' not in df.columns or df.empty:
+    if agregados.conteo('departamento').empty:
         return None
     
-    dept_counts = df['departamento'].value_counts().reset_index()
+    dept_counts = agregados.conteo('departamento').reset_index()
     dept_counts.columns = ['Departamento', 'Cantidad']
     
     fig = px.pie(
@@ -60,18 +66,14 @@ def crear_grafico_departamentos(df):
     
     return fig
 
-def crear_grafico_criticidad(df):
+def crear_grafico_criticidad(agregados):
     """Crear gráfico de criticidad"""
-    if 'criticidad' not in df.columns or df.empty:
+    if agregados.conteo('criticidad').empty:
         return None
     
-    criticidad_counts = df['criticidad'].value_counts().reset_index()
-    criticidad_counts.columns = ['Criticidad', 'Cantidad']
-    
     # Ordenar por nivel de criticidad
-    orden_criticidad = {'Alto': 0, 'Medio': 1, 'Bajo': 2}
-    criticidad_counts['orden'] = criticidad_counts['Criticidad'].map(orden_criticidad)
-    criticidad_counts = criticidad_counts.sort_values('orden')
+    criticidad_counts = agregados.conteo('criticidad', ORDEN_CRITICIDAD).reset_index()
+    criticidad_counts.columns = ['Criticidad', 'Cantidad']
     
     colores = {'Alto': '#dc3545', 'Medio': '#ffc107', 'Bajo': '#28a745'}
     criticidad_counts['color'] = criticidad_counts['Criticidad'].map(colores)
@@ -95,12 +97,12 @@ def crear_grafico_criticidad(df):
     
     return fig
 
-def crear_grafico_sistemas(df):
+def crear_grafico_sistemas(agregados):
     """Crear gráfico de sistemas más utilizados"""
-    if 'sistema_origen' not in df.columns or df.empty:
+    if agregados.conteo('sistema_origen').empty:
         return None
     
-    sistemas_counts = df['sistema_origen'].value_counts().head(10).reset_index()
+    sistemas_counts = agregados.conteo('sistema_origen').head(10).reset_index()
     sistemas_counts.columns = ['Sistema', 'Cantidad']
     
     fig = px.bar(
@@ -121,12 +123,12 @@ def crear_grafico_sistemas(df):
     
     return fig
 
-def crear_grafico_automatizacion(df):
+def crear_grafico_automatizacion(agregados):
     """Crear gráfico de automatización"""
-    if 'automatizado' not in df.columns or df.empty:
+    if agregados.conteo('automatizado').empty:
         return None
     
-    auto_counts = df['automatizado'].value_counts().reset_index()
+    auto_counts = agregados.conteo('automatizado').reset_index()
     auto_counts.columns = ['Estado', 'Cantidad']
     
     fig = px.pie(
@@ -139,33 +141,61 @@ def crear_grafico_automatizacion(df):
     
     return fig
 
-def crear_grafico_tendencia_temporal(df):
-    """Crear gráfico de tendencia temporal"""
-    if 'fecha_envio' not in df.columns or df.empty:
+def crear_grafico_tendencia_temporal(serie, granularidad, desglose=None):
+    """Crear gráfico de tendencia temporal a partir de la serie ya agrupada por periodo"""
+    if serie.empty:
         return None
     
-    df_temp = df.copy()
-    df_temp['fecha_envio'] = pd.to_datetime(df_temp['fecha_envio'])
-    df_temp['fecha'] = df_temp['fecha_envio'].dt.date
-    
-    tendencia = df_temp.groupby('fecha').size().reset_index(name='cantidad')
+    nombres_granularidad = {'dia': 'día', 'semana': 'semana', 'mes': 'mes', 'trimestre': 'trimestre'}
     
     fig = px.line(
-        tendencia,
-        x='fecha',
+        serie,
+        x='periodo',
         y='cantidad',
-        title='Tendencia de Encuestas Recibidas',
-        markers=True
+        color=desglose,
+        title=f'Tendencia de Encuestas Recibidas (por {nombres_granularidad[granularidad]})',
+        markers=len(serie) <= 60
     )
     
     fig.update_layout(
         xaxis_title="Fecha",
         yaxis_title="Número de Encuestas",
-        showlegend=False
+        showlegend=desglose is not None
     )
     
     return fig
 
+def mostrar_pesos_prioridad():
+    """Editor de los pesos de periodicidad y criticidad usados en el ranking"""
+    with st.expander("⚖️ Pesos de priorización"):
+        pesos_periodicidad, pesos_criticidad = data_manager.obtener_pesos_prioridad()
+        
+        col_p1, col_p2 = st.columns(2)
+        with col_p1:
+            tabla_periodicidad = st.data_editor(
+                pd.DataFrame({'Periodicidad': list(pesos_periodicidad), 'Peso': list(pesos_periodicidad.values())}),
+                hide_index=True, disabled=['Periodicidad'], key="pesos_periodicidad"
+            )
+        with col_p2:
+            tabla_criticidad = st.data_editor(
+                pd.DataFrame({'Criticidad': list(pesos_criticidad), 'Peso': list(pesos_criticidad.values())}),
+                hide_index=True, disabled=['Criticidad'], key="pesos_criticidad"
+            )
+        
+        if data_manager.usar_database:
+            if st.button("💾 Guardar Pesos"):
+                try:
+                    data_manager.guardar_pesos_prioridad(
+                        dict(zip(tabla_periodicidad['Periodicidad'], tabla_periodicidad['Peso'])),
+                        dict(zip(tabla_criticidad['Criticidad'], tabla_criticidad['Peso']))
+                    )
+                    st.success("✅ Pesos guardados. El ranking se recalculó.")
+                    st.rerun()
+                except Exception as e:
+                    st.error(f"❌ Error al guardar los pesos: {str(e)}")
+        else:
+            st.caption("La configuración de pesos requiere PostgreSQL.")
+
 def main():
     # Verificar autenticación
     if not auth.login():
@@ -185,58 +215,79 @@ def main():
         st.info("Complete algunas encuestas para ver el dashboard con estadísticas detalladas.")
         return
     
+    # Todos los conteos de la página en una sola pasada (o una sola consulta)
+    agregados = data_manager.obtener_agregados(df)
+    total_encuestas = agregados.total or len(df)
+    
     # Métricas principales
     st.subheader("🎯 Métricas Principales")
     
     col1, col2, col3, col4, col5 = st.columns(5)
     
     with col1:
-        total_encuestas = len(df)
         st.metric("Total Reportes", total_encuestas)
     
     with col2:
-        if 'departamento' in df.columns:
-            dept_unicos = df['departamento'].nunique()
+        if agregados.tiene('departamento'):
+            dept_unicos = agregados.unicos('departamento')
             st.metric("Departamentos", dept_unicos)
         else:
             st.metric("Departamentos", "N/A")
     
     with col3:
-        if 'sistema_origen' in df.columns:
-            sistemas_unicos = df['sistema_origen'].nunique()
+        if agregados.tiene('sistema_origen'):
+            sistemas_unicos = agregados.unicos('sistema_origen')
             st.metric("Sistemas", sistemas_unicos)
         else:
             st.metric("Sistemas", "N/A")
     
     with col4:
-        if 'criticidad' in df.columns:
-            criticos = len(df[df['criticidad'] == 'Alto'])
+        if agregados.tiene('criticidad'):
+            criticos = agregados.cantidad('criticidad', 'Alto')
             st.metric("Críticos", criticos, delta=f"{(criticos/total_encuestas*100):.1f}%")
         else:
             st.metric("Críticos", "N/A")
     
     with col5:
-        if 'automatizado' in df.columns:
-            automatizados = len(df[df['automatizado'] == 'Sí'])
+        if agregados.tiene('automatizado'):
+            automatizados = agregados.cantidad('automatizado', 'Sí')
             st.metric("Automatizados", automatizados, delta=f"{(automatizados/total_encuestas*100):.1f}%")
         else:
             st.metric("Automatizados", "N/A")
     
+    # Actividad reciente frente al periodo anterior (rollup diario)
+    st.subheader("📅 Actividad Reciente")
+    
+    col_p1, col_p2 = st.columns(2)
+    
+    for columna, dias, etiqueta in [(col_p1, 7, "Últimos 7 días"), (col_p2, 30, "Últimos 30 días")]:
+        with columna:
+            comparacion = data_manager.obtener_comparacion_periodos(dias, df)
+            delta = f"{comparacion['variacion']:+d} vs. {dias} días anteriores"
+            if comparacion['variacion_pct'] is not None:
+                delta += f" ({comparacion['variacion_pct']:+.1f}%)"
+            st.metric(etiqueta, comparacion['actual'], delta=delta)
+    
     st.markdown("---")
     
-    # Gráficos principales
+    # Gráficos principales (se reutilizan mientras no cambien sus datos agregados)
     st.subheader("📊 Análisis Visual")
+    cache_figuras = obtener_cache_figuras()
     
     # Primera fila de gráficos
     col_g1, col_g2 = st.columns(2)
     
     with col_g1:
-        fig_periodicidad = crear_grafico_periodicidad(df)
+        fig_periodicidad = cache_figuras.obtener_o_construir(
+            'periodicidad', agregados.conteo('periodicidad_reporte'), lambda: crear_grafico_periodicidad(agregados)
+        )
         if fig_periodicidad:
             st.plotly_chart(fig_periodicidad, use_container_width=True)
     
     with col_g2:
-        fig_departamentos = crear_grafico_departamentos(df)
+        fig_departamentos = cache_figuras.obtener_o_construir(
+            'departamentos', agregados.conteo('departamento'), lambda: crear_grafico_departamentos(agregados)
+        )
         if fig_departamentos:
             st.plotly_chart(fig_departamentos, use_container_width=True)
     
@@ -244,12 +295,16 @@ def main():
     col_g3, col_g4 = st.columns(2)
     
     with col_g3:
-        fig_criticidad = crear_grafico_criticidad(df)
+        fig_criticidad = cache_figuras.obtener_o_construir(
+            'criticidad', agregados.conteo('criticidad'), lambda: crear_grafico_criticidad(agregados)
+        )
         if fig_criticidad:
             st.plotly_chart(fig_criticidad, use_container_width=True)
     
     with col_g4:
-        fig_auto = crear_grafico_automatizacion(df)
+        fig_auto = cache_figuras.obtener_o_construir(
+            'automatizacion', agregados.conteo('automatizado'), lambda: crear_grafico_automatizacion(agregados)
+        )
         if fig_auto:
             st.plotly_chart(fig_auto, use_container_width=True)
     
@@ -259,12 +314,28 @@ def main():
     col_g5, col_g6 = st.columns(2)
     
     with col_g5:
-        fig_sistemas = crear_grafico_sistemas(df)
+        fig_sistemas = cache_figuras.obtener_o_construir(
+            'sistemas', agregados.conteo('sistema_origen').head(10), lambda: crear_grafico_sistemas(agregados)
+        )
         if fig_sistemas:
             st.plotly_chart(fig_sistemas, use_container_width=True)
     
     with col_g6:
-        fig_tendencia = crear_grafico_tendencia_temporal(df)
+        col_t1, col_t2 = st.columns(2)
+        with col_t1:
+            opciones_granularidad = {'Automática': 'auto', 'Día': 'dia', 'Semana': 'semana', 'Mes': 'mes', 'Trimestre': 'trimestre'}
+            granularidad_sel = st.selectbox("Agrupar por:", list(opciones_granularidad.keys()))
+        with col_t2:
+            opciones_desglose = {'Sin desglose': None, 'Departamento': 'departamento', 'Criticidad': 'criticidad'}
+            desglose_sel = st.selectbox("Desglose:", list(opciones_desglose.keys()))
+        
+        serie, granularidad = data_manager.obtener_serie_temporal(
+            opciones_granularidad[granularidad_sel], opciones_desglose[desglose_sel], df
+        )
+        fig_tendencia = cache_figuras.obtener_o_construir(
+            'tendencia', serie, lambda: crear_grafico_tendencia_temporal(serie, granularidad, opciones_desglose[desglose_sel]),
+            granularidad=granularidad, desglose=opciones_desglose[desglose_sel]
+        )
         if fig_tendencia:
             st.plotly_chart(fig_tendencia, use_container_width=True)
     
@@ -278,11 +349,14 @@ def main():
         if 'periodicidad_reporte' in df.columns:
             st.write("### Análisis por Periodicidad")
             
-            periodicidad_stats = df.groupby('periodicidad_reporte').agg({
-                'nombre_reporte': 'count',
-                'criticidad': lambda x: (x == 'Alto').sum()
-            }).reset_index()
-            periodicidad_stats.columns = ['Periodicidad', 'Total Reportes', 'Reportes Críticos']
+            cruce_criticidad = agregados.cruce('periodicidad_reporte', 'criticidad')
+            periodicidad_stats = pd.DataFrame({
+                'Periodicidad': agregados.conteo('periodicidad_reporte').index,
+                'Total Reportes': agregados.conteo('periodicidad_reporte').values
+            }).sort_values('Periodicidad')
+            periodicidad_stats['Reportes Críticos'] = periodicidad_stats['Periodicidad'].map(
+                cruce_criticidad['Alto'] if 'Alto' in cruce_criticidad.columns else {}
+            ).fillna(0).astype(int)
             
             st.dataframe(
                 periodicidad_stats,
@@ -294,7 +368,7 @@ def main():
             st.write("### Reportes por Periodicidad")
             periodicidad_sel = st.selectbox(
                 "Seleccione periodicidad:",
-                df['periodicidad_reporte'].dropna().unique()
+                agregados.conteo('periodicidad_reporte').index
             )
             
             if periodicidad_sel:
@@ -307,12 +381,18 @@ def main():
         if 'departamento' in df.columns:
             st.write("### Análisis por Departamento")
             
-            dept_stats = df.groupby('departamento').agg({
-                'nombre_reporte': 'count',
-                'criticidad': lambda x: (x == 'Alto').sum(),
-                'automatizado': lambda x: (x == 'Sí').sum()
-            }).reset_index()
-            dept_stats.columns = ['Departamento', 'Total Reportes', 'Críticos', 'Automatizados']
+            cruce_criticidad = agregados.cruce('departamento', 'criticidad')
+            cruce_automatizado = agregados.cruce('departamento', 'automatizado')
+            dept_stats = pd.DataFrame({
+                'Departamento': agregados.conteo('departamento').index,
+                'Total Reportes': agregados.conteo('departamento').values
+            }).sort_values('Departamento')
+            dept_stats['Críticos'] = dept_stats['Departamento'].map(
+                cruce_criticidad['Alto'] if 'Alto' in cruce_criticidad.columns else {}
+            ).fillna(0).astype(int)
+            dept_stats['Automatizados'] = dept_stats['Departamento'].map(
+                cruce_automatizado['Sí'] if 'Sí' in cruce_automatizado.columns else {}
+            ).fillna(0).astype(int)
             
             st.dataframe(
                 dept_stats,
@@ -324,12 +404,15 @@ def main():
         if 'criticidad' in df.columns:
             st.write("### Análisis por Criticidad")
             
-            for criticidad in ['Alto', 'Medio', 'Bajo']:
-                reportes_crit = df[df['criticidad'] == criticidad]
-                if not reportes_crit.empty:
+            # Una sola partición del DataFrame para los listados
+            grupos_criticidad = dict(tuple(df.groupby('criticidad'))) if 'criticidad' in df.columns else {}
+            
+            for criticidad in ORDEN_CRITICIDAD:
+                reportes_crit = grupos_criticidad.get(criticidad)
+                if reportes_crit is not None and not reportes_crit.empty:
                     color = {'Alto': '🔴', 'Medio': '🟡', 'Bajo': '🟢'}[criticidad]
                     
-                    with st.expander(f"{color} {criticidad} - {len(reportes_crit)} reportes"):
+                    with st.expander(f"{color} {criticidad} - {agregados.cantidad('criticidad', criticidad)} reportes"):
                         st.dataframe(
                             reportes_crit[['nombre_reporte', 'persona_responsable', 'departamento', 'periodicidad_reporte']],
                             use_container_width=True,
@@ -343,39 +426,59 @@ def main():
             col_a1, col_a2, col_a3 = st.columns(3)
             
             with col_a1:
-                auto_si = len(df[df['automatizado'] == 'Sí'])
-                st.metric("Automatizados", auto_si, f"{(auto_si/len(df)*100):.1f}%")
+                auto_si = agregados.cantidad('automatizado', 'Sí')
+                st.metric("Automatizados", auto_si, f"{agregados.porcentaje('automatizado', 'Sí'):.1f}%")
             
             with col_a2:
-                auto_no = len(df[df['automatizado'] == 'No'])
-                st.metric("No Automatizados", auto_no, f"{(auto_no/len(df)*100):.1f}%")
+                auto_no = agregados.cantidad('automatizado', 'No')
+                st.metric("No Automatizados", auto_no, f"{agregados.porcentaje('automatizado', 'No'):.1f}%")
             
             with col_a3:
-                auto_parcial = len(df[df['automatizado'] == 'Parcialmente'])
-                st.metric("Parcialmente", auto_parcial, f"{(auto_parcial/len(df)*100):.1f}%")
+                auto_parcial = agregados.cantidad('automatizado', 'Parcialmente')
+                st.metric("Parcialmente", auto_parcial, f"{agregados.porcentaje('automatizado', 'Parcialmente'):.1f}%")
             
             # Oportunidades de automatización
             st.write("### 🎯 Oportunidades de Automatización")
             
-            no_automatizados = df[df['automatizado'] == 'No']
-            if not no_automatizados.empty:
-                # Priorizar por periodicidad alta y criticidad
-                periodicidad_prio = {'Diario': 5, 'Semanal': 4, 'Quincenal': 3, 'Mensual': 2, 'Bimestral': 1, 'Trimestral': 1}
-                criticidad_prio = {'Alto': 3, 'Medio': 2, 'Bajo': 1}
+            if auto_no > 0:
+                # Priorizar por periodicidad alta y criticidad (ranking calculado en la base de datos)
+                col_o1, col_o2 = st.columns(2)
                 
-                no_auto_priorizados = no_automatizados.copy()
-                no_auto_priorizados['prioridad'] = (
-                    no_auto_priorizados['periodicidad_reporte'].map(periodicidad_prio).fillna(0) +
-                    no_auto_priorizados['criticidad'].map(criticidad_prio).fillna(0)
-                )
+                with col_o1:
+                    departamentos = ["Todos"] + sorted(agregados.conteo('departamento').index.tolist())
+                    departamento_prio = st.selectbox("Departamento:", departamentos, key="prioridad_departamento")
                 
-                no_auto_priorizados = no_auto_priorizados.sort_values('prioridad', ascending=False)
+                departamento_filtro = None if departamento_prio == "Todos" else departamento_prio
+                if departamento_filtro:
+                    cruce_automatizado = agregados.cruce('departamento', 'automatizado')
+                    total_prioridad = int(cruce_automatizado.get('No', {}).get(departamento_filtro, 0))
+                else:
+                    total_prioridad = auto_no
+                total_paginas = max(1, -(-total_prioridad // TAMANO_PAGINA_PRIORIDAD))
                 
-                st.dataframe(
-                    no_auto_priorizados[['nombre_reporte', 'periodicidad_reporte', 'criticidad', 'departamento', 'persona_responsable']].head(10),
-                    use_container_width=True,
-                    hide_index=True
+                with col_o2:
+                    pagina = st.number_input(
+                        f"Página (de {total_paginas}):", min_value=1, max_value=total_paginas, value=1,
+                        key="prioridad_pagina"
+                    )
+                
+                no_auto_priorizados, total_prioridad = data_manager.obtener_prioridades_automatizacion(
+                    TAMANO_PAGINA_PRIORIDAD, (pagina - 1) * TAMANO_PAGINA_PRIORIDAD, departamento_filtro, df
                 )
+                
+                if no_auto_priorizados.empty:
+                    st.info("No hay reportes sin automatizar para este departamento.")
+                else:
+                    st.dataframe(
+                        no_auto_priorizados[['nombre_reporte', 'periodicidad_reporte', 'criticidad', 'departamento',
+                                             'persona_responsable', 'prioridad_automatizacion']],
+                        use_container_width=True,
+                        hide_index=True,
+                        column_config={"prioridad_automatizacion": st.column_config.NumberColumn("Prioridad")}
+                    )
+                    st.caption(f"{total_prioridad} reportes sin automatizar")
+                
+                mostrar_pesos_prioridad()
             else:
                 st.success("✅ ¡Excelente! Todos los reportes están automatizados.")
     
@@ -383,43 +486,14 @@ def main():
     st.markdown("---")
     st.subheader("💡 Insights y Recomendaciones")
     
-    insights = []
-    
-    # Insight 1: Periodicidad más común
-    if 'periodicidad_reporte' in df.columns:
-        periodicidad_top = df['periodicidad_reporte'].mode().iloc[0] if len(df['periodicidad_reporte'].mode()) > 0 else "N/A"
-        count_top = len(df[df['periodicidad_reporte'] == periodicidad_top])
-        insights.append(f"📊 La periodicidad más común es **{periodicidad_top}** con {count_top} reportes ({count_top/len(df)*100:.1f}%)")
-    
-    # Insight 2: Departamento con más reportes
-    if 'departamento' in df.columns:
-        dept_top = df['departamento'].mode().iloc[0] if len(df['departamento'].mode()) > 0 else "N/A"
-        count_dept = len(df[df['departamento'] == dept_top])
-        insights.append(f"🏢 **{dept_top}** es el departamento con más reportes ({count_dept} reportes)")
-    
-    # Insight 3: Nivel de automatización
-    if 'automatizado' in df.columns:
-        pct_auto = len(df[df['automatizado'] == 'Sí']) / len(df) * 100
-        if pct_auto < 50:
-            insights.append(f"⚠️ Solo el {pct_auto:.1f}% de los reportes están automatizados. Considere priorizar la automatización.")
+    # Calculados a partir de los agregados y guardados por versión de datos
+    for insight in obtener_insights(data_manager, df, agregados):
+        if insight['nivel'] == 'warning':
+            st.warning(insight['mensaje'])
+        elif insight['nivel'] == 'success':
+            st.success(insight['mensaje'])
         else:
-            insights.append(f"✅ El {pct_auto:.1f}% de los reportes están automatizados. ¡Buen trabajo!")
-    
-    # Insight 4: Reportes críticos
-    if 'criticidad' in df.columns:
-        pct_criticos = len(df[df['criticidad'] == 'Alto']) / len(df) * 100
-        if pct_criticos > 30:
-            insights.append(f"🔴 El {pct_criticos:.1f}% de los reportes son de criticidad alta. Asegure procesos robustos para estos.")
-    
-    # Insight 5: Sistema más usado
-    if 'sistema_origen' in df.columns:
-        sistema_top = df['sistema_origen'].mode().iloc[0] if len(df['sistema_origen'].mode()) > 0 else "N/A"
-        count_sistema = len(df[df['sistema_origen'] == sistema_top])
-        insights.append(f"💻 **{sistema_top}** es el sistema más utilizado ({count_sistema} reportes)")
-    
-    # Mostrar insights
-    for insight in insights:
-        st.info(insight)
+            st.info(insight['mensaje'])
 
 if __name__ == "__main__":
     main()
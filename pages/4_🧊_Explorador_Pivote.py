@@ -0,0 +1,163 @@
+import streamlit as st
+import time
+import plotly.express as px
+from utils.data_manager import DataManager
+from utils.cubo import GestorCubo, DIMENSIONES_CUBO
+from utils.cache_figuras import obtener_cache_figuras
+from utils.auth import Auth
+
+st.set_page_config(
+    page_title="Explorador de Tablas Dinámicas",
+    page_icon="🧊",
+    layout="wide"
+)
+
+auth = Auth()
+
+NOMBRES_DIMENSIONES = {
+    'periodicidad_reporte': 'Periodicidad del Reporte',
+    'periodicidad_auditoria': 'Periodicidad de Auditoría',
+    'departamento': 'Departamento',
+    'criticidad': 'Criticidad',
+    'automatizado': 'Automatizado',
+    'sistema_origen': 'Sistema de Origen'
+}
+
+SIN_COLUMNAS = '(ninguna)'
+
+@st.cache_resource
+def obtener_gestor_cubo():
+    """Cubo compartido entre sesiones; se actualiza al cambiar la versión de los datos"""
+    return GestorCubo(DataManager())
+
+def profundizar(valor, siguiente_dimension):
+    """Fijar el valor seleccionado como filtro y desglosar por la siguiente dimensión"""
+    dimension_actual = st.session_state['pivote_filas']
+    st.session_state[f"filtro_{dimension_actual}"] = [valor]
+    st.session_state['pivote_filas'] = siguiente_dimension
+    if st.session_state.get('pivote_columnas') == siguiente_dimension:
+        st.session_state['pivote_columnas'] = SIN_COLUMNAS
+
+def limpiar_filtros():
+    for dimension in DIMENSIONES_CUBO:
+        st.session_state[f"filtro_{dimension}"] = []
+
+def main():
+    # Verificar autenticación
+    if not auth.login():
+        return
+
+    # Mostrar info de usuario
+    auth.mostrar_info_usuario()
+
+    st.title("🧊 Explorador de Tablas Dinámicas")
+    st.markdown("---")
+
+    gestor = obtener_gestor_cubo()
+    cubo = gestor.obtener()
+
+    if cubo.total() == 0:
+        st.warning("📭 No hay datos disponibles para explorar.")
+        return
+
+    # Dimensiones de la tabla
+    col1, col2 = st.columns(2)
+
+    with col1:
+        filas = st.selectbox(
+            "Filas:",
+            DIMENSIONES_CUBO,
+            format_func=lambda dim: NOMBRES_DIMENSIONES[dim],
+            key='pivote_filas'
+        )
+
+    with col2:
+        opciones_columnas = [SIN_COLUMNAS] + [dim for dim in DIMENSIONES_CUBO if dim != filas]
+        if st.session_state.get('pivote_columnas') not in opciones_columnas:
+            st.session_state['pivote_columnas'] = SIN_COLUMNAS
+        columnas = st.selectbox(
+            "Columnas:",
+            opciones_columnas,
+            format_func=lambda dim: NOMBRES_DIMENSIONES.get(dim, dim),
+            key='pivote_columnas'
+        )
+
+    # Filtros (corte del cubo)
+    with st.expander("🔍 Filtros", expanded=any(st.session_state.get(f"filtro_{dim}") for dim in DIMENSIONES_CUBO)):
+        filtros = {}
+        columnas_filtro = st.columns(3)
+        for i, dimension in enumerate(DIMENSIONES_CUBO):
+            with columnas_filtro[i % 3]:
+                filtros[dimension] = st.multiselect(
+                    NOMBRES_DIMENSIONES[dimension],
+                    cubo.valores(dimension),
+                    key=f"filtro_{dimension}"
+                )
+        st.button("🗑️ Limpiar Filtros", on_click=limpiar_filtros)
+
+    inicio = time.perf_counter()
+    tabla = cubo.pivote(filas, None if columnas == SIN_COLUMNAS else columnas, filtros)
+    total = cubo.total(filtros)
+    duracion_ms = (time.perf_counter() - inicio) * 1000
+
+    st.caption(
+        f"{total} encuestas en el corte · consulta resuelta en {duracion_ms:.2f} ms sobre {cubo.celdas} celdas"
+        + (f" · última actualización del cubo: {gestor.ultima_actualizacion['modo']} "
+           f"({gestor.ultima_actualizacion['duracion_ms']:.0f} ms)" if gestor.ultima_actualizacion else "")
+    )
+
+    if tabla.empty:
+        st.info("No hay encuestas que coincidan con los filtros seleccionados.")
+        return
+
+    st.dataframe(tabla, use_container_width=True)
+
+    # Visualización de la tabla (sin totales); se reutiliza mientras la tabla no cambie
+    datos_grafico = tabla.drop(index='Total', errors='ignore')
+    if columnas == SIN_COLUMNAS:
+        fig = obtener_cache_figuras().obtener_o_construir(
+            'pivote_barras', datos_grafico,
+            lambda: px.bar(
+                datos_grafico.reset_index(),
+                x=filas,
+                y='Cantidad',
+                labels={filas: NOMBRES_DIMENSIONES[filas]}
+            ),
+            filas=filas
+        )
+    else:
+        datos_grafico = datos_grafico.drop(columns='Total', errors='ignore')
+        fig = obtener_cache_figuras().obtener_o_construir(
+            'pivote_mapa_calor', datos_grafico,
+            lambda: px.imshow(
+                datos_grafico,
+                text_auto=True,
+                aspect='auto',
+                color_continuous_scale='Blues',
+                labels={'x': NOMBRES_DIMENSIONES[columnas], 'y': NOMBRES_DIMENSIONES[filas], 'color': 'Encuestas'}
+            ),
+            filas=filas, columnas=columnas
+        )
+    st.plotly_chart(fig, use_container_width=True)
+
+    # Profundizar en un valor de las filas
+    st.subheader("🔎 Profundizar")
+
+    col_d1, col_d2, col_d3 = st.columns([2, 2, 1])
+
+    with col_d1:
+        valor = st.selectbox(f"{NOMBRES_DIMENSIONES[filas]}:", list(datos_grafico.index))
+
+    with col_d2:
+        siguiente = st.selectbox(
+            "Desglosar por:",
+            [dim for dim in DIMENSIONES_CUBO if dim != filas],
+            format_func=lambda dim: NOMBRES_DIMENSIONES[dim]
+        )
+
+    with col_d3:
+        st.write("")
+        st.button("Profundizar", on_click=profundizar, args=(valor, siguiente))
+
+if __name__ == "__main__":
+    main()
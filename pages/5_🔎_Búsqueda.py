@@ -0,0 +1,88 @@
+import streamlit as st
+import time
+from utils.data_manager import DataManager
+from utils.auth import Auth
+
+st.set_page_config(
+    page_title="Búsqueda - Reportes",
+    page_icon="🔎",
+    layout="wide"
+)
+
+data_manager = DataManager()
+auth = Auth()
+
+RESULTADOS_POR_PAGINA = 10
+
+def reiniciar_pagina():
+    st.session_state['busqueda_pagina'] = 1
+
+def main():
+    # Verificar autenticación
+    if not auth.login():
+        return
+
+    # Mostrar info de usuario
+    auth.mostrar_info_usuario()
+    st.title("🔎 Búsqueda")
+    st.markdown("---")
+
+    if not data_manager.usar_database:
+        st.error("❌ La búsqueda de texto completo requiere PostgreSQL. Actualmente usando almacenamiento CSV.")
+        st.info("Puede buscar por nombre, responsable o sistema desde el Panel de Administración.")
+        return
+
+    consulta = st.text_input(
+        "Buscar en nombres, descripciones, auditorías, stakeholders y observaciones:",
+        placeholder='Ej.: conciliación bancaria, "cierre mensual", -nómina',
+        help='Admite frases entre comillas, "or" y exclusiones con "-"',
+        key='busqueda_consulta',
+        on_change=reiniciar_pagina
+    )
+
+    if not consulta.strip():
+        st.info("👆 Escriba uno o más términos para buscar en el catálogo de reportes")
+        return
+
+    pagina = st.session_state.get('busqueda_pagina', 1)
+
+    try:
+        inicio = time.perf_counter()
+        resultados, total = data_manager.buscar_texto_completo(
+            consulta, RESULTADOS_POR_PAGINA, (pagina - 1) * RESULTADOS_POR_PAGINA
+        )
+        duracion_ms = (time.perf_counter() - inicio) * 1000
+    except Exception as e:
+        st.error(f"❌ Error en la búsqueda: {str(e)}")
+        return
+
+    if total == 0:
+        st.warning(f"🔍 No se encontraron reportes para \"{consulta}\"")
+        return
+
+    total_paginas = (total + RESULTADOS_POR_PAGINA - 1) // RESULTADOS_POR_PAGINA
+    if pagina > total_paginas:
+        # Los datos cambiaron desde la última búsqueda y la página ya no existe
+        st.session_state['busqueda_pagina'] = total_paginas
+        st.rerun()
+
+    st.caption(f"{total} resultados · página {pagina} de {total_paginas} · {duracion_ms:.0f} ms")
+
+    for posicion, resultado in enumerate(resultados.itertuples(index=False), start=(pagina - 1) * RESULTADOS_POR_PAGINA + 1):
+        with st.container(border=True):
+            st.markdown(f"**{posicion}. {resultado.nombre_reporte}**")
+            st.caption(f"ID: {resultado.id} · {resultado.departamento or 'Sin departamento'} · {resultado.persona_responsable}")
+            if resultado.fragmento:
+                st.markdown(resultado.fragmento)
+
+    if total_paginas > 1:
+        st.number_input(
+            "Página:",
+            min_value=1,
+            max_value=total_paginas,
+            step=1,
+            key='busqueda_pagina'
+        )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+import streamlit as st
+import pandas as pd
+import time
+from utils.data_manager import DataManager
+from utils.validacion import COLUMNAS_ENCUESTA, CAMPOS_OBLIGATORIOS, ETIQUETAS_COLUMNAS, normalizar_lote, validar_lote
+from utils.auth import Auth
+
+st.set_page_config(
+    page_title="Importación Masiva - Reportes",
+    page_icon="📥",
+    layout="wide"
+)
+
+data_manager = DataManager()
+auth = Auth()
+
+# Filas con errores que se muestran en pantalla (el detalle completo se descarga)
+MAX_ERRORES_EN_PANTALLA = 200
+
+def plantilla_csv():
+    """CSV vacío con los encabezados del formulario"""
+    encabezados = [
+        ETIQUETAS_COLUMNAS[columna] + (" *" if columna in CAMPOS_OBLIGATORIOS else "")
+        for columna in COLUMNAS_ENCUESTA
+    ]
+    return pd.DataFrame(columns=encabezados).to_csv(index=False).encode('utf-8-sig')
+
+def main():
+    # Verificar autenticación
+    if not auth.login():
+        return
+
+    # Mostrar info de usuario
+    auth.mostrar_info_usuario()
+    st.title("📥 Importación Masiva")
+    st.markdown("---")
+
+    st.markdown("""
+    Cargue un archivo CSV o Excel con una encuesta por fila. Los encabezados pueden ser los nombres
+    de las columnas (`nombre_reporte`, `email_responsable`, ...) o las etiquetas del formulario.
+    Se aplican las mismas validaciones que en el formulario; solo se importan las filas válidas.
+    Si no se indica la fecha de envío se usa la fecha de importación.
+    """)
+
+    st.download_button(
+        "📄 Descargar plantilla",
+        data=plantilla_csv(),
+        file_name="plantilla_importacion.csv",
+        mime="text/csv"
+    )
+
+    archivo = st.file_uploader("Archivo de encuestas:", type=["csv", "xlsx"])
+
+    if archivo is None:
+        st.info("👆 Seleccione un archivo para validarlo antes de importarlo")
+        return
+
+    try:
+        inicio = time.perf_counter()
+        lote, faltantes = normalizar_lote(data_manager.leer_archivo_importacion(archivo))
+        errores = validar_lote(lote)
+        duracion_validacion = time.perf_counter() - inicio
+    except Exception as e:
+        st.error(f"❌ {str(e)}")
+        return
+
+    if faltantes:
+        st.error(
+            "❌ Al archivo le faltan columnas obligatorias: "
+            + ", ".join(CAMPOS_OBLIGATORIOS[columna] for columna in faltantes)
+        )
+        return
+
+    if lote.empty:
+        st.warning("📭 El archivo no contiene filas")
+        return
+
+    validas = errores == ""
+    total_validas = int(validas.sum())
+
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("Filas en el archivo", len(lote))
+    with col2:
+        st.metric("Filas válidas", total_validas)
+    with col3:
+        st.metric("Filas con errores", len(lote) - total_validas)
+
+    st.caption(f"Validación: {duracion_validacion * 1000:.0f} ms")
+
+    if total_validas < len(lote):
+        # Fila según la numeración de la hoja de cálculo (la fila 1 es el encabezado)
+        detalle = pd.DataFrame({
+            'Fila': lote.index[~validas] + 2,
+            'Nombre del Reporte': lote.loc[~validas, 'nombre_reporte'],
+            'Errores': errores[~validas]
+        })
+
+        st.subheader("⚠️ Filas con errores")
+        st.dataframe(detalle.head(MAX_ERRORES_EN_PANTALLA), use_container_width=True, hide_index=True)
+        if len(detalle) > MAX_ERRORES_EN_PANTALLA:
+            st.caption(f"Se muestran las primeras {MAX_ERRORES_EN_PANTALLA} filas con errores.")
+
+        st.download_button(
+            "📥 Descargar errores",
+            data=detalle.to_csv(index=False).encode('utf-8-sig'),
+            file_name="errores_importacion.csv",
+            mime="text/csv"
+        )
+
+    if total_validas == 0:
+        st.error("❌ No hay filas válidas para importar")
+        return
+
+    # Evitar importar dos veces el mismo archivo al volver a ejecutar la página
+    if st.session_state.get('archivo_importado') == archivo.file_id:
+        st.success(st.session_state.get('mensaje_importacion', "✅ Este archivo ya fue importado"))
+        return
+
+    if st.button(f"📥 Importar {total_validas} encuestas válidas", type="primary"):
+        try:
+            inicio = time.perf_counter()
+            guardadas = data_manager.guardar_respuestas_lote(lote[validas])
+            duracion = time.perf_counter() - inicio
+
+            mensaje = (
+                f"✅ {guardadas} encuestas importadas en {duracion:.2f} s "
+                f"({guardadas / duracion:.0f} filas/s)" if duracion > 0 else f"✅ {guardadas} encuestas importadas"
+            )
+            st.session_state['archivo_importado'] = archivo.file_id
+            st.session_state['mensaje_importacion'] = mensaje
+            st.success(mensaje)
+            st.balloons()
+        except Exception as e:
+            st.error(f"❌ Error al importar las encuestas: {str(e)}")
+
+if __name__ == "__main__":
+    main()
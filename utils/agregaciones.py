@@ -0,0 +1,245 @@
+import pandas as pd
+
+# Dimensiones categóricas del cubo de conteos
+DIMENSIONES = ['periodicidad_reporte', 'departamento', 'criticidad', 'automatizado', 'sistema_origen']
+
+# Orden de presentación de los niveles de criticidad
+ORDEN_CRITICIDAD = ['Alto', 'Medio', 'Bajo']
+
+# Granularidades de la serie temporal: unidad de date_trunc, frecuencia de pandas y días aproximados
+GRANULARIDADES = {
+    'dia': ('day', 'D', 1),
+    'semana': ('week', 'W', 7),
+    'mes': ('month', 'M', 30.44),
+    'trimestre': ('quarter', 'Q', 91.31)
+}
+
+# Desgloses permitidos para la serie temporal
+DESGLOSES_SERIE = ['departamento', 'criticidad']
+
+# Máximo de puntos por serie cuando la granularidad es automática
+MAX_PUNTOS_SERIE = 120
+
+# Dimensiones del rollup diario (tabla encuestas_rollup_diario)
+DIMENSIONES_ROLLUP = ['departamento', 'criticidad', 'periodicidad_reporte', 'automatizado']
+
+class AgregadosEncuestas:
+    """Conteos del catálogo calculados en una sola pasada.
+
+    El cubo guarda la cantidad de encuestas por cada combinación de dimensiones;
+    los conteos marginales, los cruces y las modas se derivan de él sin volver a
+    recorrer las encuestas.
+    """
+
+    def __init__(self, cubo, tendencia):
+        self.cubo = cubo
+        self.tendencia = tendencia
+        self.total = int(cubo['cantidad'].sum()) if not cubo.empty else 0
+        self._conteos = {}
+
+    def tiene(self, dimension):
+        return dimension in self.cubo.columns
+
+    def conteo(self, dimension, orden=None):
+        """Cantidad por valor de una dimensión, de mayor a menor (o en el orden indicado)"""
+        if dimension not in self._conteos:
+            if not self.tiene(dimension) or self.cubo.empty:
+                serie = pd.Series(dtype='int64')
+            else:
+                serie = self.cubo.groupby(dimension)['cantidad'].sum()
+                # Empates ordenados por valor, igual que Series.mode()
+                serie = serie.sort_index(kind='stable').sort_values(ascending=False, kind='stable')
+            self._conteos[dimension] = serie.astype('int64')
+
+        serie = self._conteos[dimension]
+        if orden:
+            primeros = [valor for valor in orden if valor in serie.index]
+            serie = serie.reindex(primeros + [valor for valor in serie.index if valor not in primeros])
+        return serie
+
+    def cantidad(self, dimension, valor):
+        return int(self.conteo(dimension).get(valor, 0))
+
+    def porcentaje(self, dimension, valor):
+        return self.cantidad(dimension, valor) / self.total * 100 if self.total else 0.0
+
+    def unicos(self, dimension):
+        return len(self.conteo(dimension))
+
+    def moda(self, dimension):
+        """Valor más frecuente de una dimensión y su cantidad"""
+        serie = self.conteo(dimension)
+        if serie.empty:
+            return None, 0
+        return serie.index[0], int(serie.iloc[0])
+
+    def cruce(self, filas, columnas):
+        """Tabla de contingencia entre dos dimensiones"""
+        if not (self.tiene(filas) and self.tiene(columnas)) or self.cubo.empty:
+            return pd.DataFrame()
+        return self.cubo.groupby([filas, columnas])['cantidad'].sum().unstack(fill_value=0).astype('int64')
+
+
+def _tendencia_vacia():
+    return pd.Series(dtype='int64', index=pd.DatetimeIndex([], name='fecha'), name='cantidad')
+
+
+def calcular_agregados(df):
+    """Calcular el cubo de conteos y la tendencia diaria a partir de un DataFrame"""
+    dimensiones = [col for col in DIMENSIONES if col in df.columns]
+
+    if df.empty or not dimensiones:
+        cubo = pd.DataFrame(columns=dimensiones + ['cantidad'])
+    else:
+        cubo = df.groupby(dimensiones, dropna=False, sort=False).size().reset_index(name='cantidad')
+
+    tendencia = _tendencia_vacia()
+    if 'fecha_envio' in df.columns and not df.empty:
+        fechas = pd.to_datetime(df['fecha_envio'], errors='coerce').dropna()
+        tendencia = fechas.dt.normalize().value_counts().sort_index()
+        tendencia.index.name = 'fecha'
+        tendencia.name = 'cantidad'
+
+    return AgregadosEncuestas(cubo, tendencia)
+
+
+def agregados_desde_grouping_sets(filas):
+    """Construir los agregados a partir del resultado de la consulta GROUPING SETS"""
+    if filas.empty:
+        return AgregadosEncuestas(pd.DataFrame(columns=DIMENSIONES + ['cantidad']), _tendencia_vacia())
+
+    es_tendencia = filas['es_tendencia'].astype(bool)
+    cubo = filas.loc[~es_tendencia, DIMENSIONES + ['cantidad']].reset_index(drop=True)
+
+    filas_tendencia = filas[es_tendencia & filas['fecha'].notna()]
+    tendencia = pd.Series(
+        filas_tendencia['cantidad'].astype('int64').values,
+        index=pd.DatetimeIndex(pd.to_datetime(filas_tendencia['fecha']), name='fecha'),
+        name='cantidad'
+    ).sort_index()
+
+    return AgregadosEncuestas(cubo, tendencia)
+
+
+def elegir_granularidad(fecha_min, fecha_max, max_puntos=MAX_PUNTOS_SERIE):
+    """Granularidad más fina cuyo número de periodos no supera max_puntos"""
+    if fecha_min is None or fecha_max is None or pd.isna(fecha_min) or pd.isna(fecha_max):
+        return 'dia'
+
+    dias = (pd.Timestamp(fecha_max) - pd.Timestamp(fecha_min)).days + 1
+    for granularidad, (_, _, dias_periodo) in GRANULARIDADES.items():
+        if dias / dias_periodo <= max_puntos:
+            return granularidad
+    return 'trimestre'
+
+
+def completar_serie_temporal(serie, granularidad, desglose=None):
+    """Rellenar con cero los periodos sin encuestas (la consulta SQL solo devuelve los que tienen)"""
+    columnas = ['periodo'] + ([desglose] if desglose else []) + ['cantidad']
+    if serie.empty:
+        return pd.DataFrame(columns=columnas)
+
+    frecuencia = GRANULARIDADES[granularidad][1]
+    periodos = pd.to_datetime(serie['periodo'])
+    rango = pd.period_range(periodos.min(), periodos.max(), freq=frecuencia).start_time
+
+    if not desglose:
+        completa = serie.groupby(periodos)['cantidad'].sum().reindex(rango, fill_value=0)
+        return completa.rename_axis('periodo').reset_index(name='cantidad')
+
+    tabla = serie.assign(periodo=periodos).pivot_table(
+        index='periodo', columns=desglose, values='cantidad', aggfunc='sum', fill_value=0
+    )
+    tabla = tabla.reindex(rango, fill_value=0).rename_axis('periodo')
+    return tabla.stack().rename('cantidad').reset_index()[columnas]
+
+
+def calcular_serie_temporal(df, granularidad='auto', desglose=None, max_puntos=MAX_PUNTOS_SERIE):
+    """Conteo de encuestas por periodo (y opcionalmente por departamento o criticidad)
+
+    Devuelve (serie, granularidad usada).
+    """
+    if desglose not in (None, *DESGLOSES_SERIE):
+        raise Exception(f"Desglose no soportado: {desglose}")
+
+    if 'fecha_envio' not in df.columns or df.empty:
+        return completar_serie_temporal(pd.DataFrame(), 'dia', desglose), 'dia'
+
+    fechas = pd.to_datetime(df['fecha_envio'], errors='coerce')
+    validas = fechas.notna()
+    fechas = fechas[validas]
+
+    if granularidad == 'auto':
+        granularidad = elegir_granularidad(fechas.min(), fechas.max(), max_puntos)
+
+    periodo = fechas.dt.to_period(GRANULARIDADES[granularidad][1]).dt.start_time
+    claves = [periodo.rename('periodo')]
+    if desglose:
+        claves.append(df.loc[validas, desglose].fillna('Sin especificar'))
+
+    serie = periodo.groupby(claves).size().reset_index(name='cantidad')
+    return completar_serie_temporal(serie, granularidad, desglose), granularidad
+
+
+def agrupar_tendencia(tendencia, max_puntos=MAX_PUNTOS_SERIE):
+    """Reagrupar una tendencia diaria en la granularidad más fina que no supere max_puntos"""
+    if tendencia.empty:
+        return tendencia
+
+    granularidad = elegir_granularidad(tendencia.index.min(), tendencia.index.max(), max_puntos)
+    if granularidad == 'dia':
+        return tendencia
+
+    periodos = tendencia.index.to_period(GRANULARIDADES[granularidad][1]).start_time
+    return tendencia.groupby(periodos).sum().rename_axis('fecha')
+
+
+def calcular_rollup_diario(df, desde=None, hasta=None):
+    """Rollup diario con la misma forma que la tabla encuestas_rollup_diario (modo CSV)"""
+    columnas = ['dia'] + DIMENSIONES_ROLLUP + ['cantidad']
+    if 'fecha_envio' not in df.columns or df.empty:
+        return pd.DataFrame(columns=columnas)
+
+    dia = pd.to_datetime(df['fecha_envio'], errors='coerce').dt.normalize().rename('dia')
+    validas = dia.notna()
+    if desde is not None:
+        validas &= dia >= pd.Timestamp(desde)
+    if hasta is not None:
+        validas &= dia <= pd.Timestamp(hasta)
+
+    claves = [dia[validas]]
+    for dimension in DIMENSIONES_ROLLUP:
+        valores = df[dimension] if dimension in df.columns else pd.Series('', index=df.index)
+        claves.append(valores[validas].fillna('').rename(dimension))
+
+    rollup = claves[0].groupby(claves).size().reset_index(name='cantidad')
+    rollup['dia'] = rollup['dia'].dt.date
+    return rollup.sort_values('dia', kind='stable').reset_index(drop=True)[columnas]
+
+
+def ventanas_comparacion(dias=7, hoy=None):
+    """Inicio del periodo anterior, inicio del periodo actual y último día (ambos periodos de `dias` días)"""
+    fin = pd.Timestamp(hoy if hoy is not None else pd.Timestamp.now()).normalize()
+    inicio_actual = fin - pd.Timedelta(days=dias - 1)
+    inicio_anterior = inicio_actual - pd.Timedelta(days=dias)
+    return inicio_anterior.date(), inicio_actual.date(), fin.date()
+
+
+def comparar_periodos(rollup, dias=7, hoy=None):
+    """Encuestas de los últimos `dias` días frente a los `dias` días anteriores, a partir del rollup"""
+    inicio_anterior, inicio_actual, fin = ventanas_comparacion(dias, hoy)
+
+    if rollup.empty:
+        actual = anterior = 0
+    else:
+        dia = pd.to_datetime(rollup['dia']).dt.date
+        actual = int(rollup.loc[(dia >= inicio_actual) & (dia <= fin), 'cantidad'].sum())
+        anterior = int(rollup.loc[(dia >= inicio_anterior) & (dia < inicio_actual), 'cantidad'].sum())
+
+    return {
+        'dias': dias,
+        'actual': actual,
+        'anterior': anterior,
+        'variacion': actual - anterior,
+        'variacion_pct': (actual - anterior) / anterior * 100 if anterior else None
+    }
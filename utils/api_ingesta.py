@@ -0,0 +1,252 @@
+"""Servicio HTTP de ingesta de encuestas, sin Streamlit.
+
+Permite que otros sistemas envíen su inventario de reportes en JSON con las mismas
+validaciones (utils/validacion.py) y el mismo almacenamiento (DataManager) que el
+formulario. Se puede usar dentro del proceso (ServidorIngesta) o como servicio:
+
+    python -m utils.api_ingesta --puerto 8600 --conexiones 10 --token <secreto>
+
+Endpoints:
+    GET  /salud             estado del servicio
+    POST /encuestas         una encuesta (objeto JSON con las columnas de la encuesta)
+    POST /encuestas/lote    varias encuestas (lista JSON u objeto {"encuestas": [...]})
+
+Si hay token (--token o INGESTA_TOKEN), las peticiones POST deben incluir la
+cabecera "Authorization: Bearer <token>".
+"""
+import argparse
+import hmac
+import json
+import logging
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pandas as pd
+
+from utils.data_manager import DataManager
+from utils.validacion import normalizar_encuesta, validar_encuesta, validar_lote
+
+logger = logging.getLogger(__name__)
+
+# Límites de una petición
+MAX_BYTES_PETICION = 10 * 1024 * 1024
+MAX_ENCUESTAS_LOTE = 5000
+
+
+class _ErrorPeticion(Exception):
+    def __init__(self, estado, mensaje):
+        super().__init__(mensaje)
+        self.estado = estado
+
+
+class _ManejadorIngesta(BaseHTTPRequestHandler):
+    """Endpoints JSON del servicio; las conexiones se mantienen abiertas entre peticiones"""
+
+    protocol_version = "HTTP/1.1"
+    server_version = "IngestaEncuestas/1.0"
+
+    # Evita esperas de ~40 ms (Nagle + ACK diferido) al responder en conexiones persistentes
+    disable_nagle_algorithm = True
+
+    def log_message(self, formato, *args):
+        if self.server.ingesta.registrar_peticiones:
+            super().log_message(formato, *args)
+
+    def _responder(self, estado, cuerpo):
+        datos = json.dumps(cuerpo, ensure_ascii=False).encode("utf-8")
+        self.send_response(estado)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(datos)))
+        if self.close_connection:
+            self.send_header("Connection", "close")
+        self.end_headers()
+        self.wfile.write(datos)
+
+    def _autorizado(self):
+        token = self.server.ingesta.token
+        if not token:
+            return True
+        cabecera = self.headers.get("Authorization", "")
+        return hmac.compare_digest(cabecera.encode("utf-8"), f"Bearer {token}".encode("utf-8"))
+
+    def _leer_json(self):
+        try:
+            longitud = int(self.headers.get("Content-Length", 0))
+        except ValueError:
+            longitud = -1
+
+        if longitud < 0 or longitud > MAX_BYTES_PETICION:
+            # El cuerpo no se lee: la conexión no puede reutilizarse
+            self.close_connection = True
+            raise _ErrorPeticion(413, f"El cuerpo de la petición supera {MAX_BYTES_PETICION} bytes")
+
+        try:
+            return json.loads(self.rfile.read(longitud) or b"null")
+        except ValueError:
+            raise _ErrorPeticion(400, "El cuerpo de la petición no es JSON válido")
+
+    def do_GET(self):
+        if self.path == "/salud":
+            self._responder(200, self.server.ingesta.salud())
+        else:
+            self._responder(404, {'error': "Ruta no encontrada"})
+
+    def do_POST(self):
+        ingesta = self.server.ingesta
+        try:
+            if self.path not in ("/encuestas", "/encuestas/lote"):
+                self.close_connection = True
+                raise _ErrorPeticion(404, "Ruta no encontrada")
+
+            if not self._autorizado():
+                self.close_connection = True
+                raise _ErrorPeticion(401, "Token de acceso no válido")
+
+            cuerpo = self._leer_json()
+            if self.path == "/encuestas":
+                estado, respuesta = ingesta.guardar_encuesta(cuerpo)
+            else:
+                estado, respuesta = ingesta.guardar_lote(cuerpo)
+
+        except _ErrorPeticion as e:
+            estado, respuesta = e.estado, {'error': str(e)}
+        except Exception:
+            # El detalle (SQL, conexión) queda en el log del servidor, no en la respuesta al cliente
+            logger.exception("Error interno atendiendo %s %s", self.command, self.path)
+            estado, respuesta = 500, {'error': "Error interno"}
+
+        self._responder(estado, respuesta)
+
+
+class _ServidorHTTP(ThreadingHTTPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+    # Cola de conexiones pendientes para ráfagas de clientes concurrentes
+    request_queue_size = 128
+
+
+class ServidorIngesta:
+    def __init__(self, host="127.0.0.1", puerto=0, token=None, conexiones=10, data_manager=None,
+                 registrar_peticiones=False):
+        self.host = host
+        self.puerto = puerto
+        self.token = token
+        self.registrar_peticiones = registrar_peticiones
+        self.data_manager = data_manager or DataManager(conexiones_maximas=conexiones)
+        # En modo CSV las escrituras se serializan: el archivo no admite escritores concurrentes
+        self._lock_csv = threading.Lock()
+        self._servidor = None
+        self._hilo = None
+
+    def __enter__(self):
+        self.iniciar()
+        return self
+
+    def __exit__(self, *args):
+        self.detener()
+
+    def iniciar(self):
+        """Iniciar el servidor en un hilo en segundo plano"""
+        self._servidor = _ServidorHTTP((self.host, self.puerto), _ManejadorIngesta)
+        self._servidor.ingesta = self
+        self.puerto = self._servidor.server_address[1]
+
+        self._hilo = threading.Thread(target=self._servidor.serve_forever, daemon=True)
+        self._hilo.start()
+        return self.puerto
+
+    def detener(self):
+        """Detener el servidor y cerrar las conexiones a la base de datos"""
+        if self._servidor is not None:
+            self._servidor.shutdown()
+            self._servidor.server_close()
+            self._servidor = None
+        if self.data_manager.usar_database:
+            self.data_manager.db.cerrar()
+
+    def salud(self):
+        return {
+            'estado': "ok",
+            'almacenamiento': "postgresql" if self.data_manager.usar_database else "csv"
+        }
+
+    def _guardar(self, funcion, datos):
+        if self.data_manager.usar_database:
+            return funcion(datos)
+        with self._lock_csv:
+            return funcion(datos)
+
+    def guardar_encuesta(self, datos):
+        """Validar y guardar una encuesta; devuelve el estado HTTP y el cuerpo de la respuesta"""
+        if not isinstance(datos, dict):
+            return 400, {'error': "Se esperaba un objeto JSON con los datos de la encuesta"}
+
+        encuesta = normalizar_encuesta(datos)
+        errores = validar_encuesta(encuesta)
+        if errores:
+            return 422, {'errores': errores}
+
+        if not encuesta['fecha_envio']:
+            encuesta['fecha_envio'] = time.strftime("%Y-%m-%d %H:%M:%S")
+
+        resultado = self._guardar(self.data_manager.guardar_respuesta, encuesta)
+        return 201, {'id': resultado if self.data_manager.usar_database else None}
+
+    def guardar_lote(self, datos):
+        """Validar un lote y guardar sus encuestas válidas en una sola operación"""
+        if isinstance(datos, dict):
+            datos = datos.get('encuestas')
+        if not isinstance(datos, list) or not all(isinstance(item, dict) for item in datos):
+            return 400, {'error': "Se esperaba una lista JSON de encuestas"}
+        if not datos:
+            return 400, {'error': "El lote no contiene encuestas"}
+        if len(datos) > MAX_ENCUESTAS_LOTE:
+            return 413, {'error': f"El lote supera el máximo de {MAX_ENCUESTAS_LOTE} encuestas"}
+
+        lote = pd.DataFrame([normalizar_encuesta(item) for item in datos])
+        errores = validar_lote(lote)
+        validas = errores == ""
+
+        rechazadas = [
+            {'indice': int(indice), 'errores': mensaje.split("; ")}
+            for indice, mensaje in errores[~validas].items()
+        ]
+        if not validas.any():
+            return 422, {'recibidas': len(lote), 'guardadas': 0, 'rechazadas': rechazadas}
+
+        guardadas = self._guardar(self.data_manager.guardar_respuestas_lote, lote[validas])
+        return (201 if not rechazadas else 200), {
+            'recibidas': len(lote),
+            'guardadas': guardadas,
+            'rechazadas': rechazadas
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servicio HTTP de ingesta de encuestas")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--puerto", type=int, default=8600)
+    parser.add_argument("--conexiones", type=int, default=10, help="tamaño máximo del pool de conexiones")
+    parser.add_argument("--token", default=os.getenv("INGESTA_TOKEN"), help="token exigido en las peticiones POST")
+    parser.add_argument("--registrar", action="store_true", help="escribir cada petición en la salida estándar")
+    args = parser.parse_args()
+
+    servidor = ServidorIngesta(args.host, args.puerto, args.token, args.conexiones,
+                               registrar_peticiones=args.registrar)
+    servidor.iniciar()
+    print(f"Servicio de ingesta escuchando en http://{args.host}:{servidor.puerto} "
+          f"({servidor.salud()['almacenamiento']}, token {'requerido' if args.token else 'desactivado'})", flush=True)
+
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servidor.detener()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+import os
+import threading
+from collections import defaultdict
+import pandas as pd
+
+# Campos cortos en los que busca el panel de administración
+CAMPOS_BUSQUEDA = ['nombre_reporte', 'persona_responsable', 'sistema_origen']
+
+# Equivalencias para buscar sin distinguir acentos; la función SQL normalizar_busqueda usa las mismas
+CON_ACENTO = 'áàäâãéèëêíìïîóòöôõúùüûñçÁÀÄÂÃÉÈËÊÍÌÏÎÓÒÖÔÕÚÙÜÛÑÇ'
+SIN_ACENTO = 'aaaaaeeeeiiiiooooouuuuncAAAAAEEEEIIIIOOOOOUUUUNC'
+
+_TABLA_ACENTOS = str.maketrans(CON_ACENTO, SIN_ACENTO)
+
+def normalizar_texto(texto):
+    """Texto sin acentos y en minúsculas, para comparar en búsquedas"""
+    if texto is None or (not isinstance(texto, str) and pd.isna(texto)):
+        return ""
+    return str(texto).translate(_TABLA_ACENTOS).lower()
+
+def normalizar_serie(serie):
+    """normalizar_texto aplicado a una columna"""
+    return serie.fillna('').astype(str).str.translate(_TABLA_ACENTOS).str.lower()
+
+def trigramas(texto):
+    return {texto[i:i + 3] for i in range(len(texto) - 2)}
+
+
+class IndiceTrigramas:
+    """Índice invertido de trigramas sobre un campo de texto (modo CSV).
+
+    Cada trigrama apunta a las filas que lo contienen. Una búsqueda toma como
+    candidatas las filas del trigrama menos frecuente de la consulta y las verifica
+    con una comparación de subcadena, de modo que el costo depende de las
+    coincidencias y no del tamaño del catálogo.
+    """
+
+    def __init__(self):
+        self.textos = []
+        self._filas_por_trigrama = defaultdict(list)
+
+    def agregar(self, valores):
+        """Indexar valores nuevos; las filas se numeran a continuación de las existentes"""
+        for valor in valores:
+            texto = normalizar_texto(valor)
+            fila = len(self.textos)
+            self.textos.append(texto)
+            for trigrama in trigramas(texto):
+                self._filas_por_trigrama[trigrama].append(fila)
+
+    def buscar(self, consulta):
+        """Filas cuyo texto contiene la consulta (ya normalizada)"""
+        if len(consulta) < 3:
+            # Sin trigramas que consultar: se recorren los textos ya normalizados
+            return [fila for fila, texto in enumerate(self.textos) if consulta in texto]
+
+        listas = [self._filas_por_trigrama.get(trigrama, []) for trigrama in trigramas(consulta)]
+        candidatas = min(listas, key=len)
+        return [fila for fila in candidatas if consulta in self.textos[fila]]
+
+
+class GestorIndiceBusqueda:
+    """Mantiene los índices de trigramas al día con el CSV, leyendo solo las filas añadidas"""
+
+    def __init__(self, campos=None):
+        self.campos = list(campos or CAMPOS_BUSQUEDA)
+        self.indices = None
+        self.version = None
+        self._filas_csv = 0
+        self._tamano_csv = 0
+        self._lock = threading.Lock()
+
+    def _actualizar(self, data_manager):
+        version = data_manager.obtener_version_datos()
+        if self.indices is not None and version == self.version:
+            return
+
+        archivo = data_manager.data_file
+        tamano = os.path.getsize(archivo) if os.path.exists(archivo) else 0
+
+        # El CSV solo crece al guardar; si se reemplazó o recortó, se reconstruye
+        if self.indices is None or tamano < self._tamano_csv:
+            self.indices = {campo: IndiceTrigramas() for campo in self.campos}
+            self._filas_csv = 0
+
+        nuevas = data_manager.cargar_filas_csv_desde(self._filas_csv)
+        for campo, indice in self.indices.items():
+            indice.agregar(nuevas[campo] if campo in nuevas.columns else [None] * len(nuevas))
+
+        self._filas_csv += len(nuevas)
+        self._tamano_csv = tamano
+        self.version = version
+
+    def buscar(self, data_manager, texto, campos=None):
+        """Posiciones (en el orden del CSV) de las filas que contienen el texto en alguno de los campos"""
+        consulta = normalizar_texto(texto).strip()
+        with self._lock:
+            self._actualizar(data_manager)
+            filas = set()
+            for campo in campos or self.campos:
+                filas.update(self.indices[campo].buscar(consulta))
+        return sorted(filas)
+
+
+_gestor_compartido = None
+
+
+def obtener_gestor_busqueda():
+    """Índice de búsqueda compartido por todo el proceso (todas las sesiones)"""
+    global _gestor_compartido
+    if _gestor_compartido is None:
+        _gestor_compartido = GestorIndiceBusqueda()
+    return _gestor_compartido
@@ -0,0 +1,148 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+
+class CacheArtefactos:
+    """Caché en disco de archivos generados (PDF, Excel), direccionada por contenido.
+
+    La clave es un hash de (tipo de exportación, filtros, columnas, versión de datos),
+    por lo que un cambio en los datos produce claves nuevas y las entradas viejas
+    terminan expulsadas por LRU al superar el tamaño máximo.
+    """
+
+    def __init__(self, directorio=None, tamano_maximo_mb=None):
+        self.directorio = directorio or os.getenv("CACHE_ARTEFACTOS_DIR", ".cache_artefactos")
+        if tamano_maximo_mb is None:
+            tamano_maximo_mb = float(os.getenv("CACHE_ARTEFACTOS_MB", "200"))
+        self.tamano_maximo_bytes = int(tamano_maximo_mb * 1024 * 1024)
+
+        self._lock = threading.Lock()
+        self.aciertos = 0
+        self.fallos = 0
+        self.bytes_ahorrados = 0
+
+        os.makedirs(self.directorio, exist_ok=True)
+
+    @staticmethod
+    def construir_clave(tipo, filtros, columnas, version_datos):
+        """Hash de (tipo, filtros, conjunto de columnas, versión de datos)"""
+        contenido = json.dumps(
+            {
+                'tipo': tipo,
+                'filtros': filtros or {},
+                'columnas': [str(col) for col in (columnas if columnas is not None else [])],
+                'version': version_datos
+            },
+            sort_keys=True, default=str
+        )
+        return hashlib.sha256(contenido.encode('utf-8')).hexdigest()
+
+    def _ruta(self, clave):
+        return os.path.join(self.directorio, f"{clave}.bin")
+
+    def obtener(self, clave):
+        """Devolver el contenido guardado para la clave, o None si no está"""
+        ruta = self._ruta(clave)
+        try:
+            with open(ruta, 'rb') as archivo:
+                contenido = archivo.read()
+            # La fecha de modificación marca el último uso (orden LRU)
+            os.utime(ruta)
+        except FileNotFoundError:
+            with self._lock:
+                self.fallos += 1
+            return None
+
+        with self._lock:
+            self.aciertos += 1
+            self.bytes_ahorrados += len(contenido)
+        return contenido
+
+    def guardar(self, clave, contenido):
+        """Guardar contenido para la clave y aplicar el límite de tamaño"""
+        if len(contenido) > self.tamano_maximo_bytes:
+            return False
+
+        # Escritura atómica: archivo temporal en el mismo directorio + rename
+        descriptor, ruta_temporal = tempfile.mkstemp(dir=self.directorio, suffix=".tmp")
+        try:
+            with os.fdopen(descriptor, 'wb') as archivo:
+                archivo.write(contenido)
+            os.replace(ruta_temporal, self._ruta(clave))
+        except Exception:
+            if os.path.exists(ruta_temporal):
+                os.remove(ruta_temporal)
+            raise
+
+        self._aplicar_limite()
+        return True
+
+    def _entradas(self):
+        entradas = []
+        for nombre in os.listdir(self.directorio):
+            if not nombre.endswith(".bin"):
+                continue
+            try:
+                info = os.stat(os.path.join(self.directorio, nombre))
+            except FileNotFoundError:
+                continue
+            entradas.append((info.st_mtime, info.st_size, nombre))
+        return entradas
+
+    def _aplicar_limite(self):
+        """Expulsar las entradas usadas hace más tiempo hasta quedar bajo el tamaño máximo"""
+        with self._lock:
+            entradas = sorted(self._entradas())
+            total = sum(tamano for _, tamano, _ in entradas)
+
+            for _, tamano, nombre in entradas:
+                if total <= self.tamano_maximo_bytes:
+                    break
+                try:
+                    os.remove(os.path.join(self.directorio, nombre))
+                except FileNotFoundError:
+                    pass
+                total -= tamano
+
+    def estadisticas(self):
+        """Tasa de aciertos, bytes ahorrados y ocupación actual"""
+        entradas = self._entradas()
+        with self._lock:
+            consultas = self.aciertos + self.fallos
+            return {
+                'aciertos': self.aciertos,
+                'fallos': self.fallos,
+                'tasa_aciertos': self.aciertos / consultas if consultas else 0.0,
+                'bytes_ahorrados': self.bytes_ahorrados,
+                'entradas': len(entradas),
+                'bytes_en_disco': sum(tamano for _, tamano, _ in entradas)
+            }
+
+
+_cache_compartida = None
+_cache_insights = None
+
+
+def obtener_cache_artefactos():
+    """Instancia de la caché compartida por todo el proceso"""
+    global _cache_compartida
+    if _cache_compartida is None:
+        _cache_compartida = CacheArtefactos()
+    return _cache_compartida
+
+
+def obtener_cache_insights():
+    """Caché de los insights del dashboard, separada de la de exportaciones
+
+    Tiene su propio directorio y límite, para que los insights y los PDF/ZIP no se
+    expulsen entre sí ni se mezclen en la tasa de aciertos del panel.
+    """
+    global _cache_insights
+    if _cache_insights is None:
+        directorio = os.getenv("CACHE_INSIGHTS_DIR") or os.path.join(
+            os.getenv("CACHE_ARTEFACTOS_DIR", ".cache_artefactos"), "insights"
+        )
+        _cache_insights = CacheArtefactos(directorio, float(os.getenv("CACHE_INSIGHTS_MB", "5")))
+    return _cache_insights
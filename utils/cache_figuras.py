@@ -0,0 +1,111 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+import pandas as pd
+import plotly.graph_objects as go
+
+class CacheFiguras:
+    """Caché LRU en memoria de figuras Plotly, compartida entre sesiones.
+
+    La clave es un hash del nombre del gráfico, sus parámetros y el agregado que lo
+    produce, de modo que un gráfico cuyos datos no cambiaron no se vuelve a construir.
+    Se guarda el JSON de la figura (su tamaño limita la memoria ocupada) y cada acierto
+    devuelve una figura nueva, de modo que una sesión no puede modificar la de otra.
+    """
+
+    def __init__(self, tamano_maximo_mb=None):
+        if tamano_maximo_mb is None:
+            tamano_maximo_mb = float(os.getenv("CACHE_FIGURAS_MB", "32"))
+        self.tamano_maximo_bytes = int(tamano_maximo_mb * 1024 * 1024)
+
+        self._entradas = OrderedDict()
+        self._bytes_en_memoria = 0
+        self._lock = threading.Lock()
+        self.aciertos = 0
+        self.fallos = 0
+
+    @staticmethod
+    def huella(nombre, datos, **parametros):
+        """Hash de (nombre del gráfico, parámetros, datos agregados)"""
+        resumen = hashlib.sha256()
+        resumen.update(json.dumps({'nombre': nombre, 'parametros': parametros}, sort_keys=True, default=str).encode('utf-8'))
+
+        for dato in datos if isinstance(datos, (list, tuple)) else [datos]:
+            if isinstance(dato, (pd.Series, pd.DataFrame)):
+                columnas = list(dato.columns) if isinstance(dato, pd.DataFrame) else [dato.name]
+                resumen.update(json.dumps([columnas, list(dato.index.names)], default=str).encode('utf-8'))
+                resumen.update(pd.util.hash_pandas_object(dato, index=True).values.tobytes())
+            else:
+                resumen.update(json.dumps(dato, sort_keys=True, default=str).encode('utf-8'))
+
+        return resumen.hexdigest()
+
+    def obtener_o_construir(self, nombre, datos, constructor, **parametros):
+        """Devolver la figura guardada para estos datos o construirla con constructor()"""
+        clave = self.huella(nombre, datos, **parametros)
+
+        with self._lock:
+            especificacion = self._entradas.get(clave)
+            if especificacion is not None:
+                self._entradas.move_to_end(clave)
+                self.aciertos += 1
+            else:
+                self.fallos += 1
+
+        if especificacion is not None:
+            return self._figura_desde_json(especificacion)
+
+        figura = constructor()
+        if figura is None:
+            return None
+
+        especificacion = figura.to_json()
+        tamano = len(especificacion)
+        if tamano > self.tamano_maximo_bytes:
+            return figura
+
+        with self._lock:
+            if clave not in self._entradas:
+                self._entradas[clave] = especificacion
+                self._bytes_en_memoria += tamano
+
+            # Expulsar las figuras usadas hace más tiempo
+            while self._bytes_en_memoria > self.tamano_maximo_bytes:
+                _, expulsada = self._entradas.popitem(last=False)
+                self._bytes_en_memoria -= len(expulsada)
+
+        return figura
+
+    @staticmethod
+    def _figura_desde_json(especificacion):
+        """Figura nueva a partir del JSON guardado
+
+        El JSON lo generó Plotly a partir de una figura ya validada, así que se omite
+        la validación (pio.from_json tarda casi lo mismo que construir la figura).
+        """
+        return go.Figure(json.loads(especificacion), _validate=False)
+
+    def estadisticas(self):
+        """Tasa de aciertos y ocupación actual"""
+        with self._lock:
+            consultas = self.aciertos + self.fallos
+            return {
+                'aciertos': self.aciertos,
+                'fallos': self.fallos,
+                'tasa_aciertos': self.aciertos / consultas if consultas else 0.0,
+                'entradas': len(self._entradas),
+                'bytes_en_memoria': self._bytes_en_memoria
+            }
+
+
+_cache_compartida = None
+
+
+def obtener_cache_figuras():
+    """Instancia de la caché de figuras compartida por todo el proceso (todas las sesiones)"""
+    global _cache_compartida
+    if _cache_compartida is None:
+        _cache_compartida = CacheFiguras()
+    return _cache_compartida
@@ -0,0 +1,256 @@
+import os
+import threading
+import time
+import numpy as np
+import pandas as pd
+
+# Dimensiones categóricas del cubo (tabla encuestas_cubo)
+DIMENSIONES_CUBO = [
+    'periodicidad_reporte', 'periodicidad_auditoria', 'departamento',
+    'criticidad', 'automatizado', 'sistema_origen'
+]
+
+SIN_ESPECIFICAR = 'Sin especificar'
+
+# Tamaño máximo del arreglo denso de un desglose (por encima se agrupan solo las celdas presentes)
+MAX_CELDAS_DENSAS = 1_000_000
+
+class CuboEncuestas:
+    """Cubo de conteos sobre las dimensiones categóricas de las encuestas.
+
+    Se guarda de forma dispersa: una fila de códigos enteros por cada combinación
+    de valores presente y su cantidad. Los cortes, pivotes y desgloses se resuelven
+    con máscaras y np.bincount sobre esas celdas, sin volver a las encuestas.
+    """
+
+    def __init__(self, dimensiones=None):
+        self.dimensiones = list(dimensiones or DIMENSIONES_CUBO)
+        self.categorias = {dim: [] for dim in self.dimensiones}
+        self._codigos_por_valor = {dim: {} for dim in self.dimensiones}
+        self.codigos = np.empty((0, len(self.dimensiones)), dtype=np.int32)
+        self.cantidades = np.empty(0, dtype=np.int64)
+
+    @classmethod
+    def desde_dataframe(cls, df, dimensiones=None):
+        """Construir el cubo agrupando las encuestas de un DataFrame"""
+        cubo = cls(dimensiones)
+        cubo.agregar(df)
+        return cubo
+
+    @classmethod
+    def desde_celdas(cls, celdas, dimensiones=None):
+        """Construir el cubo a partir de celdas ya agregadas (dimensiones + cantidad)"""
+        cubo = cls(dimensiones)
+        if not celdas.empty:
+            combinaciones = pd.DataFrame({dim: cls._normalizar(celdas[dim]) for dim in cubo.dimensiones})
+            cubo._incorporar(combinaciones, celdas['cantidad'].to_numpy(dtype=np.int64))
+        return cubo
+
+    @staticmethod
+    def _normalizar(serie):
+        valores = serie.astype(object).where(serie.notna(), '').astype(str).str.strip()
+        return valores.mask(valores == '', SIN_ESPECIFICAR)
+
+    def copia(self):
+        cubo = CuboEncuestas(self.dimensiones)
+        cubo.categorias = {dim: list(valores) for dim, valores in self.categorias.items()}
+        cubo._codigos_por_valor = {dim: dict(codigos) for dim, codigos in self._codigos_por_valor.items()}
+        cubo.codigos = self.codigos.copy()
+        cubo.cantidades = self.cantidades.copy()
+        return cubo
+
+    def agregar(self, df):
+        """Sumar al cubo las encuestas de un DataFrame (actualización incremental)"""
+        if df.empty:
+            return
+
+        combinaciones = pd.DataFrame({
+            dim: self._normalizar(df[dim]) if dim in df.columns else SIN_ESPECIFICAR
+            for dim in self.dimensiones
+        }, index=df.index)
+        celdas = combinaciones.groupby(self.dimensiones, sort=False).size()
+        self._incorporar(celdas.index.to_frame(index=False), celdas.to_numpy(dtype=np.int64))
+
+    def _codificar(self, dimension, valores):
+        codigos_por_valor = self._codigos_por_valor[dimension]
+        for valor in pd.unique(valores):
+            if valor not in codigos_por_valor:
+                codigos_por_valor[valor] = len(self.categorias[dimension])
+                self.categorias[dimension].append(valor)
+        return pd.Series(valores).map(codigos_por_valor).to_numpy(dtype=np.int32)
+
+    def _incorporar(self, combinaciones, cantidades):
+        """Fusionar combinaciones nuevas con las celdas existentes"""
+        codigos = np.column_stack([
+            self._codificar(dim, combinaciones[dim].to_numpy()) for dim in self.dimensiones
+        ])
+        todos = np.vstack([self.codigos, codigos])
+        todas_cantidades = np.concatenate([self.cantidades, cantidades])
+
+        celdas, inverso = np.unique(todos, axis=0, return_inverse=True)
+        sumas = np.bincount(inverso.ravel(), weights=todas_cantidades, minlength=len(celdas))
+
+        self.codigos = celdas.astype(np.int32)
+        self.cantidades = sumas.astype(np.int64)
+
+    @property
+    def celdas(self):
+        return len(self.cantidades)
+
+    def valores(self, dimension):
+        """Valores presentes de una dimensión, ordenados"""
+        return sorted(self.categorias[dimension])
+
+    def _mascara(self, filtros):
+        mascara = np.ones(len(self.cantidades), dtype=bool)
+        for dimension, valores in (filtros or {}).items():
+            if valores is None or len(valores) == 0:
+                continue
+            if isinstance(valores, str):
+                valores = [valores]
+            codigos = [self._codigos_por_valor[dimension][valor] for valor in valores
+                       if valor in self._codigos_por_valor[dimension]]
+            mascara &= np.isin(self.codigos[:, self.dimensiones.index(dimension)], codigos)
+        return mascara
+
+    def total(self, filtros=None):
+        """Cantidad de encuestas dentro del corte indicado"""
+        return int(self.cantidades[self._mascara(filtros)].sum())
+
+    def _sumas_densas(self, dimensiones, filtros):
+        """Arreglo denso de cantidades con un eje por dimensión (categorías en orden de código)"""
+        mascara = self._mascara(filtros)
+        posiciones = [self.dimensiones.index(dim) for dim in dimensiones]
+        tamanos = tuple(len(self.categorias[dim]) for dim in dimensiones)
+        lineal = np.ravel_multi_index(self.codigos[mascara][:, posiciones].T, tamanos)
+        sumas = np.bincount(lineal, weights=self.cantidades[mascara], minlength=int(np.prod(tamanos)))
+        return sumas.astype(np.int64).reshape(tamanos)
+
+    def conteo(self, dimensiones, filtros=None):
+        """Cantidad por combinación de las dimensiones indicadas, dentro del corte (filtros)"""
+        if isinstance(dimensiones, str):
+            dimensiones = [dimensiones]
+
+        tamanos = [len(self.categorias[dim]) for dim in dimensiones]
+        if np.prod(tamanos, dtype=np.float64) <= MAX_CELDAS_DENSAS:
+            sumas = self._sumas_densas(dimensiones, filtros).ravel()
+            claves = np.flatnonzero(sumas)
+            sumas = sumas[claves]
+        else:
+            # Demasiadas combinaciones posibles para un arreglo denso: agrupar solo las presentes
+            mascara = self._mascara(filtros)
+            posiciones = [self.dimensiones.index(dim) for dim in dimensiones]
+            lineal = np.ravel_multi_index(self.codigos[mascara][:, posiciones].T, tamanos)
+            claves, inverso = np.unique(lineal, return_inverse=True)
+            sumas = np.bincount(inverso.ravel(), weights=self.cantidades[mascara], minlength=len(claves)).astype(np.int64)
+
+        orden = np.argsort(-sumas, kind='stable')
+        claves, sumas = claves[orden], sumas[orden]
+        posiciones_valor = np.unravel_index(claves, tamanos)
+
+        if len(dimensiones) == 1:
+            etiquetas = np.asarray(self.categorias[dimensiones[0]], dtype=object)[posiciones_valor[0]]
+            indice = pd.Index(etiquetas, name=dimensiones[0])
+        else:
+            # Las categorías ya son únicas: se usan como niveles sin volver a factorizar
+            indice = pd.MultiIndex(
+                levels=[pd.Index(self.categorias[dim], dtype=object) for dim in dimensiones],
+                codes=list(posiciones_valor), names=dimensiones, verify_integrity=False
+            )
+        return pd.Series(sumas, index=indice, name='cantidad')
+
+    def pivote(self, filas, columnas=None, filtros=None, totales=True):
+        """Tabla dinámica de conteos: filas x columnas dentro del corte"""
+        if not columnas:
+            serie = self.conteo(filas, filtros)
+            valores = serie.to_numpy()
+            etiquetas = list(serie.index)
+            if totales and len(valores):
+                valores = np.append(valores, valores.sum())
+                etiquetas.append('Total')
+            return pd.DataFrame({'Cantidad': valores}, index=pd.Index(etiquetas, dtype=object, name=filas))
+
+        matriz = self._sumas_densas([filas, columnas], filtros)
+        total_filas = matriz.sum(axis=1)
+        total_columnas = matriz.sum(axis=0)
+        orden_filas = np.argsort(-total_filas, kind='stable')
+        orden_filas = orden_filas[total_filas[orden_filas] > 0]
+        orden_columnas = np.argsort(-total_columnas, kind='stable')
+        orden_columnas = orden_columnas[total_columnas[orden_columnas] > 0]
+
+        valores = matriz[np.ix_(orden_filas, orden_columnas)]
+        etiquetas_filas = list(np.asarray(self.categorias[filas], dtype=object)[orden_filas])
+        etiquetas_columnas = list(np.asarray(self.categorias[columnas], dtype=object)[orden_columnas])
+
+        if totales and valores.size:
+            valores = np.column_stack([valores, total_filas[orden_filas]])
+            valores = np.vstack([valores, np.append(total_columnas[orden_columnas], total_filas.sum())])
+            etiquetas_filas.append('Total')
+            etiquetas_columnas.append('Total')
+
+        return pd.DataFrame(
+            valores,
+            index=pd.Index(etiquetas_filas, dtype=object, name=filas),
+            columns=pd.Index(etiquetas_columnas, dtype=object, name=columnas)
+        )
+
+
+class GestorCubo:
+    """Mantiene el cubo al día con la versión de los datos.
+
+    En PostgreSQL lee la tabla encuestas_cubo (mantenida por trigger); en modo CSV
+    solo lee las filas añadidas desde la última actualización.
+    """
+
+    def __init__(self, data_manager):
+        self.data_manager = data_manager
+        self.cubo = None
+        self.version = None
+        self.ultima_actualizacion = None
+        self._filas_csv = 0
+        self._tamano_csv = 0
+        self._lock = threading.Lock()
+
+    def obtener(self):
+        """Devolver el cubo, actualizándolo si cambió la versión de los datos"""
+        version = self.data_manager.obtener_version_datos()
+        with self._lock:
+            if self.cubo is not None and version == self.version:
+                return self.cubo
+
+            inicio = time.perf_counter()
+            if self.data_manager.usar_database:
+                self.cubo = CuboEncuestas.desde_celdas(self.data_manager.obtener_celdas_cubo())
+                modo = "tabla encuestas_cubo"
+            else:
+                modo = self._actualizar_desde_csv()
+
+            self.version = version
+            self.ultima_actualizacion = {
+                'modo': modo,
+                'duracion_ms': (time.perf_counter() - inicio) * 1000,
+                'celdas': self.cubo.celdas
+            }
+            return self.cubo
+
+    def _actualizar_desde_csv(self):
+        archivo = self.data_manager.data_file
+        tamano = os.path.getsize(archivo) if os.path.exists(archivo) else 0
+
+        # El CSV solo crece al guardar; si se reemplazó o recortó, se reconstruye
+        if self.cubo is None or tamano < self._tamano_csv:
+            df = self.data_manager.cargar_datos()
+            self.cubo = CuboEncuestas.desde_dataframe(df)
+            self._filas_csv = len(df)
+            modo = "completa"
+        else:
+            nuevas = self.data_manager.cargar_filas_csv_desde(self._filas_csv)
+            # Se actualiza una copia para no alterar el cubo que otras sesiones están leyendo
+            cubo = self.cubo.copia()
+            cubo.agregar(nuevas)
+            self.cubo = cubo
+            self._filas_csv += len(nuevas)
+            modo = f"incremental (+{len(nuevas)} filas)"
+
+        self._tamano_csv = tamano
+        return modo
@@ -1,16 +1,26 @@
 import pandas as pd
 import os
+import io
 from datetime import datetime
-from utils.database import Database
+from utils.database import Database, normalizar_email, PESOS_PERIODICIDAD, PESOS_CRITICIDAD
+from utils.cache_artefactos import obtener_cache_artefactos
+from utils.busqueda import CAMPOS_BUSQUEDA, normalizar_texto, normalizar_serie, obtener_gestor_busqueda
+from utils.validacion import COLUMNAS_ENCUESTA, FORMATO_FECHA
+from utils.agregaciones import (
+    calcular_agregados, agregados_desde_grouping_sets, calcular_serie_temporal,
+    completar_serie_temporal, elegir_granularidad, calcular_rollup_diario, comparar_periodos,
+    ventanas_comparacion, GRANULARIDADES, DESGLOSES_SERIE, MAX_PUNTOS_SERIE
+)
 
 class DataManager:
-    def __init__(self):
+    def __init__(self, conexiones_maximas=None):
         self.data_file = "encuestas_reportes.csv"
         self.backup_dir = "backups"
+        self.cache_artefactos = obtener_cache_artefactos()
         
         # Inicializar base de datos PostgreSQL
         try:
-            self.db = Database()
+            self.db = Database(conexiones_maximas)
             self.usar_database = True
             
             # Migrar datos de CSV si existe y la DB está vacía
@@ -86,6 +96,36 @@ class DataManager:
         except Exception as e:
             raise Exception(f"Error al guardar los datos: {str(e)}")
     
+    def guardar_respuestas_lote(self, lote):
+        """Guardar varias respuestas nuevas (DataFrame con COLUMNAS_ENCUESTA) en una sola operación"""
+        try:
+            lote = lote[COLUMNAS_ENCUESTA].copy()
+            lote.loc[lote['fecha_envio'] == "", 'fecha_envio'] = datetime.now().strftime(FORMATO_FECHA)
+            
+            if self.usar_database:
+                return len(self.db.guardar_encuestas_lote(list(lote.itertuples(index=False, name=None))))
+            else:
+                # Un solo respaldo y una sola escritura para todo el lote
+                self._crear_backup()
+                encabezado = not os.path.exists(self.data_file) or os.path.getsize(self.data_file) == 0
+                lote.to_csv(self.data_file, mode='a', header=encabezado, index=False, encoding='utf-8')
+                return len(lote)
+                
+        except Exception as e:
+            raise Exception(f"Error al guardar los datos: {str(e)}")
+    
+    def leer_archivo_importacion(self, origen):
+        """Leer un CSV o Excel de encuestas para importar, con todas las celdas como texto"""
+        try:
+            nombre = str(getattr(origen, "name", origen)).lower()
+            if nombre.endswith((".xlsx", ".xls")):
+                return pd.read_excel(origen, dtype=str, keep_default_na=False)
+            else:
+                return pd.read_csv(origen, encoding='utf-8-sig', dtype=str, keep_default_na=False)
+            
+        except Exception as e:
+            raise Exception(f"Error al leer el archivo: {str(e)}")
+    
     def _guardar_en_csv(self, datos_encuesta):
         """Método de respaldo para guardar en CSV"""
         import csv
@@ -148,6 +188,16 @@ class DataManager:
             print(f"Error al cargar desde CSV: {str(e)}")
             return pd.DataFrame()
     
+    def cargar_filas_csv_desde(self, fila_inicial):
+        """Cargar del CSV solo las filas a partir de la posición indicada (filas añadidas)"""
+        try:
+            if not os.path.exists(self.data_file) or os.path.getsize(self.data_file) == 0:
+                return pd.DataFrame()
+            return pd.read_csv(self.data_file, encoding='utf-8', skiprows=range(1, fila_inicial + 1))
+        except Exception as e:
+            print(f"Error al cargar filas nuevas desde CSV: {str(e)}")
+            return pd.DataFrame()
+    
     def obtener_total_respuestas(self):
         """Obtener el número total de respuestas"""
         try:
@@ -160,6 +210,20 @@ class DataManager:
         except:
             return 0
     
+    def obtener_version_datos(self):
+        """Obtener una huella que cambia cada vez que cambian los datos"""
+        try:
+            if self.usar_database:
+                return self.db.obtener_version_datos()
+            elif os.path.exists(self.data_file):
+                info = os.stat(self.data_file)
+                return f"csv-{info.st_mtime_ns}-{info.st_size}"
+            else:
+                return "csv-vacio"
+        except Exception as e:
+            print(f"Error al obtener versión de datos: {str(e)}")
+            return f"sin-version-{datetime.now().isoformat()}"
+    
     def obtener_encuesta_por_id(self, encuesta_id):
         """Obtener una encuesta específica por ID"""
         if self.usar_database:
@@ -167,13 +231,41 @@ class DataManager:
         else:
             return None
     
-    def actualizar_encuesta(self, encuesta_id, datos_actualizados, usuario="Sistema"):
-        """Actualizar una encuesta existente"""
+    def buscar_encuestas_resumen(self, texto="", limite=20):
+        """Buscar encuestas por ID, nombre o responsable (solo id y datos para mostrarlas)"""
+        if self.usar_database:
+            return self.db.buscar_encuestas_resumen(texto, limite)
+        else:
+            return pd.DataFrame()
+    
+    def obtener_encuestas_por_ids(self, ids):
+        """Obtener varias encuestas por ID"""
+        if self.usar_database:
+            return self.db.obtener_encuestas_por_ids(ids)
+        else:
+            return pd.DataFrame()
+    
+    def actualizar_encuesta(self, encuesta_id, datos_actualizados, usuario="Sistema", version_esperada=None):
+        """Actualizar una encuesta existente (ConflictoEdicion si cambió desde version_esperada)"""
         if self.usar_database:
-            return self.db.actualizar_encuesta(encuesta_id, datos_actualizados, usuario)
+            return self.db.actualizar_encuesta(encuesta_id, datos_actualizados, usuario, version_esperada)
         else:
             raise Exception("La función de edición requiere PostgreSQL")
     
+    def actualizar_encuestas_lote(self, cambios, usuario="Sistema", motivo="", versiones=None):
+        """Actualizar varias encuestas en una sola transacción ({encuesta_id: {campo: valor}})"""
+        if self.usar_database:
+            return self.db.actualizar_encuestas_lote(cambios, usuario, motivo, versiones)
+        else:
+            raise Exception("La función de edición requiere PostgreSQL")
+    
+    def obtener_encuestas_para_edicion(self, departamento=None, texto=None, limite=500):
+        """Obtener las encuestas filtradas con sus campos editables"""
+        if self.usar_database:
+            return self.db.obtener_encuestas_para_edicion(departamento, texto, limite)
+        else:
+            return pd.DataFrame()
+    
     def obtener_historial(self, encuesta_id):
         """Obtener historial de cambios de una encuesta"""
         if self.usar_database:
@@ -181,6 +273,38 @@ class DataManager:
         else:
             return pd.DataFrame()
     
+    def obtener_sesiones_historial(self, encuesta_id, limite=10, offset=0):
+        """Obtener una página del historial agrupado en sesiones de edición y el total de sesiones"""
+        if self.usar_database:
+            return self.db.obtener_sesiones_historial(encuesta_id, limite, offset)
+        else:
+            return pd.DataFrame(), 0
+    
+    def obtener_cambio_historial(self, cambio_id):
+        """Obtener un cambio del historial con sus valores completos"""
+        if self.usar_database:
+            return self.db.obtener_cambio_historial(cambio_id)
+        else:
+            return None
+    
+    def obtener_encuesta_en_fecha(self, encuesta_id, fecha):
+        """Obtener una encuesta tal como estaba en una fecha (None si aún no existía)"""
+        if self.usar_database:
+            return self.db.obtener_encuesta_en_fecha(encuesta_id, fecha)
+        else:
+            return None
+    
+    def obtener_catalogo_en_fecha(self, fecha):
+        """Obtener todas las encuestas tal como estaban en una fecha"""
+        if self.usar_database:
+            return self.db.obtener_catalogo_en_fecha(fecha)
+        
+        # En CSV las encuestas no se editan: basta con las enviadas hasta la fecha
+        df = self.cargar_datos()
+        if df.empty or 'fecha_envio' not in df.columns:
+            return df
+        return df[pd.to_datetime(df['fecha_envio'], errors='coerce') <= pd.Timestamp(fecha)]
+    
     def eliminar_encuesta(self, encuesta_id):
         """Eliminar una encuesta"""
         if self.usar_database:
@@ -188,6 +312,71 @@ class DataManager:
         else:
             raise Exception("La función de eliminación requiere PostgreSQL")
     
+    def cargar_lista_invitados(self, origen, columna_email="email"):
+        """Cargar la lista de emails invitados desde un CSV, Excel o DataFrame"""
+        try:
+            if isinstance(origen, pd.DataFrame):
+                df = origen
+            else:
+                nombre = str(getattr(origen, "name", origen)).lower()
+                if nombre.endswith((".xlsx", ".xls")):
+                    df = pd.read_excel(origen)
+                else:
+                    df = pd.read_csv(origen, encoding='utf-8')
+            
+            if columna_email not in df.columns:
+                # Usar la primera columna cuyo nombre contenga "email"
+                candidatas = [col for col in df.columns if "email" in str(col).lower()]
+                if not candidatas:
+                    raise Exception(f"No se encontró la columna '{columna_email}' en la lista de invitados")
+                columna_email = candidatas[0]
+            
+            return df[columna_email].dropna().astype(str).str.strip().loc[lambda s: s != ""].tolist()
+            
+        except Exception as e:
+            raise Exception(f"Error al cargar la lista de invitados: {str(e)}")
+    
+    def obtener_no_respondientes(self, emails_invitados, emails_suprimidos=None):
+        """Obtener los invitados que aún no han respondido la encuesta"""
+        if self.usar_database:
+            return self.db.obtener_no_respondientes(emails_invitados, emails_suprimidos)
+        
+        # Fallback CSV: diferencia de conjuntos sobre emails normalizados
+        df = self._cargar_desde_csv()
+        respondientes = set()
+        if 'email_responsable' in df.columns:
+            respondientes = set(df['email_responsable'].map(normalizar_email))
+        excluidos = respondientes | {normalizar_email(email) for email in (emails_suprimidos or [])}
+        
+        pendientes = {}
+        for email in emails_invitados:
+            email_normalizado = normalizar_email(email)
+            if email_normalizado and email_normalizado not in excluidos:
+                pendientes.setdefault(email_normalizado, str(email).strip())
+        
+        return [pendientes[clave] for clave in sorted(pendientes)]
+    
+    def agregar_email_suprimido(self, email, motivo=""):
+        """Agregar un email a la lista de supresión de recordatorios"""
+        if self.usar_database:
+            return self.db.agregar_email_suprimido(email, motivo)
+        else:
+            raise Exception("La lista de supresión requiere PostgreSQL")
+    
+    def eliminar_email_suprimido(self, email):
+        """Quitar un email de la lista de supresión de recordatorios"""
+        if self.usar_database:
+            return self.db.eliminar_email_suprimido(email)
+        else:
+            raise Exception("La lista de supresión requiere PostgreSQL")
+    
+    def obtener_emails_suprimidos(self):
+        """Obtener la lista de supresión de recordatorios"""
+        if self.usar_database:
+            return self.db.obtener_emails_suprimidos()
+        else:
+            return pd.DataFrame()
+    
     def _crear_backup(self):
         """Crear backup del archivo de datos CSV"""
         try:
@@ -218,6 +407,14 @@ class DataManager:
     def buscar_por_criterio(self, criterio, valor):
         """Buscar encuestas por un criterio específico"""
         try:
+            if criterio in CAMPOS_BUSQUEDA:
+                # Campos indexados: sin mayúsculas ni acentos, sin recorrer todo el catálogo
+                if self.usar_database:
+                    return self.db.obtener_encuestas_por_ids(self.db.buscar_ids_por_texto(valor, [criterio]))
+                filas = obtener_gestor_busqueda().buscar(self, valor, [criterio])
+                df = self.cargar_datos()
+                return df[df.index.isin(filas)]
+            
             df = self.cargar_datos()
             if df.empty:
                 return df
@@ -232,6 +429,34 @@ class DataManager:
             print(f"Error en búsqueda: {str(e)}")
             return pd.DataFrame()
     
+    def buscar_texto_completo(self, consulta, limite=10, offset=0):
+        """Búsqueda de texto completo en nombre, descripción, auditoría, stakeholders y observaciones"""
+        if self.usar_database:
+            return self.db.buscar_texto_completo(consulta, limite, offset)
+        else:
+            raise Exception("La búsqueda de texto completo requiere PostgreSQL")
+    
+    def filtrar_por_texto(self, df, texto):
+        """Encuestas de df (cargado con cargar_datos) que contienen el texto en nombre, responsable o sistema"""
+        texto = (texto or "").strip()
+        if not texto or df.empty:
+            return df
+        
+        try:
+            if self.usar_database:
+                return df[df['id'].isin(self.db.buscar_ids_por_texto(texto))]
+            else:
+                # Las posiciones del índice coinciden con el índice de cargar_datos()
+                return df[df.index.isin(obtener_gestor_busqueda().buscar(self, texto))]
+        except Exception as e:
+            print(f"Error en búsqueda indexada, se recorren los datos: {str(e)}")
+            consulta = normalizar_texto(texto)
+            mascara = pd.Series(False, index=df.index)
+            for campo in CAMPOS_BUSQUEDA:
+                if campo in df.columns:
+                    mascara |= normalizar_serie(df[campo]).str.contains(consulta, regex=False)
+            return df[mascara]
+    
     def obtener_estadisticas(self):
         """Obtener estadísticas básicas de los datos"""
         try:
@@ -256,10 +481,144 @@ class DataManager:
             print(f"Error al calcular estadísticas: {str(e)}")
             return {}
     
-    def exportar_a_excel(self, df=None, filename=None):
+    def obtener_agregados(self, df=None):
+        """Obtener los conteos de todo el catálogo (una consulta GROUPING SETS o una pasada sobre los datos)
+        
+        df evita volver a leer el CSV cuando ya se cargaron los datos; en PostgreSQL se ignora.
+        """
+        if self.usar_database:
+            try:
+                return agregados_desde_grouping_sets(self.db.obtener_agregados())
+            except Exception as e:
+                print(f"Error al calcular agregados en la base de datos: {str(e)}")
+        
+        return calcular_agregados(df if df is not None else self.cargar_datos())
+    
+    def obtener_serie_temporal(self, granularidad='auto', desglose=None, df=None, max_puntos=MAX_PUNTOS_SERIE):
+        """Obtener el conteo de encuestas por día, semana, mes o trimestre
+        
+        Con granularidad 'auto' se elige la más fina que no supere max_puntos periodos.
+        Devuelve (serie, granularidad usada).
+        """
+        if granularidad != 'auto' and granularidad not in GRANULARIDADES:
+            raise Exception(f"Granularidad no soportada: {granularidad}")
+        if desglose not in (None, *DESGLOSES_SERIE):
+            raise Exception(f"Desglose no soportado: {desglose}")
+        
+        if self.usar_database:
+            try:
+                if granularidad == 'auto':
+                    granularidad = elegir_granularidad(*self.db.obtener_rango_fechas(), max_puntos)
+                serie = self.db.obtener_serie_temporal(GRANULARIDADES[granularidad][0], desglose)
+                return completar_serie_temporal(serie, granularidad, desglose), granularidad
+            except Exception as e:
+                print(f"Error al calcular la serie temporal en la base de datos: {str(e)}")
+        
+        datos = df if df is not None else self.cargar_datos()
+        return calcular_serie_temporal(datos, granularidad, desglose, max_puntos)
+    
+    def obtener_prioridades_automatizacion(self, limite=10, offset=0, departamento=None, df=None):
+        """Obtener los reportes no automatizados ordenados por prioridad (paginado) y el total"""
+        if self.usar_database:
+            return self.db.obtener_prioridades_automatizacion(limite, offset, departamento)
+        
+        datos = df if df is not None else self.cargar_datos()
+        if datos.empty or 'automatizado' not in datos.columns:
+            return pd.DataFrame(), 0
+        
+        candidatos = datos[datos['automatizado'] == 'No']
+        if departamento:
+            candidatos = candidatos[candidatos['departamento'] == departamento]
+        
+        prioridad = (
+            candidatos['periodicidad_reporte'].map(PESOS_PERIODICIDAD).fillna(0) +
+            candidatos['criticidad'].map(PESOS_CRITICIDAD).fillna(0)
+        ).astype(int)
+        
+        # Solo se ordenan los primeros offset + limite
+        columnas = [col for col in ['nombre_reporte', 'periodicidad_reporte', 'criticidad',
+                                    'departamento', 'persona_responsable'] if col in candidatos.columns]
+        seleccion = prioridad.nlargest(offset + limite, keep='first').iloc[offset:]
+        pagina = candidatos.loc[seleccion.index, columnas].assign(prioridad_automatizacion=seleccion)
+        
+        return pagina.reset_index(drop=True), len(candidatos)
+    
+    def obtener_pesos_prioridad(self):
+        """Obtener los pesos de periodicidad y criticidad usados para priorizar"""
+        if self.usar_database:
+            return self.db.obtener_pesos_prioridad()
+        else:
+            return dict(PESOS_PERIODICIDAD), dict(PESOS_CRITICIDAD)
+    
+    def guardar_pesos_prioridad(self, pesos_periodicidad, pesos_criticidad):
+        """Guardar los pesos de priorización"""
+        if self.usar_database:
+            return self.db.guardar_pesos_prioridad(pesos_periodicidad, pesos_criticidad)
+        else:
+            raise Exception("La configuración de pesos requiere PostgreSQL")
+    
+    def obtener_celdas_cubo(self):
+        """Obtener las celdas del cubo de conteos mantenido en PostgreSQL"""
+        if self.usar_database:
+            return self.db.obtener_celdas_cubo()
+        else:
+            raise Exception("La tabla del cubo requiere PostgreSQL")
+    
+    def obtener_rollup_diario(self, desde=None, hasta=None, df=None):
+        """Obtener el conteo de encuestas por día y dimensiones principales"""
+        if self.usar_database:
+            try:
+                return self.db.obtener_rollup_diario(desde, hasta)
+            except Exception as e:
+                print(f"Error al leer el rollup diario: {str(e)}")
+        
+        datos = df if df is not None else self.cargar_datos()
+        return calcular_rollup_diario(datos, desde, hasta)
+    
+    def obtener_comparacion_periodos(self, dias=7, df=None):
+        """Comparar las encuestas de los últimos `dias` días con las del periodo anterior"""
+        inicio_anterior, _, fin = ventanas_comparacion(dias)
+        rollup = self.obtener_rollup_diario(inicio_anterior, fin, df)
+        return comparar_periodos(rollup, dias)
+    
+    def generar_excel_resumen(self, df, filtros=None, version_datos=None):
+        """Generar un libro Excel (encuestas + hoja de resumen) en memoria"""
+        clave_cache = None
+        if version_datos is not None:
+            clave_cache = self.cache_artefactos.construir_clave('excel_resumen', filtros, df.columns, version_datos)
+            contenido = self.cache_artefactos.obtener(clave_cache)
+            if contenido is not None:
+                return contenido
+        
+        excel_buffer = io.BytesIO()
+        with pd.ExcelWriter(excel_buffer, engine='openpyxl') as writer:
+            df.to_excel(writer, sheet_name='Encuestas', index=False)
+            
+            # Crear hoja de resumen
+            resumen_data = {
+                'Métrica': ['Total Encuestas', 'Encuestas Críticas', 'Departamentos Únicos', 'Sistemas Únicos'],
+                'Valor': [
+                    len(df),
+                    len(df[df['criticidad'] == 'Alto']) if 'criticidad' in df.columns else 0,
+                    df['departamento'].nunique() if 'departamento' in df.columns else 0,
+                    df['sistema_origen'].nunique() if 'sistema_origen' in df.columns else 0
+                ]
+            }
+            pd.DataFrame(resumen_data).to_excel(writer, sheet_name='Resumen', index=False)
+        
+        contenido = excel_buffer.getvalue()
+        if clave_cache is not None:
+            self.cache_artefactos.guardar(clave_cache, contenido)
+        
+        return contenido
+    
+    def exportar_a_excel(self, df=None, filename=None, filtros=None, version_datos=None):
         """Exportar datos a Excel con múltiples hojas"""
         try:
             if df is None:
+                # Catálogo completo: la versión de datos identifica el contenido
+                if version_datos is None:
+                    version_datos = self.obtener_version_datos()
                 df = self.cargar_datos()
                 
             if df.empty:
@@ -268,7 +627,18 @@ class DataManager:
             if filename is None:
                 filename = f"encuestas_reportes_export_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
             
-            with pd.ExcelWriter(filename, engine='openpyxl') as writer:
+            # Reutilizar el libro si ya se generó con los mismos datos, filtros y columnas
+            clave_cache = None
+            if version_datos is not None:
+                clave_cache = self.cache_artefactos.construir_clave('excel_completo', filtros, df.columns, version_datos)
+                contenido = self.cache_artefactos.obtener(clave_cache)
+                if contenido is not None:
+                    with open(filename, 'wb') as archivo:
+                        archivo.write(contenido)
+                    return filename
+            
+            excel_buffer = io.BytesIO()
+            with pd.ExcelWriter(excel_buffer, engine='openpyxl') as writer:
                 # Hoja principal con todos los datos
                 df.to_excel(writer, sheet_name='Todas las Encuestas', index=False)
                 
@@ -285,6 +655,13 @@ class DataManager:
                     stats_df = pd.DataFrame(list(stats.items()), columns=['Métrica', 'Valor'])
                     stats_df.to_excel(writer, sheet_name='Estadísticas', index=False)
             
+            contenido = excel_buffer.getvalue()
+            with open(filename, 'wb') as archivo:
+                archivo.write(contenido)
+            
+            if clave_cache is not None:
+                self.cache_artefactos.guardar(clave_cache, contenido)
+            
             return filename
             
         except Exception as e:
@@ -1,34 +1,150 @@
 import psycopg2
+import psycopg2.errors
 import os
+import threading
 from datetime import datetime
 import pandas as pd
 from contextlib import contextmanager
+from psycopg2.extras import execute_values
+from psycopg2.pool import ThreadedConnectionPool
+from utils.busqueda import CAMPOS_BUSQUEDA, CON_ACENTO, SIN_ACENTO
+from utils.validacion import COLUMNAS_ENCUESTA
+
+def normalizar_email(email):
+    """Normalizar un email para comparaciones (sin espacios y en minúsculas)"""
+    if email is None or pd.isna(email):
+        return ""
+    return str(email).strip().lower()
+
+def escapar_patron_like(texto):
+    """Escapar los comodines de LIKE que pueda traer un texto de búsqueda"""
+    return texto.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+# Caracteres de cada valor del historial que se muestran antes de pedirlo completo
+MAX_CARACTERES_HISTORIAL = 200
+
+# Columnas editables cuyo valor anterior queda en historial_cambios
+COLUMNAS_CON_HISTORIAL = [
+    'nombre_reporte', 'periodicidad_reporte', 'sistema_origen', 'persona_responsable',
+    'email_responsable', 'auditoria_utilizacion', 'periodicidad_auditoria', 'departamento',
+    'criticidad', 'formato_entrega', 'descripcion_reporte', 'stakeholders', 'automatizado',
+    'observaciones'
+]
+
+# Orden de inserción de los lotes: clave de encuestas_cubo y luego la fecha (rollup diario)
+ORDEN_INSERCION_LOTE = [
+    'periodicidad_reporte', 'periodicidad_auditoria', 'departamento',
+    'criticidad', 'automatizado', 'sistema_origen', 'fecha_envio'
+]
+
+# Reintentos de un lote abortado por interbloqueo
+INTENTOS_INTERBLOQUEO = 3
+
+# Advisory lock que serializa la inicialización del esquema entre procesos
+CLAVE_BLOQUEO_INICIALIZACION = 7_300_414_001
+
+# Pesos iniciales para priorizar la automatización (tablas pesos_periodicidad y pesos_criticidad)
+PESOS_PERIODICIDAD = {'Diario': 5, 'Semanal': 4, 'Quincenal': 3, 'Mensual': 2, 'Bimestral': 1, 'Trimestral': 1}
+PESOS_CRITICIDAD = {'Alto': 3, 'Medio': 2, 'Bajo': 1}
+
+class ConflictoEdicion(Exception):
+    """Una o más encuestas cambiaron después de que se cargaron para editarlas
+
+    conflictos: {encuesta_id: {'version': versión actual, 'valores': {campo: valor actual}}}
+    """
+    def __init__(self, conflictos):
+        self.conflictos = conflictos
+        ids = ', '.join(str(encuesta_id) for encuesta_id in sorted(conflictos))
+        super().__init__(f"Las encuestas {ids} fueron modificadas por otro usuario")
 
 class Database:
-    def __init__(self):
+    def __init__(self, conexiones_maximas=None):
         self.database_url = os.getenv("DATABASE_URL")
         if not self.database_url:
             raise Exception("DATABASE_URL no está configurada")
+        
+        # Pool opcional para procesos de larga duración con muchos hilos (servicio de ingesta)
+        self._pool = None
+        if conexiones_maximas:
+            # minconn = maxconn: psycopg2 cierra al devolverlas las conexiones que exceden minconn
+            self._pool = ThreadedConnectionPool(conexiones_maximas, conexiones_maximas, self.database_url)
+            # getconn falla si el pool está agotado; el semáforo hace esperar a los hilos de más
+            self._conexiones_libres = threading.BoundedSemaphore(conexiones_maximas)
+        
         self._inicializar_tablas()
     
     @contextmanager
     def get_connection(self):
         """Context manager para conexiones a la base de datos"""
-        conn = psycopg2.connect(self.database_url)
+        if self._pool is not None:
+            self._conexiones_libres.acquire()
+            try:
+                conn = self._pool.getconn()
+            except Exception:
+                self._conexiones_libres.release()
+                raise
+        else:
+            conn = psycopg2.connect(self.database_url)
         try:
             yield conn
             conn.commit()
         except Exception as e:
-            conn.rollback()
+            if not conn.closed:
+                conn.rollback()
             raise e
         finally:
-            conn.close()
+            if self._pool is not None:
+                self._pool.putconn(conn, close=bool(conn.closed))
+                self._conexiones_libres.release()
+            else:
+                conn.close()
+    
+    def cerrar(self):
+        """Cerrar las conexiones del pool, si lo hay"""
+        if self._pool is not None:
+            self._pool.closeall()
+    
+    def _existe_relacion(self, cursor, nombre):
+        """Si existe la tabla o el índice en el esquema actual (consulta al catálogo, sin bloquear la tabla)"""
+        cursor.execute("SELECT to_regclass(%s) IS NOT NULL", (nombre,))
+        return cursor.fetchone()[0]
+    
+    def _existe_trigger(self, cursor, tabla, nombre):
+        """Si la tabla ya tiene el trigger"""
+        cursor.execute(
+            "SELECT EXISTS (SELECT 1 FROM pg_trigger WHERE tgrelid = to_regclass(%s) AND tgname = %s)",
+            (tabla, nombre)
+        )
+        return cursor.fetchone()[0]
+    
+    def _existe_columna(self, cursor, tabla, columna):
+        """Si la tabla del esquema actual ya tiene la columna"""
+        cursor.execute("""
+            SELECT EXISTS (
+                SELECT 1 FROM information_schema.columns
+                WHERE table_schema = current_schema() AND table_name = %s AND column_name = %s
+            )
+        """, (tabla, columna))
+        return cursor.fetchone()[0]
+    
+    def _crear_indice(self, cursor, nombre, definicion):
+        """Crear un índice solo si no existe (CREATE INDEX IF NOT EXISTS bloquea la tabla aunque ya exista)"""
+        if not self._existe_relacion(cursor, nombre):
+            cursor.execute(f"CREATE INDEX IF NOT EXISTS {nombre} {definicion}")
     
     def _inicializar_tablas(self):
-        """Crear tablas si no existen"""
+        """Crear tablas si no existen
+        
+        Se ejecuta en cada instancia (cada página la crea al cargarse): los triggers,
+        columnas e índices que ya existen no se vuelven a crear, para no tomar bloqueos
+        sobre encuestas que dejarían en espera a las lecturas y a la ingesta.
+        """
         with self.get_connection() as conn:
             cursor = conn.cursor()
             
+            # Serializa las inicializaciones concurrentes (comprobaciones de existencia y cargas iniciales)
+            cursor.execute("SELECT pg_advisory_xact_lock(%s)", (CLAVE_BLOQUEO_INICIALIZACION,))
+            
             # Tabla principal de encuestas
             cursor.execute("""
                 CREATE TABLE IF NOT EXISTS encuestas (
@@ -53,11 +169,12 @@ class Database:
                 )
             """)
             
-            # Tabla de historial de cambios
+            # Tabla de historial de cambios (sin clave foránea: el historial de una encuesta
+            # eliminada se conserva para reconstruirla en fechas anteriores a su eliminación)
             cursor.execute("""
                 CREATE TABLE IF NOT EXISTS historial_cambios (
                     id SERIAL PRIMARY KEY,
-                    encuesta_id INTEGER REFERENCES encuestas(id) ON DELETE CASCADE,
+                    encuesta_id INTEGER,
                     campo_modificado VARCHAR(200),
                     valor_anterior TEXT,
                     valor_nuevo TEXT,
@@ -68,29 +185,474 @@ class Database:
             """)
             
             # Índices para mejorar rendimiento
-            cursor.execute("""
-                CREATE INDEX IF NOT EXISTS idx_encuestas_departamento 
+            self._crear_indice(cursor, "idx_encuestas_departamento", """
                 ON encuestas(departamento)
             """)
             
-            cursor.execute("""
-                CREATE INDEX IF NOT EXISTS idx_encuestas_criticidad 
+            self._crear_indice(cursor, "idx_encuestas_criticidad", """
                 ON encuestas(criticidad)
             """)
             
-            cursor.execute("""
-                CREATE INDEX IF NOT EXISTS idx_encuestas_fecha 
+            self._crear_indice(cursor, "idx_encuestas_fecha", """
                 ON encuestas(fecha_envio)
             """)
             
+            # Historial por encuesta, del cambio más reciente al más antiguo
+            self._crear_indice(cursor, "idx_historial_encuesta_fecha", """
+                ON historial_cambios(encuesta_id, fecha_modificacion DESC)
+            """)
+            cursor.execute("DROP INDEX IF EXISTS idx_historial_encuesta")
+            
+            # Reconstrucciones "a una fecha" de todo el catálogo
+            self._crear_indice(cursor, "idx_historial_fecha", """
+                ON historial_cambios(fecha_modificacion)
+            """)
+            
+            # Índice por email normalizado para cruzar con listas de invitados
+            self._crear_indice(cursor, "idx_encuestas_email_normalizado", """
+                ON encuestas(LOWER(TRIM(email_responsable)))
+            """)
+            
+            # Lista de supresión de recordatorios
             cursor.execute("""
-                CREATE INDEX IF NOT EXISTS idx_historial_encuesta 
-                ON historial_cambios(encuesta_id)
+                CREATE TABLE IF NOT EXISTS emails_suprimidos (
+                    email_normalizado VARCHAR(300) PRIMARY KEY,
+                    motivo TEXT,
+                    fecha_registro TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
             """)
             
+            # Rollup diario por dimensiones principales, mantenido por trigger
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS encuestas_rollup_diario (
+                    dia DATE NOT NULL,
+                    departamento VARCHAR(200) NOT NULL DEFAULT '',
+                    criticidad VARCHAR(50) NOT NULL DEFAULT '',
+                    periodicidad_reporte VARCHAR(100) NOT NULL DEFAULT '',
+                    automatizado VARCHAR(50) NOT NULL DEFAULT '',
+                    cantidad INTEGER NOT NULL DEFAULT 0,
+                    PRIMARY KEY (dia, departamento, criticidad, periodicidad_reporte, automatizado)
+                )
+            """)
+            
+            cursor.execute("""
+                CREATE OR REPLACE FUNCTION actualizar_rollup_diario() RETURNS TRIGGER AS $$
+                BEGIN
+                    IF TG_OP = 'UPDATE'
+                       AND OLD.fecha_envio::date = NEW.fecha_envio::date
+                       AND OLD.departamento IS NOT DISTINCT FROM NEW.departamento
+                       AND OLD.criticidad IS NOT DISTINCT FROM NEW.criticidad
+                       AND OLD.periodicidad_reporte IS NOT DISTINCT FROM NEW.periodicidad_reporte
+                       AND OLD.automatizado IS NOT DISTINCT FROM NEW.automatizado THEN
+                        RETURN NULL;
+                    END IF;
+                    
+                    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+                        UPDATE encuestas_rollup_diario
+                        SET cantidad = cantidad - 1
+                        WHERE dia = OLD.fecha_envio::date
+                          AND departamento = COALESCE(OLD.departamento, '')
+                          AND criticidad = COALESCE(OLD.criticidad, '')
+                          AND periodicidad_reporte = COALESCE(OLD.periodicidad_reporte, '')
+                          AND automatizado = COALESCE(OLD.automatizado, '');
+                        
+                        DELETE FROM encuestas_rollup_diario
+                        WHERE dia = OLD.fecha_envio::date
+                          AND departamento = COALESCE(OLD.departamento, '')
+                          AND criticidad = COALESCE(OLD.criticidad, '')
+                          AND periodicidad_reporte = COALESCE(OLD.periodicidad_reporte, '')
+                          AND automatizado = COALESCE(OLD.automatizado, '')
+                          AND cantidad <= 0;
+                    END IF;
+                    
+                    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                        INSERT INTO encuestas_rollup_diario (
+                            dia, departamento, criticidad, periodicidad_reporte, automatizado, cantidad
+                        ) VALUES (
+                            NEW.fecha_envio::date, COALESCE(NEW.departamento, ''), COALESCE(NEW.criticidad, ''),
+                            COALESCE(NEW.periodicidad_reporte, ''), COALESCE(NEW.automatizado, ''), 1
+                        )
+                        ON CONFLICT (dia, departamento, criticidad, periodicidad_reporte, automatizado)
+                        DO UPDATE SET cantidad = encuestas_rollup_diario.cantidad + 1;
+                    END IF;
+                    
+                    RETURN NULL;
+                END;
+                $$ LANGUAGE plpgsql
+            """)
+            
+            if not self._existe_trigger(cursor, 'encuestas', 'trg_encuestas_rollup_diario'):
+                cursor.execute("""
+                    CREATE TRIGGER trg_encuestas_rollup_diario
+                    AFTER INSERT OR UPDATE OR DELETE ON encuestas
+                    FOR EACH ROW EXECUTE FUNCTION actualizar_rollup_diario()
+                """)
+                
+                # Carga inicial del rollup para encuestas existentes (CREATE TRIGGER impide
+                # escrituras en encuestas hasta el final de la transacción)
+                self._reconstruir_rollup_diario(cursor)
+            
+            # Cubo de conteos por las dimensiones categóricas, mantenido por trigger
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS encuestas_cubo (
+                    periodicidad_reporte VARCHAR(100) NOT NULL DEFAULT '',
+                    periodicidad_auditoria VARCHAR(100) NOT NULL DEFAULT '',
+                    departamento VARCHAR(200) NOT NULL DEFAULT '',
+                    criticidad VARCHAR(50) NOT NULL DEFAULT '',
+                    automatizado VARCHAR(50) NOT NULL DEFAULT '',
+                    sistema_origen VARCHAR(300) NOT NULL DEFAULT '',
+                    cantidad INTEGER NOT NULL DEFAULT 0,
+                    PRIMARY KEY (periodicidad_reporte, periodicidad_auditoria, departamento,
+                                 criticidad, automatizado, sistema_origen)
+                )
+            """)
+            
+            cursor.execute("""
+                CREATE OR REPLACE FUNCTION actualizar_cubo_encuestas() RETURNS TRIGGER AS $$
+                BEGIN
+                    IF TG_OP = 'UPDATE'
+                       AND OLD.periodicidad_reporte IS NOT DISTINCT FROM NEW.periodicidad_reporte
+                       AND OLD.periodicidad_auditoria IS NOT DISTINCT FROM NEW.periodicidad_auditoria
+                       AND OLD.departamento IS NOT DISTINCT FROM NEW.departamento
+                       AND OLD.criticidad IS NOT DISTINCT FROM NEW.criticidad
+                       AND OLD.automatizado IS NOT DISTINCT FROM NEW.automatizado
+                       AND OLD.sistema_origen IS NOT DISTINCT FROM NEW.sistema_origen THEN
+                        RETURN NULL;
+                    END IF;
+                    
+                    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+                        UPDATE encuestas_cubo
+                        SET cantidad = cantidad - 1
+                        WHERE periodicidad_reporte = COALESCE(OLD.periodicidad_reporte, '')
+                          AND periodicidad_auditoria = COALESCE(OLD.periodicidad_auditoria, '')
+                          AND departamento = COALESCE(OLD.departamento, '')
+                          AND criticidad = COALESCE(OLD.criticidad, '')
+                          AND automatizado = COALESCE(OLD.automatizado, '')
+                          AND sistema_origen = COALESCE(OLD.sistema_origen, '');
+                        
+                        DELETE FROM encuestas_cubo
+                        WHERE periodicidad_reporte = COALESCE(OLD.periodicidad_reporte, '')
+                          AND periodicidad_auditoria = COALESCE(OLD.periodicidad_auditoria, '')
+                          AND departamento = COALESCE(OLD.departamento, '')
+                          AND criticidad = COALESCE(OLD.criticidad, '')
+                          AND automatizado = COALESCE(OLD.automatizado, '')
+                          AND sistema_origen = COALESCE(OLD.sistema_origen, '')
+                          AND cantidad <= 0;
+                    END IF;
+                    
+                    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                        INSERT INTO encuestas_cubo (
+                            periodicidad_reporte, periodicidad_auditoria, departamento,
+                            criticidad, automatizado, sistema_origen, cantidad
+                        ) VALUES (
+                            COALESCE(NEW.periodicidad_reporte, ''), COALESCE(NEW.periodicidad_auditoria, ''),
+                            COALESCE(NEW.departamento, ''), COALESCE(NEW.criticidad, ''),
+                            COALESCE(NEW.automatizado, ''), COALESCE(NEW.sistema_origen, ''), 1
+                        )
+                        ON CONFLICT (periodicidad_reporte, periodicidad_auditoria, departamento,
+                                     criticidad, automatizado, sistema_origen)
+                        DO UPDATE SET cantidad = encuestas_cubo.cantidad + 1;
+                    END IF;
+                    
+                    RETURN NULL;
+                END;
+                $$ LANGUAGE plpgsql
+            """)
+            
+            if not self._existe_trigger(cursor, 'encuestas', 'trg_encuestas_cubo'):
+                cursor.execute("""
+                    CREATE TRIGGER trg_encuestas_cubo
+                    AFTER INSERT OR UPDATE OR DELETE ON encuestas
+                    FOR EACH ROW EXECUTE FUNCTION actualizar_cubo_encuestas()
+                """)
+                
+                # Carga inicial del cubo para encuestas existentes
+                self._reconstruir_cubo(cursor)
+            
+            # Versión de la fila para detectar ediciones concurrentes; la incrementa cada UPDATE de la aplicación
+            if not self._existe_columna(cursor, 'encuestas', 'version'):
+                cursor.execute("ALTER TABLE encuestas ADD COLUMN version INTEGER NOT NULL DEFAULT 1")
+            
+            self._inicializar_eliminadas(cursor)
+            self._inicializar_prioridad_automatizacion(cursor)
+            self._inicializar_busqueda(cursor)
+            self._inicializar_texto_completo(cursor)
+            
             conn.commit()
             cursor.close()
     
+    def _inicializar_eliminadas(self, cursor):
+        """Registro de encuestas eliminadas (fila completa y fecha), mantenido por trigger"""
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS encuestas_eliminadas (
+                id INTEGER PRIMARY KEY,
+                datos JSONB NOT NULL,
+                fecha_eliminacion TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        
+        cursor.execute("""
+            CREATE OR REPLACE FUNCTION registrar_encuesta_eliminada() RETURNS TRIGGER AS $$
+            BEGIN
+                INSERT INTO encuestas_eliminadas (id, datos, fecha_eliminacion)
+                VALUES (OLD.id, to_jsonb(OLD), CURRENT_TIMESTAMP)
+                ON CONFLICT (id) DO UPDATE
+                SET datos = EXCLUDED.datos, fecha_eliminacion = EXCLUDED.fecha_eliminacion;
+                RETURN NULL;
+            END;
+            $$ LANGUAGE plpgsql
+        """)
+        
+        if not self._existe_trigger(cursor, 'encuestas', 'trg_encuestas_eliminadas'):
+            cursor.execute("""
+                CREATE TRIGGER trg_encuestas_eliminadas
+                AFTER DELETE ON encuestas
+                FOR EACH ROW EXECUTE FUNCTION registrar_encuesta_eliminada()
+            """)
+        
+        # Versiones anteriores: el historial se borraba en cascada con la encuesta
+        cursor.execute("""
+            SELECT conname FROM pg_constraint
+            WHERE conrelid = to_regclass('historial_cambios') AND confrelid = to_regclass('encuestas')
+              AND contype = 'f'
+        """)
+        for (restriccion,) in cursor.fetchall():
+            cursor.execute(f'ALTER TABLE historial_cambios DROP CONSTRAINT "{restriccion}"')
+    
+    def _inicializar_prioridad_automatizacion(self, cursor):
+        """Tablas de pesos y columna prioridad_automatizacion mantenida por trigger"""
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS pesos_periodicidad (
+                periodicidad VARCHAR(100) PRIMARY KEY,
+                peso INTEGER NOT NULL DEFAULT 0
+            )
+        """)
+        
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS pesos_criticidad (
+                criticidad VARCHAR(50) PRIMARY KEY,
+                peso INTEGER NOT NULL DEFAULT 0
+            )
+        """)
+        
+        # Valores iniciales solo en tablas vacías: no se pisan los pesos ya configurados y,
+        # como los triggers de recálculo son por sentencia, un INSERT sin filas también
+        # recalcularía todas las prioridades
+        for tabla, columna, pesos in (
+            ('pesos_periodicidad', 'periodicidad', PESOS_PERIODICIDAD),
+            ('pesos_criticidad', 'criticidad', PESOS_CRITICIDAD)
+        ):
+            cursor.execute(f"SELECT EXISTS (SELECT 1 FROM {tabla})")
+            if not cursor.fetchone()[0]:
+                execute_values(
+                    cursor,
+                    f"INSERT INTO {tabla} ({columna}, peso) VALUES %s ON CONFLICT DO NOTHING",
+                    list(pesos.items())
+                )
+        
+        columna_existente = self._existe_columna(cursor, 'encuestas', 'prioridad_automatizacion')
+        if not columna_existente:
+            cursor.execute("""
+                ALTER TABLE encuestas
+                ADD COLUMN IF NOT EXISTS prioridad_automatizacion INTEGER NOT NULL DEFAULT 0
+            """)
+        
+        cursor.execute("""
+            CREATE OR REPLACE FUNCTION calcular_prioridad_automatizacion() RETURNS TRIGGER AS $$
+            BEGIN
+                NEW.prioridad_automatizacion :=
+                    COALESCE((SELECT peso FROM pesos_periodicidad WHERE periodicidad = NEW.periodicidad_reporte), 0) +
+                    COALESCE((SELECT peso FROM pesos_criticidad WHERE criticidad = NEW.criticidad), 0);
+                RETURN NEW;
+            END;
+            $$ LANGUAGE plpgsql
+        """)
+        
+        if not self._existe_trigger(cursor, 'encuestas', 'trg_encuestas_prioridad'):
+            cursor.execute("""
+                CREATE TRIGGER trg_encuestas_prioridad
+                BEFORE INSERT OR UPDATE OF periodicidad_reporte, criticidad ON encuestas
+                FOR EACH ROW EXECUTE FUNCTION calcular_prioridad_automatizacion()
+            """)
+        
+        # Al cambiar un peso se recalculan las prioridades afectadas
+        cursor.execute("""
+            CREATE OR REPLACE FUNCTION recalcular_prioridades_automatizacion() RETURNS TRIGGER AS $$
+            BEGIN
+                UPDATE encuestas e
+                SET prioridad_automatizacion = p.prioridad
+                FROM (
+                    SELECT 
+                        e2.id,
+                        COALESCE(pp.peso, 0) + COALESCE(pc.peso, 0) AS prioridad
+                    FROM encuestas e2
+                    LEFT JOIN pesos_periodicidad pp ON pp.periodicidad = e2.periodicidad_reporte
+                    LEFT JOIN pesos_criticidad pc ON pc.criticidad = e2.criticidad
+                ) p
+                WHERE e.id = p.id AND e.prioridad_automatizacion <> p.prioridad;
+                RETURN NULL;
+            END;
+            $$ LANGUAGE plpgsql
+        """)
+        
+        for tabla in ('pesos_periodicidad', 'pesos_criticidad'):
+            if not self._existe_trigger(cursor, tabla, f"trg_{tabla}_recalcular"):
+                cursor.execute(f"""
+                    CREATE TRIGGER trg_{tabla}_recalcular
+                    AFTER INSERT OR UPDATE OR DELETE ON {tabla}
+                    FOR EACH STATEMENT EXECUTE FUNCTION recalcular_prioridades_automatizacion()
+                """)
+        
+        # Carga inicial de la prioridad para encuestas existentes
+        if not columna_existente:
+            cursor.execute("""
+                UPDATE encuestas e
+                SET prioridad_automatizacion =
+                    COALESCE((SELECT peso FROM pesos_periodicidad WHERE periodicidad = e.periodicidad_reporte), 0) +
+                    COALESCE((SELECT peso FROM pesos_criticidad WHERE criticidad = e.criticidad), 0)
+            """)
+        
+        # Índices parciales: solo los reportes no automatizados entran en el ranking
+        self._crear_indice(cursor, "idx_encuestas_prioridad_no_automatizadas", """
+            ON encuestas(prioridad_automatizacion DESC, id)
+            WHERE automatizado = 'No'
+        """)
+        
+        self._crear_indice(cursor, "idx_encuestas_prioridad_departamento", """
+            ON encuestas(departamento, prioridad_automatizacion DESC, id)
+            WHERE automatizado = 'No'
+        """)
+    
+    def _inicializar_busqueda(self, cursor):
+        """Función de normalización e índices para buscar sin distinguir mayúsculas ni acentos"""
+        # Mismas equivalencias que utils.busqueda.normalizar_texto; IMMUTABLE para poder indexarla
+        cursor.execute("""
+            CREATE OR REPLACE FUNCTION normalizar_busqueda(texto TEXT) RETURNS TEXT AS $$
+                SELECT lower(translate(texto, %s, %s))
+            $$ LANGUAGE sql IMMUTABLE STRICT PARALLEL SAFE
+        """, (CON_ACENTO, SIN_ACENTO))
+        
+        # Índices de versiones anteriores, sobre el texto sin normalizar
+        cursor.execute("""
+            DROP INDEX IF EXISTS idx_encuestas_nombre_prefijo, idx_encuestas_nombre_trgm,
+                idx_encuestas_responsable_trgm
+        """)
+        
+        # Búsqueda por prefijo del nombre
+        self._crear_indice(cursor, "idx_encuestas_nombre_normalizado_prefijo", """
+            ON encuestas(normalizar_busqueda(nombre_reporte) text_pattern_ops)
+        """)
+        
+        # pg_trgm acelera LIKE '%texto%'; si la extensión no está instalada se sigue sin él
+        cursor.execute("SELECT EXISTS (SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm')")
+        if not cursor.fetchone()[0]:
+            return
+        
+        cursor.execute("SAVEPOINT extension_trgm")
+        try:
+            cursor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+            for campo in CAMPOS_BUSQUEDA:
+                self._crear_indice(cursor, f"idx_encuestas_{campo}_trgm", f"""
+                    ON encuestas USING gin (normalizar_busqueda({campo}) gin_trgm_ops)
+                """)
+            cursor.execute("RELEASE SAVEPOINT extension_trgm")
+        except Exception as e:
+            cursor.execute("ROLLBACK TO SAVEPOINT extension_trgm")
+            print(f"Advertencia: búsqueda sin índices de trigramas (pg_trgm no disponible): {str(e)}")
+    
+    def _inicializar_texto_completo(self, cursor):
+        """Columna tsvector (configuración spanish) mantenida por trigger, con índice GIN"""
+        columna_existente = self._existe_columna(cursor, 'encuestas', 'documento_busqueda')
+        if not columna_existente:
+            cursor.execute("ALTER TABLE encuestas ADD COLUMN IF NOT EXISTS documento_busqueda TSVECTOR")
+        
+        # El nombre pesa más que la descripción, y esta más que la auditoría y los comentarios
+        cursor.execute("""
+            CREATE OR REPLACE FUNCTION construir_documento_busqueda(
+                nombre TEXT, descripcion TEXT, auditoria TEXT, stakeholders TEXT, observaciones TEXT
+            ) RETURNS TSVECTOR AS $$
+                SELECT
+                    setweight(to_tsvector('spanish', COALESCE(nombre, '')), 'A') ||
+                    setweight(to_tsvector('spanish', COALESCE(descripcion, '')), 'B') ||
+                    setweight(to_tsvector('spanish', COALESCE(auditoria, '')), 'C') ||
+                    setweight(to_tsvector('spanish', COALESCE(stakeholders, '') || ' ' || COALESCE(observaciones, '')), 'D')
+            $$ LANGUAGE sql IMMUTABLE PARALLEL SAFE
+        """)
+        
+        cursor.execute("""
+            CREATE OR REPLACE FUNCTION actualizar_documento_busqueda() RETURNS TRIGGER AS $$
+            BEGIN
+                NEW.documento_busqueda := construir_documento_busqueda(
+                    NEW.nombre_reporte, NEW.descripcion_reporte, NEW.auditoria_utilizacion,
+                    NEW.stakeholders, NEW.observaciones
+                );
+                RETURN NEW;
+            END;
+            $$ LANGUAGE plpgsql
+        """)
+        
+        if not self._existe_trigger(cursor, 'encuestas', 'trg_encuestas_documento_busqueda'):
+            cursor.execute("""
+                CREATE TRIGGER trg_encuestas_documento_busqueda
+                BEFORE INSERT OR UPDATE OF nombre_reporte, descripcion_reporte, auditoria_utilizacion,
+                    stakeholders, observaciones ON encuestas
+                FOR EACH ROW EXECUTE FUNCTION actualizar_documento_busqueda()
+            """)
+        
+        # Carga inicial del documento para encuestas existentes
+        if not columna_existente:
+            cursor.execute("""
+                UPDATE encuestas
+                SET documento_busqueda = construir_documento_busqueda(
+                    nombre_reporte, descripcion_reporte, auditoria_utilizacion, stakeholders, observaciones
+                )
+            """)
+        
+        self._crear_indice(cursor, "idx_encuestas_documento_busqueda", """
+            ON encuestas USING gin (documento_busqueda)
+        """)
+    
+    def _reconstruir_rollup_diario(self, cursor):
+        """Recalcular el rollup diario completo a partir de la tabla encuestas"""
+        cursor.execute("DELETE FROM encuestas_rollup_diario")
+        cursor.execute("""
+            INSERT INTO encuestas_rollup_diario (
+                dia, departamento, criticidad, periodicidad_reporte, automatizado, cantidad
+            )
+            SELECT 
+                fecha_envio::date, COALESCE(departamento, ''), COALESCE(criticidad, ''),
+                COALESCE(periodicidad_reporte, ''), COALESCE(automatizado, ''), COUNT(*)
+            FROM encuestas
+            GROUP BY 1, 2, 3, 4, 5
+        """)
+    
+    def _reconstruir_cubo(self, cursor):
+        """Recalcular la tabla encuestas_cubo a partir de la tabla encuestas"""
+        cursor.execute("DELETE FROM encuestas_cubo")
+        cursor.execute("""
+            INSERT INTO encuestas_cubo (
+                periodicidad_reporte, periodicidad_auditoria, departamento,
+                criticidad, automatizado, sistema_origen, cantidad
+            )
+            SELECT 
+                COALESCE(periodicidad_reporte, ''), COALESCE(periodicidad_auditoria, ''),
+                COALESCE(departamento, ''), COALESCE(criticidad, ''),
+                COALESCE(automatizado, ''), COALESCE(sistema_origen, ''), COUNT(*)
+            FROM encuestas
+            GROUP BY 1, 2, 3, 4, 5, 6
+        """)
+    
+    def reconstruir_tablas_agregadas(self):
+        """Recalcular el rollup diario y el cubo (por ejemplo, tras una carga masiva con triggers desactivados)"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("LOCK TABLE encuestas IN SHARE MODE")
+            self._reconstruir_rollup_diario(cursor)
+            self._reconstruir_cubo(cursor)
+            conn.commit()
+            cursor.close()
+            return True
+    
     def guardar_encuesta(self, datos_encuesta):
         """Guardar una nueva encuesta"""
         with self.get_connection() as conn:
@@ -133,6 +695,38 @@ class Database:
             
             return encuesta_id
     
+    def guardar_encuestas_lote(self, encuestas):
+        """Guardar varias encuestas nuevas en una sola transacción
+        
+        encuestas: lista de tuplas con los valores de COLUMNAS_ENCUESTA en orden.
+        Devuelve los IDs asignados.
+        """
+        if not encuestas:
+            return []
+        
+        # Los triggers actualizan filas compartidas de encuestas_cubo y encuestas_rollup_diario;
+        # insertar en el orden de sus claves reduce los interbloqueos entre lotes concurrentes
+        posiciones = [COLUMNAS_ENCUESTA.index(columna) for columna in ORDEN_INSERCION_LOTE]
+        encuestas = sorted(encuestas, key=lambda fila: tuple(str(fila[i] or "") for i in posiciones))
+        
+        for intento in range(INTENTOS_INTERBLOQUEO):
+            try:
+                with self.get_connection() as conn:
+                    cursor = conn.cursor()
+                    ids = execute_values(
+                        cursor,
+                        f"INSERT INTO encuestas ({', '.join(COLUMNAS_ENCUESTA)}) VALUES %s RETURNING id",
+                        encuestas,
+                        page_size=1000,
+                        fetch=True
+                    )
+                    cursor.close()
+                    return [fila[0] for fila in ids]
+            except psycopg2.errors.DeadlockDetected:
+                # PostgreSQL abortó esta transacción para resolver el interbloqueo; se reintenta entera
+                if intento == INTENTOS_INTERBLOQUEO - 1:
+                    raise
+    
     def obtener_todas_encuestas(self):
         """Obtener todas las encuestas"""
         with self.get_connection() as conn:
@@ -153,6 +747,173 @@ class Database:
     
     def obtener_encuesta_por_id(self, encuesta_id):
         """Obtener una encuesta específica por ID"""
+        with self.get_connection() as conn:
+            return self._leer_encuesta(conn, encuesta_id)
+    
+    def _leer_encuesta(self, conn, encuesta_id):
+        """Leer una encuesta con la conexión (y transacción) dada"""
+        query = """
+            SELECT 
+                id, fecha_envio, nombre_reporte, periodicidad_reporte,
+                sistema_origen, persona_responsable, email_responsable,
+                auditoria_utilizacion, periodicidad_auditoria,
+                departamento, criticidad, formato_entrega,
+                descripcion_reporte, stakeholders, automatizado, 
+                observaciones, created_at, updated_at, version
+            FROM encuestas
+            WHERE id = %s
+        """
+        
+        df = pd.read_sql_query(query, conn, params=(encuesta_id,))
+        return df.iloc[0] if not df.empty else None
+    
+    def _conflicto(self, encuesta):
+        """Detalle de conflicto (versión y valores actuales) de una encuesta leída"""
+        return {
+            'version': int(encuesta['version']),
+            'valores': {
+                campo: (None if pd.isna(encuesta[campo]) else encuesta[campo]) for campo in COLUMNAS_CON_HISTORIAL
+            }
+        }
+    
+    def buscar_encuestas_resumen(self, texto="", limite=20):
+        """Buscar encuestas por ID, nombre o responsable devolviendo solo las primeras coincidencias
+        
+        Las coincidencias por ID y por prefijo del nombre van primero. Sin texto se
+        devuelven las encuestas más recientes.
+        """
+        texto = (texto or "").strip()
+        
+        with self.get_connection() as conn:
+            if not texto:
+                query = """
+                    SELECT id, nombre_reporte, persona_responsable, departamento
+                    FROM encuestas
+                    ORDER BY fecha_envio DESC, id DESC
+                    LIMIT %s
+                """
+                return pd.read_sql_query(query, conn, params=(int(limite),))
+            
+            patron = escapar_patron_like(texto)
+            parametros = {
+                'id': int(texto) if texto.isdigit() and int(texto) <= 2147483647 else None,
+                'prefijo': patron + '%',
+                'contiene': '%' + patron + '%',
+                'limite': int(limite)
+            }
+            
+            query = """
+                SELECT id, nombre_reporte, persona_responsable, departamento
+                FROM encuestas
+                WHERE id = %(id)s
+                   OR normalizar_busqueda(nombre_reporte) LIKE normalizar_busqueda(%(prefijo)s)
+                   OR normalizar_busqueda(nombre_reporte) LIKE normalizar_busqueda(%(contiene)s)
+                   OR normalizar_busqueda(persona_responsable) LIKE normalizar_busqueda(%(contiene)s)
+                ORDER BY
+                    (id = %(id)s) IS TRUE DESC,
+                    normalizar_busqueda(nombre_reporte) LIKE normalizar_busqueda(%(prefijo)s) DESC,
+                    nombre_reporte,
+                    id
+                LIMIT %(limite)s
+            """
+            return pd.read_sql_query(query, conn, params=parametros)
+    
+    def obtener_encuestas_para_edicion(self, departamento=None, texto=None, limite=500):
+        """Obtener id, versión y campos editables de las encuestas filtradas (para la edición en tabla)"""
+        condiciones = []
+        parametros = {'limite': int(limite)}
+        
+        if departamento:
+            condiciones.append("departamento = %(departamento)s")
+            parametros['departamento'] = departamento
+        
+        if texto and texto.strip():
+            condiciones.append("(" + " OR ".join(
+                f"normalizar_busqueda({campo}) LIKE normalizar_busqueda(%(patron)s)" for campo in CAMPOS_BUSQUEDA
+            ) + ")")
+            parametros['patron'] = '%' + escapar_patron_like(texto.strip()) + '%'
+        
+        where = f"WHERE {' AND '.join(condiciones)}" if condiciones else ""
+        
+        with self.get_connection() as conn:
+            query = f"""
+                SELECT id, version, {', '.join(COLUMNAS_CON_HISTORIAL)}
+                FROM encuestas
+                {where}
+                ORDER BY id
+                LIMIT %(limite)s
+            """
+            return pd.read_sql_query(query, conn, params=parametros)
+    
+    def buscar_ids_por_texto(self, texto, campos=None):
+        """IDs de las encuestas que contienen el texto en alguno de los campos (sin mayúsculas ni acentos)"""
+        campos = [campo for campo in (campos or CAMPOS_BUSQUEDA) if campo in CAMPOS_BUSQUEDA]
+        condiciones = " OR ".join(
+            f"normalizar_busqueda({campo}) LIKE normalizar_busqueda(%(patron)s)" for campo in campos
+        )
+        
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                f"SELECT id FROM encuestas WHERE {condiciones}",
+                {'patron': '%' + escapar_patron_like(texto.strip()) + '%'}
+            )
+            ids = [fila[0] for fila in cursor.fetchall()]
+            cursor.close()
+            return ids
+    
+    def buscar_texto_completo(self, consulta, limite=10, offset=0):
+        """Búsqueda de texto completo ordenada por relevancia (paginada) y el total de coincidencias
+        
+        Solo se devuelve un fragmento resaltado de los campos descriptivos, no los campos completos.
+        """
+        with self.get_connection() as conn:
+            # Las coincidencias se evalúan una sola vez: de ellas salen la página y el total.
+            # ts_rank (pesos A-D y frecuencia) cuesta la mitad que ts_rank_cd en consultas amplias,
+            # y el resaltado se calcula solo para la página pedida
+            query = """
+                WITH busqueda AS (
+                    SELECT websearch_to_tsquery('spanish', %(consulta)s) AS consulta
+                ),
+                coincidencias AS MATERIALIZED (
+                    SELECT e.id, ts_rank(e.documento_busqueda, b.consulta) AS relevancia
+                    FROM encuestas e, busqueda b
+                    WHERE e.documento_busqueda @@ b.consulta
+                ),
+                pagina AS (
+                    SELECT id, relevancia
+                    FROM coincidencias
+                    ORDER BY relevancia DESC, id
+                    LIMIT %(limite)s OFFSET %(offset)s
+                )
+                SELECT 
+                    t.total, p.id, e.nombre_reporte, e.departamento, e.persona_responsable, p.relevancia,
+                    ts_headline(
+                        'spanish',
+                        concat_ws(' … ', NULLIF(e.descripcion_reporte, ''), NULLIF(e.auditoria_utilizacion, ''),
+                                  NULLIF(e.stakeholders, ''), NULLIF(e.observaciones, '')),
+                        b.consulta,
+                        'StartSel=**, StopSel=**, MaxWords=30, MinWords=10, MaxFragments=2, FragmentDelimiter=" … "'
+                    ) AS fragmento
+                FROM (SELECT COUNT(*) AS total FROM coincidencias) t
+                CROSS JOIN busqueda b
+                LEFT JOIN pagina p ON TRUE
+                LEFT JOIN encuestas e ON e.id = p.id
+                ORDER BY p.relevancia DESC, p.id
+            """
+            df = pd.read_sql_query(
+                query, conn, params={'consulta': consulta, 'limite': int(limite), 'offset': int(offset)}
+            )
+            
+            # Una fila sin id cuando la página está vacía: solo aporta el total
+            total = int(df['total'].iloc[0]) if not df.empty else 0
+            df = df[df['id'].notna()].drop(columns='total').reset_index(drop=True)
+            df['id'] = df['id'].astype(int)
+            
+            return df, total
+    
+    def obtener_encuestas_por_ids(self, ids):
+        """Obtener varias encuestas por ID en una sola consulta"""
         with self.get_connection() as conn:
             query = """
                 SELECT 
@@ -163,29 +924,39 @@ class Database:
                     descripcion_reporte, stakeholders, automatizado, 
                     observaciones, created_at, updated_at
                 FROM encuestas
-                WHERE id = %s
+                WHERE id = ANY(%s)
+                ORDER BY id
             """
             
-            df = pd.read_sql_query(query, conn, params=(encuesta_id,))
-            return df.iloc[0] if not df.empty else None
+            df = pd.read_sql_query(query, conn, params=([int(i) for i in ids],))
+            return df
     
-    def actualizar_encuesta(self, encuesta_id, datos_actualizados, usuario_modificacion="Sistema"):
-        """Actualizar una encuesta existente y registrar historial"""
+    def actualizar_encuesta(self, encuesta_id, datos_actualizados, usuario_modificacion="Sistema",
+                            version_esperada=None):
+        """Actualizar una encuesta existente y registrar historial
+        
+        Con version_esperada (la versión que se cargó para editar) la actualización solo
+        se aplica si nadie modificó la encuesta desde entonces; si no, lanza ConflictoEdicion.
+        """
         with self.get_connection() as conn:
             cursor = conn.cursor()
             
-            # Obtener datos actuales
-            encuesta_actual = self.obtener_encuesta_por_id(encuesta_id)
+            # Obtener datos actuales en la misma transacción, como base del historial
+            encuesta_actual = self._leer_encuesta(conn, encuesta_id)
             
             if encuesta_actual is None:
                 raise Exception(f"Encuesta con ID {encuesta_id} no encontrada")
             
+            version_leida = int(encuesta_actual['version'])
+            if version_esperada is not None and version_leida != int(version_esperada):
+                raise ConflictoEdicion({encuesta_id: self._conflicto(encuesta_actual)})
+            
             # Preparar campos a actualizar
             campos_actualizar = []
             valores = []
             
             for campo, valor_nuevo in datos_actualizados.items():
-                if campo in encuesta_actual.index and campo not in ['id', 'created_at', 'updated_at']:
+                if campo in encuesta_actual.index and campo not in ['id', 'created_at', 'updated_at', 'version']:
                     valor_anterior = str(encuesta_actual[campo]) if pd.notna(encuesta_actual[campo]) else ""
                     valor_nuevo_str = str(valor_nuevo) if valor_nuevo is not None else ""
                     
@@ -202,23 +973,129 @@ class Database:
                         )
             
             if campos_actualizar:
-                # Actualizar timestamp
+                # Actualizar timestamp y versión
                 campos_actualizar.append("updated_at = CURRENT_TIMESTAMP")
+                campos_actualizar.append("version = version + 1")
                 
-                # Construir y ejecutar query de actualización
+                # Construir y ejecutar query de actualización; solo aplica si la versión no cambió
                 query = f"""
                     UPDATE encuestas 
                     SET {', '.join(campos_actualizar)}
-                    WHERE id = %s
+                    WHERE id = %s AND version = %s
                 """
-                valores.append(encuesta_id)
+                valores.extend([encuesta_id, version_leida])
                 
                 cursor.execute(query, valores)
+                if cursor.rowcount == 0:
+                    # Otra transacción la modificó entre la lectura y la actualización
+                    encuesta_actual = self._leer_encuesta(conn, encuesta_id)
+                    if encuesta_actual is None:
+                        raise Exception(f"Encuesta con ID {encuesta_id} no encontrada")
+                    raise ConflictoEdicion({encuesta_id: self._conflicto(encuesta_actual)})
                 conn.commit()
             
             cursor.close()
             return True
     
+    def actualizar_encuestas_lote(self, cambios, usuario_modificacion="Sistema", motivo="", versiones=None):
+        """Actualizar varias encuestas y registrar su historial en una sola transacción
+        
+        cambios: {encuesta_id: {campo: valor_nuevo}} con solo las celdas modificadas.
+        versiones: {encuesta_id: versión cargada}; si alguna encuesta cambió desde esa
+        versión no se guarda nada y se lanza ConflictoEdicion con todas las afectadas.
+        Devuelve la cantidad de encuestas actualizadas y de campos registrados en el historial.
+        """
+        cambios = {
+            int(encuesta_id): {campo: valor for campo, valor in campos.items() if campo in COLUMNAS_CON_HISTORIAL}
+            for encuesta_id, campos in cambios.items()
+        }
+        cambios = {encuesta_id: campos for encuesta_id, campos in cambios.items() if campos}
+        if not cambios:
+            return {'encuestas': 0, 'campos': 0}
+        versiones = {int(encuesta_id): int(version) for encuesta_id, version in (versiones or {}).items()}
+        
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            
+            # Valores actuales como base del historial; sin bloqueo, el UPDATE comprueba la versión
+            consulta_actuales = f"SELECT id, version, {', '.join(COLUMNAS_CON_HISTORIAL)} FROM encuestas WHERE id = ANY(%s)"
+            cursor.execute(consulta_actuales, (list(cambios),))
+            filas_actuales = cursor.fetchall()
+            actuales = {fila[0]: dict(zip(COLUMNAS_CON_HISTORIAL, fila[2:])) for fila in filas_actuales}
+            versiones_leidas = {fila[0]: fila[1] for fila in filas_actuales}
+            
+            faltantes = set(cambios) - set(actuales)
+            if faltantes:
+                raise Exception(f"Encuestas no encontradas: {', '.join(str(i) for i in sorted(faltantes))}")
+            
+            conflictos = {
+                encuesta_id: {'version': versiones_leidas[encuesta_id], 'valores': actuales[encuesta_id]}
+                for encuesta_id in cambios
+                if encuesta_id in versiones and versiones_leidas[encuesta_id] != versiones[encuesta_id]
+            }
+            if conflictos:
+                raise ConflictoEdicion(conflictos)
+            
+            historial = []
+            por_columnas = {}
+            for encuesta_id, campos in cambios.items():
+                modificados = {}
+                for campo, valor_nuevo in campos.items():
+                    valor_anterior = str(actuales[encuesta_id][campo]) if actuales[encuesta_id][campo] is not None else ""
+                    valor_nuevo_str = str(valor_nuevo) if valor_nuevo is not None else ""
+                    if valor_anterior != valor_nuevo_str:
+                        modificados[campo] = valor_nuevo
+                        historial.append((
+                            encuesta_id, campo, valor_anterior, valor_nuevo_str, usuario_modificacion, motivo
+                        ))
+                if modificados:
+                    # Las filas que cambian las mismas columnas se actualizan en un solo UPDATE
+                    claves = tuple(sorted(modificados))
+                    por_columnas.setdefault(claves, []).append(
+                        (encuesta_id, versiones_leidas[encuesta_id]) + tuple(modificados[campo] for campo in claves)
+                    )
+            
+            actualizadas = set()
+            for claves, filas in por_columnas.items():
+                asignaciones = ", ".join(f"{campo} = v.{campo}" for campo in claves)
+                resultado = execute_values(
+                    cursor,
+                    f"""
+                        UPDATE encuestas e
+                        SET {asignaciones}, updated_at = CURRENT_TIMESTAMP, version = e.version + 1
+                        FROM (VALUES %s) AS v(id, version, {', '.join(claves)})
+                        WHERE e.id = v.id AND e.version = v.version
+                        RETURNING e.id
+                    """,
+                    filas,
+                    fetch=True
+                )
+                actualizadas.update(fila[0] for fila in resultado)
+            
+            # Encuestas modificadas por otra transacción entre la lectura y el UPDATE
+            pendientes = {fila[0] for filas in por_columnas.values() for fila in filas} - actualizadas
+            if pendientes:
+                cursor.execute(consulta_actuales, (list(pendientes),))
+                raise ConflictoEdicion({
+                    fila[0]: {'version': fila[1], 'valores': dict(zip(COLUMNAS_CON_HISTORIAL, fila[2:]))}
+                    for fila in cursor.fetchall()
+                })
+            
+            execute_values(
+                cursor,
+                """
+                    INSERT INTO historial_cambios (
+                        encuesta_id, campo_modificado, valor_anterior,
+                        valor_nuevo, usuario_modificacion, motivo_cambio
+                    ) VALUES %s
+                """,
+                historial
+            )
+            
+            conn.commit()
+            cursor.close()
+            return {'encuestas': sum(len(filas) for filas in por_columnas.values()), 'campos': len(historial)}
+    
     def _registrar_cambio(self, cursor, encuesta_id, campo, valor_anterior, 
                          valor_nuevo, usuario, motivo=""):
         """Registrar un cambio en el historial"""
@@ -249,8 +1126,136 @@ class Database:
             df = pd.read_sql_query(query, conn, params=(encuesta_id,))
             return df
     
+    def obtener_sesiones_historial(self, encuesta_id, limite=10, offset=0, max_caracteres=MAX_CARACTERES_HISTORIAL):
+        """Cambios de una encuesta agrupados en sesiones de edición (mismo usuario y fecha), paginados
+        
+        Devuelve los cambios de las sesiones de la página y el total de sesiones. Los
+        valores se recortan a max_caracteres; las columnas anterior_truncado y
+        nuevo_truncado indican cuáles hay que pedir completos con obtener_cambio_historial.
+        """
+        with self.get_connection() as conn:
+            query = """
+                WITH sesiones AS (
+                    SELECT fecha_modificacion, usuario_modificacion
+                    FROM historial_cambios
+                    WHERE encuesta_id = %(encuesta_id)s
+                    GROUP BY fecha_modificacion, usuario_modificacion
+                    ORDER BY fecha_modificacion DESC, usuario_modificacion
+                    LIMIT %(limite)s OFFSET %(offset)s
+                )
+                SELECT 
+                    h.id, h.fecha_modificacion, h.usuario_modificacion, h.campo_modificado,
+                    LEFT(h.valor_anterior, %(max_caracteres)s) AS valor_anterior,
+                    LEFT(h.valor_nuevo, %(max_caracteres)s) AS valor_nuevo,
+                    COALESCE(LENGTH(h.valor_anterior) > %(max_caracteres)s, FALSE) AS anterior_truncado,
+                    COALESCE(LENGTH(h.valor_nuevo) > %(max_caracteres)s, FALSE) AS nuevo_truncado,
+                    h.motivo_cambio
+                FROM historial_cambios h
+                JOIN sesiones s
+                  ON h.fecha_modificacion = s.fecha_modificacion
+                 AND h.usuario_modificacion IS NOT DISTINCT FROM s.usuario_modificacion
+                WHERE h.encuesta_id = %(encuesta_id)s
+                ORDER BY h.fecha_modificacion DESC, h.usuario_modificacion, h.id
+            """
+            df = pd.read_sql_query(query, conn, params={
+                'encuesta_id': int(encuesta_id),
+                'limite': int(limite),
+                'offset': int(offset),
+                'max_caracteres': int(max_caracteres)
+            })
+            
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT COUNT(*) FROM (
+                    SELECT DISTINCT fecha_modificacion, usuario_modificacion
+                    FROM historial_cambios
+                    WHERE encuesta_id = %s
+                ) sesiones
+            """, (int(encuesta_id),))
+            total = cursor.fetchone()[0]
+            cursor.close()
+            
+            return df, total
+    
+    def obtener_cambio_historial(self, cambio_id):
+        """Obtener un cambio del historial con sus valores completos"""
+        with self.get_connection() as conn:
+            query = """
+                SELECT 
+                    id, encuesta_id, campo_modificado, valor_anterior, valor_nuevo,
+                    usuario_modificacion, fecha_modificacion, motivo_cambio
+                FROM historial_cambios
+                WHERE id = %s
+            """
+            
+            df = pd.read_sql_query(query, conn, params=(int(cambio_id),))
+            return df.iloc[0] if not df.empty else None
+    
+    def _consultar_en_fecha(self, conn, fecha, encuesta_id=None):
+        """Estado de las encuestas en una fecha a partir del historial
+        
+        El valor de cada campo en la fecha es el valor_anterior del primer cambio
+        posterior a ella (ROW_NUMBER por encuesta y campo); si no hubo cambios
+        posteriores, es el valor actual. No se recorre el historial anterior a la fecha.
+        Las encuestas eliminadas después de la fecha se incluyen a partir de su fila en
+        encuestas_eliminadas; las eliminadas antes, no.
+        """
+        columnas = ",\n".join(
+            f"CASE WHEN v.valores ? '{col}' THEN NULLIF(v.valores->>'{col}', '') ELSE e.{col} END AS {col}"
+            for col in COLUMNAS_CON_HISTORIAL
+        )
+        columnas_eliminadas = ", ".join(f"datos->>'{col}' AS {col}" for col in COLUMNAS_CON_HISTORIAL)
+        filtro_historial = "AND encuesta_id = %(encuesta_id)s" if encuesta_id is not None else ""
+        filtro_encuesta = "AND e.id = %(encuesta_id)s" if encuesta_id is not None else ""
+        
+        query = f"""
+            WITH cambios_posteriores AS (
+                SELECT 
+                    encuesta_id, campo_modificado, valor_anterior,
+                    ROW_NUMBER() OVER (
+                        PARTITION BY encuesta_id, campo_modificado
+                        ORDER BY fecha_modificacion, id
+                    ) AS orden
+                FROM historial_cambios
+                WHERE fecha_modificacion > %(fecha)s {filtro_historial}
+            ),
+            valores_anteriores AS (
+                SELECT encuesta_id, jsonb_object_agg(campo_modificado, valor_anterior) AS valores
+                FROM cambios_posteriores
+                WHERE orden = 1
+                GROUP BY encuesta_id
+            ),
+            encuestas_en_fecha AS (
+                SELECT id, fecha_envio, {', '.join(COLUMNAS_CON_HISTORIAL)}
+                FROM encuestas
+                UNION ALL
+                SELECT id, (datos->>'fecha_envio')::timestamp, {columnas_eliminadas}
+                FROM encuestas_eliminadas
+                WHERE fecha_eliminacion > %(fecha)s
+            )
+            SELECT
+                e.id, e.fecha_envio,
+                {columnas}
+            FROM encuestas_en_fecha e
+            LEFT JOIN valores_anteriores v ON v.encuesta_id = e.id
+            WHERE e.fecha_envio <= %(fecha)s {filtro_encuesta}
+            ORDER BY e.fecha_envio DESC
+        """
+        return pd.read_sql_query(query, conn, params={'fecha': fecha, 'encuesta_id': encuesta_id})
+    
+    def obtener_encuesta_en_fecha(self, encuesta_id, fecha):
+        """Obtener una encuesta tal como estaba en una fecha (None si aún no existía)"""
+        with self.get_connection() as conn:
+            df = self._consultar_en_fecha(conn, fecha, int(encuesta_id))
+            return df.iloc[0] if not df.empty else None
+    
+    def obtener_catalogo_en_fecha(self, fecha):
+        """Obtener todas las encuestas tal como estaban en una fecha"""
+        with self.get_connection() as conn:
+            return self._consultar_en_fecha(conn, fecha)
+    
     def eliminar_encuesta(self, encuesta_id):
-        """Eliminar una encuesta (también elimina historial por CASCADE)"""
+        """Eliminar una encuesta (queda registrada en encuestas_eliminadas y se conserva su historial)"""
         with self.get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute("DELETE FROM encuestas WHERE id = %s", (encuesta_id,))
@@ -288,6 +1293,236 @@ class Database:
             cursor.close()
             return stats
     
+    def obtener_agregados(self):
+        """Obtener el cubo de conteos por dimensiones y la tendencia diaria en una sola consulta"""
+        with self.get_connection() as conn:
+            query = """
+                SELECT 
+                    periodicidad_reporte, departamento, criticidad,
+                    automatizado, sistema_origen,
+                    DATE(fecha_envio) AS fecha,
+                    GROUPING(DATE(fecha_envio)) = 0 AS es_tendencia,
+                    COUNT(*) AS cantidad
+                FROM encuestas
+                GROUP BY GROUPING SETS (
+                    (periodicidad_reporte, departamento, criticidad, automatizado, sistema_origen),
+                    (DATE(fecha_envio))
+                )
+            """
+            
+            df = pd.read_sql_query(query, conn)
+            return df
+    
+    def obtener_rango_fechas(self):
+        """Obtener el primer y el último día con encuestas (desde el rollup diario)"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT MIN(dia), MAX(dia) FROM encuestas_rollup_diario")
+            fecha_min, fecha_max = cursor.fetchone()
+            cursor.close()
+            return fecha_min, fecha_max
+    
+    def obtener_serie_temporal(self, unidad, desglose=None):
+        """Obtener el conteo de encuestas por periodo (date_trunc sobre el rollup diario)"""
+        # unidad y desglose se validan contra listas fijas antes de llegar aquí
+        columna_desglose = f", COALESCE(NULLIF({desglose}, ''), 'Sin especificar') AS {desglose}" if desglose else ""
+        agrupacion = ", 2" if desglose else ""
+        
+        with self.get_connection() as conn:
+            query = f"""
+                SELECT 
+                    date_trunc(%s, dia)::timestamp AS periodo{columna_desglose},
+                    SUM(cantidad) AS cantidad
+                FROM encuestas_rollup_diario
+                GROUP BY 1{agrupacion}
+                ORDER BY 1
+            """
+            
+            df = pd.read_sql_query(query, conn, params=(unidad,))
+            return df
+    
+    def obtener_rollup_diario(self, desde=None, hasta=None):
+        """Obtener las filas del rollup diario, opcionalmente entre dos fechas (inclusive)"""
+        with self.get_connection() as conn:
+            query = """
+                SELECT dia, departamento, criticidad, periodicidad_reporte, automatizado, cantidad
+                FROM encuestas_rollup_diario
+                WHERE (%s::date IS NULL OR dia >= %s::date)
+                  AND (%s::date IS NULL OR dia <= %s::date)
+                ORDER BY dia
+            """
+            
+            df = pd.read_sql_query(query, conn, params=(desde, desde, hasta, hasta))
+            return df
+    
+    def obtener_prioridades_automatizacion(self, limite=10, offset=0, departamento=None):
+        """Obtener los reportes no automatizados de mayor prioridad (paginado) y el total"""
+        filtro_departamento = "AND departamento = %s" if departamento else ""
+        parametros = [departamento] if departamento else []
+        
+        with self.get_connection() as conn:
+            query = f"""
+                SELECT 
+                    id, nombre_reporte, periodicidad_reporte, criticidad,
+                    departamento, persona_responsable, prioridad_automatizacion
+                FROM encuestas
+                WHERE automatizado = 'No' {filtro_departamento}
+                ORDER BY prioridad_automatizacion DESC, id
+                LIMIT %s OFFSET %s
+            """
+            df = pd.read_sql_query(query, conn, params=parametros + [int(limite), int(offset)])
+            
+            cursor = conn.cursor()
+            cursor.execute(
+                f"SELECT COUNT(*) FROM encuestas WHERE automatizado = 'No' {filtro_departamento}",
+                parametros
+            )
+            total = cursor.fetchone()[0]
+            cursor.close()
+            
+            return df, total
+    
+    def obtener_pesos_prioridad(self):
+        """Obtener las tablas de pesos de periodicidad y criticidad"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT periodicidad, peso FROM pesos_periodicidad ORDER BY peso DESC, periodicidad")
+            pesos_periodicidad = dict(cursor.fetchall())
+            cursor.execute("SELECT criticidad, peso FROM pesos_criticidad ORDER BY peso DESC, criticidad")
+            pesos_criticidad = dict(cursor.fetchall())
+            cursor.close()
+            return pesos_periodicidad, pesos_criticidad
+    
+    def guardar_pesos_prioridad(self, pesos_periodicidad, pesos_criticidad):
+        """Guardar los pesos (las prioridades se recalculan por trigger)"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            for tabla, columna, pesos in (
+                ('pesos_periodicidad', 'periodicidad', pesos_periodicidad),
+                ('pesos_criticidad', 'criticidad', pesos_criticidad)
+            ):
+                if not pesos:
+                    continue
+                execute_values(
+                    cursor,
+                    f"""
+                        INSERT INTO {tabla} ({columna}, peso) VALUES %s
+                        ON CONFLICT ({columna}) DO UPDATE SET peso = EXCLUDED.peso
+                    """,
+                    [(valor, int(peso)) for valor, peso in pesos.items()]
+                )
+            conn.commit()
+            cursor.close()
+            return True
+    
+    def obtener_celdas_cubo(self):
+        """Obtener las celdas de la tabla encuestas_cubo"""
+        with self.get_connection() as conn:
+            query = """
+                SELECT 
+                    periodicidad_reporte, periodicidad_auditoria, departamento,
+                    criticidad, automatizado, sistema_origen, cantidad
+                FROM encuestas_cubo
+            """
+            
+            df = pd.read_sql_query(query, conn)
+            return df
+    
+    def obtener_version_datos(self):
+        """Obtener una huella de la versión actual de los datos de encuestas"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT COUNT(*), COALESCE(MAX(id), 0), MAX(updated_at)
+                FROM encuestas
+            """)
+            total, max_id, ultima_actualizacion = cursor.fetchone()
+            cursor.close()
+            return f"db-{total}-{max_id}-{ultima_actualizacion.isoformat() if ultima_actualizacion else ''}"
+    
+    def obtener_no_respondientes(self, emails_invitados, emails_suprimidos=None):
+        """Obtener los invitados que no han enviado ninguna encuesta (anti-join en SQL)"""
+        suprimidos = {normalizar_email(email) for email in (emails_suprimidos or [])}
+        
+        # Un registro por email normalizado, conservando la primera forma recibida
+        invitados = {}
+        for email in emails_invitados:
+            email_normalizado = normalizar_email(email)
+            if email_normalizado and email_normalizado not in suprimidos:
+                invitados.setdefault(email_normalizado, str(email).strip())
+        
+        if not invitados:
+            return []
+        
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            
+            cursor.execute("""
+                CREATE TEMP TABLE invitados_recordatorio (
+                    email_normalizado VARCHAR(300) PRIMARY KEY,
+                    email VARCHAR(300)
+                ) ON COMMIT DROP
+            """)
+            
+            execute_values(
+                cursor,
+                "INSERT INTO invitados_recordatorio (email_normalizado, email) VALUES %s",
+                list(invitados.items())
+            )
+            
+            cursor.execute("""
+                SELECT i.email
+                FROM invitados_recordatorio i
+                WHERE NOT EXISTS (
+                    SELECT 1 FROM encuestas e
+                    WHERE LOWER(TRIM(e.email_responsable)) = i.email_normalizado
+                )
+                AND NOT EXISTS (
+                    SELECT 1 FROM emails_suprimidos s
+                    WHERE s.email_normalizado = i.email_normalizado
+                )
+                ORDER BY i.email_normalizado
+            """)
+            
+            pendientes = [fila[0] for fila in cursor.fetchall()]
+            cursor.close()
+            return pendientes
+    
+    def agregar_email_suprimido(self, email, motivo=""):
+        """Agregar un email a la lista de supresión de recordatorios"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                INSERT INTO emails_suprimidos (email_normalizado, motivo)
+                VALUES (%s, %s)
+                ON CONFLICT (email_normalizado) DO UPDATE SET motivo = EXCLUDED.motivo
+            """, (normalizar_email(email), motivo))
+            cursor.close()
+            return True
+    
+    def eliminar_email_suprimido(self, email):
+        """Quitar un email de la lista de supresión de recordatorios"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                "DELETE FROM emails_suprimidos WHERE email_normalizado = %s",
+                (normalizar_email(email),)
+            )
+            cursor.close()
+            return True
+    
+    def obtener_emails_suprimidos(self):
+        """Obtener la lista de supresión de recordatorios"""
+        with self.get_connection() as conn:
+            query = """
+                SELECT email_normalizado, motivo, fecha_registro
+                FROM emails_suprimidos
+                ORDER BY email_normalizado
+            """
+            
+            df = pd.read_sql_query(query, conn)
+            return df
+    
     def migrar_desde_csv(self, csv_file):
         """Migrar datos desde CSV existente a PostgreSQL"""
         try:
@@ -12,6 +12,16 @@ class EmailSender:
         self.email_usuario = os.getenv("EMAIL_USER", "")
         self.email_password = os.getenv("EMAIL_PASSWORD", "")
         self.email_remitente = os.getenv("EMAIL_FROM", self.email_usuario)
+        # STARTTLS se puede desactivar para servidores locales sin TLS (ver utils/smtp_local.py)
+        self.smtp_starttls = os.getenv("SMTP_STARTTLS", "true").lower() not in ("false", "0", "no")
+    
+    def _conectar(self):
+        """Abrir una conexión autenticada con el servidor SMTP"""
+        server = smtplib.SMTP(self.smtp_server, self.smtp_port)
+        if self.smtp_starttls:
+            server.starttls()
+        server.login(self.email_usuario, self.email_password)
+        return server
     
     def enviar_confirmacion(self, email_destinatario, nombre_reporte):
         """Enviar email de confirmación al usuario que completó la encuesta"""
@@ -80,9 +90,7 @@ class EmailSender:
             mensaje.attach(MIMEText(cuerpo_html, 'html'))
             
             # Conectar y enviar
-            server = smtplib.SMTP(self.smtp_server, self.smtp_port)
-            server.starttls()
-            server.login(self.email_usuario, self.email_password)
+            server = self._conectar()
             
             texto = mensaje.as_string()
             server.sendmail(self.email_remitente, email_destinatario, texto)
@@ -185,9 +193,7 @@ class EmailSender:
             mensaje.attach(MIMEText(cuerpo_html, 'html'))
             
             # Conectar y enviar
-            server = smtplib.SMTP(self.smtp_server, self.smtp_port)
-            server.starttls()
-            server.login(self.email_usuario, self.email_password)
+            server = self._conectar()
             
             texto = mensaje.as_string()
             server.sendmail(self.email_remitente, email_admin, texto)
@@ -202,10 +208,14 @@ class EmailSender:
     
     def enviar_recordatorio_masivo(self, lista_emails, asunto_personalizado=None):
         """Enviar recordatorio masivo para completar encuestas"""
+        return self._enviar_recordatorios(lista_emails, asunto_personalizado) > 0
+    
+    def _enviar_recordatorios(self, lista_emails, asunto_personalizado=None):
+        """Enviar el recordatorio a cada email y devolver cuántos se enviaron"""
         try:
             if not self.email_usuario or not self.email_password:
                 print("Configuración de email no disponible")
-                return False
+                return 0
             
             asunto = asunto_personalizado or "Recordatorio - Complete la Encuesta de Reportes Corporativos"
             enviados_exitosos = 0
@@ -268,9 +278,7 @@ class EmailSender:
             """
             
             # Enviar a cada email de la lista
-            server = smtplib.SMTP(self.smtp_server, self.smtp_port)
-            server.starttls()
-            server.login(self.email_usuario, self.email_password)
+            server = self._conectar()
             
             for email in lista_emails:
                 try:
@@ -291,11 +299,39 @@ class EmailSender:
             server.quit()
             
             print(f"Recordatorios enviados exitosamente: {enviados_exitosos}/{len(lista_emails)}")
-            return enviados_exitosos > 0
+            return enviados_exitosos
             
         except Exception as e:
             print(f"Error en envío masivo: {str(e)}")
-            return False
+            return 0
+    
+    def enviar_recordatorio_pendientes(self, data_manager, invitados, emails_suprimidos=None, asunto_personalizado=None):
+        """Enviar recordatorio solo a los invitados que aún no completaron la encuesta
+        
+        Devuelve (enviados, pendientes): (0, 0) si todos respondieron ya, (0, n) si falló
+        el envío a los n pendientes y pendientes=None si no se pudo calcularlos.
+        """
+        pendientes = None
+        try:
+            # Archivos (ruta o subido) y DataFrames se leen con cargar_lista_invitados;
+            # cualquier otro iterable (lista, Series...) se toma como la lista de emails
+            if isinstance(invitados, (str, os.PathLike)) or hasattr(invitados, 'read') or hasattr(invitados, 'columns'):
+                invitados = data_manager.cargar_lista_invitados(invitados)
+            else:
+                invitados = [email for email in invitados if isinstance(email, str) and email.strip()]
+            
+            pendientes = data_manager.obtener_no_respondientes(invitados, emails_suprimidos)
+            
+            print(f"Invitados pendientes de responder: {len(pendientes)}/{len(invitados)}")
+            
+            if not pendientes:
+                return 0, 0
+            
+            return self._enviar_recordatorios(pendientes, asunto_personalizado), len(pendientes)
+            
+        except Exception as e:
+            print(f"Error en envío de recordatorios a pendientes: {str(e)}")
+            return 0, len(pendientes) if pendientes is not None else None
     
     def test_configuracion(self):
         """Probar la configuración de email"""
@@ -303,9 +339,7 @@ class EmailSender:
             if not self.email_usuario or not self.email_password:
                 return False, "Credenciales de email no configuradas"
             
-            server = smtplib.SMTP(self.smtp_server, self.smtp_port)
-            server.starttls()
-            server.login(self.email_usuario, self.email_password)
+            server = self._conectar()
             server.quit()
             
             return True, "Configuración de email correcta"
@@ -0,0 +1,183 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from utils.pdf_exporter import PDFExporter
+from utils.cache_artefactos import obtener_cache_artefactos
+from utils.reportes_lote import generar_lote_departamentos, generar_lote_individual
+
+class TareaExportacion:
+    """Estado de la generación de un artefacto de exportación en segundo plano"""
+
+    def __init__(self, tipo):
+        self.tipo = tipo
+        # None mientras no se conozca la fracción completada (generación de un solo paso)
+        self.progreso = None
+        self.mensaje = "En cola..."
+        self.contenido = None
+        self.nombre_archivo = None
+        self.mime = None
+        self.error = None
+        self.future = None
+
+    def reportar_progreso(self, fraccion, mensaje):
+        """Actualizar el progreso (0 a 1) y el mensaje visible"""
+        self.progreso = max(0.0, min(1.0, fraccion))
+        self.mensaje = mensaje
+
+    def reportar_estado(self, mensaje):
+        """Actualizar solo el mensaje visible, sin fracción de progreso"""
+        self.mensaje = mensaje
+
+    @property
+    def en_curso(self):
+        return self.future is not None and not self.future.done()
+
+    @property
+    def completada(self):
+        return self.contenido is not None
+
+
+def generar_csv(df, tarea, data_manager=None, filtros=None, version_datos=None):
+    """Generar la exportación CSV"""
+    tarea.reportar_estado("Generando CSV...")
+    contenido = df.to_csv(index=False).encode('utf-8')
+    nombre = f"encuestas_reportes_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
+    return contenido, nombre, "text/csv"
+
+
+def generar_excel(df, tarea, data_manager=None, filtros=None, version_datos=None):
+    """Generar la exportación Excel con hoja de resumen"""
+    tarea.reportar_estado("Generando libro Excel...")
+    contenido = data_manager.generar_excel_resumen(df, filtros, version_datos)
+    nombre = f"encuestas_reportes_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
+    return contenido, nombre, "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+
+def generar_pdf(df, tarea, data_manager=None, filtros=None, version_datos=None):
+    """Generar el reporte PDF completo"""
+    tarea.reportar_estado("Maquetando PDF...")
+    pdf_exporter = PDFExporter(cache=obtener_cache_artefactos())
+    contenido, nombre = pdf_exporter.generar_reporte_completo(
+        df, incluir_estadisticas=True, filtros=filtros, version_datos=version_datos
+    )
+    return contenido, nombre, "application/pdf"
+
+
+def _generar_zip_con_cache(tipo, df, version_datos, filtros, generar):
+    """Generar un ZIP en un archivo temporal, reutilizando la caché de artefactos"""
+    cache = obtener_cache_artefactos()
+    clave_cache = None
+    if version_datos is not None:
+        clave_cache = cache.construir_clave(tipo, filtros, df.columns, version_datos)
+        contenido = cache.obtener(clave_cache)
+        if contenido is not None:
+            return contenido
+
+    descriptor, ruta_zip = tempfile.mkstemp(prefix=f"{tipo}_", suffix=".zip")
+    os.close(descriptor)
+
+    try:
+        generar(ruta_zip)
+        with open(ruta_zip, 'rb') as archivo:
+            contenido = archivo.read()
+    finally:
+        os.remove(ruta_zip)
+
+    if clave_cache is not None:
+        cache.guardar(clave_cache, contenido)
+    return contenido
+
+
+def generar_zip_departamentos(df, tarea, data_manager=None, filtros=None, version_datos=None):
+    """Generar un ZIP con un PDF por departamento y por responsable"""
+    tarea.reportar_estado("Repartiendo encuestas...")
+    contenido = _generar_zip_con_cache(
+        'zip_departamentos', df, version_datos, filtros,
+        lambda ruta_zip: generar_lote_departamentos(df, ruta_zip, reportar_progreso=tarea.reportar_progreso)
+    )
+    nombre = f"reportes_por_departamento_{datetime.now().strftime('%Y%m%d_%H%M%S')}.zip"
+    return contenido, nombre, "application/zip"
+
+
+def generar_zip_fichas(df, tarea, data_manager=None, filtros=None, version_datos=None):
+    """Generar un ZIP con la ficha PDF individual de cada encuesta"""
+    tarea.reportar_estado("Preparando fichas...")
+    contenido = _generar_zip_con_cache(
+        'zip_fichas', df, version_datos, filtros,
+        lambda ruta_zip: generar_lote_individual(df, ruta_zip, formato='zip', reportar_progreso=tarea.reportar_progreso)
+    )
+    nombre = f"fichas_encuestas_{datetime.now().strftime('%Y%m%d_%H%M%S')}.zip"
+    return contenido, nombre, "application/zip"
+
+
+GENERADORES = {
+    'csv': generar_csv,
+    'excel': generar_excel,
+    'pdf': generar_pdf,
+    'zip_departamentos': generar_zip_departamentos,
+    'zip_fichas': generar_zip_fichas
+}
+
+
+class GestorExportaciones:
+    """Genera exportaciones bajo demanda en segundo plano y conserva las terminadas"""
+
+    def __init__(self, max_workers=2, max_artefactos=32):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="exportacion")
+        self._tareas = OrderedDict()
+        self._lock = threading.Lock()
+        self.max_artefactos = max_artefactos
+
+    @staticmethod
+    def calcular_clave(tipo, filtros, version_datos):
+        """Clave del artefacto: tipo + hash del conjunto de filtros + versión de datos"""
+        contenido = json.dumps(
+            {'tipo': tipo, 'filtros': filtros, 'version': version_datos},
+            sort_keys=True, default=str
+        )
+        return hashlib.sha256(contenido.encode('utf-8')).hexdigest()
+
+    def obtener(self, clave):
+        """Obtener la tarea asociada a una clave (o None si nunca se solicitó)"""
+        with self._lock:
+            tarea = self._tareas.get(clave)
+            if tarea is not None:
+                self._tareas.move_to_end(clave)
+            return tarea
+
+    def solicitar(self, clave, tipo, df, data_manager=None, filtros=None, version_datos=None):
+        """Encolar la generación de un artefacto si no existe ya"""
+        with self._lock:
+            tarea = self._tareas.get(clave)
+            if tarea is not None and tarea.error is None:
+                return tarea
+
+            tarea = TareaExportacion(tipo)
+            self._tareas[clave] = tarea
+            tarea.future = self._executor.submit(self._ejecutar, tarea, df, data_manager, filtros, version_datos)
+            self._descartar_antiguas()
+            return tarea
+
+    def _ejecutar(self, tarea, df, data_manager, filtros, version_datos):
+        try:
+            contenido, nombre, mime = GENERADORES[tarea.tipo](df, tarea, data_manager, filtros, version_datos)
+            tarea.nombre_archivo = nombre
+            tarea.mime = mime
+            tarea.contenido = contenido
+            tarea.reportar_progreso(1.0, "Listo")
+        except Exception as e:
+            tarea.error = str(e)
+            tarea.reportar_progreso(1.0, "Error")
+
+    def _descartar_antiguas(self):
+        """Mantener como máximo max_artefactos tareas (LRU), sin descartar las que están en curso"""
+        for clave in list(self._tareas.keys()):
+            if len(self._tareas) <= self.max_artefactos:
+                break
+            if not self._tareas[clave].en_curso:
+                del self._tareas[clave]
@@ -0,0 +1,144 @@
+from reportlab.lib import colors
+from reportlab.graphics.shapes import Drawing, String
+from reportlab.graphics.charts.barcharts import VerticalBarChart
+from reportlab.graphics.charts.piecharts import Pie
+from reportlab.graphics.charts.linecharts import HorizontalLineChart
+from reportlab.graphics.charts.legends import Legend
+from reportlab.graphics.widgets.markers import makeMarker
+from utils.agregaciones import ORDEN_CRITICIDAD, agrupar_tendencia
+
+# Gráficos vectoriales nativos de reportlab, dibujados a partir de conteos ya agregados
+
+COLOR_PRINCIPAL = '#2E86AB'
+COLORES_CRITICIDAD = {'Alto': '#dc3545', 'Medio': '#ffc107', 'Bajo': '#28a745'}
+PALETA = ['#2E86AB', '#A23B72', '#F18F01', '#C73E1D', '#3B1F2B', '#44BBA4',
+          '#E94F37', '#393E41', '#7D5BA6', '#8FB339', '#F6AE2D', '#5C80BC']
+
+# Máximo de puntos de la tendencia antes de agrupar por semana, mes o trimestre
+MAX_PUNTOS_TENDENCIA = 60
+
+ANCHO = 500
+ALTO = 220
+
+
+def _lienzo(titulo, ancho=ANCHO, alto=ALTO):
+    dibujo = Drawing(ancho, alto)
+    dibujo.add(String(ancho / 2, alto - 14, titulo, fontName='Helvetica-Bold',
+                      fontSize=11, textAnchor='middle', fillColor=colors.HexColor(COLOR_PRINCIPAL)))
+    return dibujo
+
+
+def grafico_barras(serie, titulo, colores_categoria=None):
+    """Gráfico de barras verticales a partir de una serie categoría -> cantidad"""
+    if serie is None or serie.empty:
+        return None
+
+    dibujo = _lienzo(titulo)
+    grafico = VerticalBarChart()
+    grafico.x = 45
+    grafico.y = 50
+    grafico.width = ANCHO - 65
+    grafico.height = ALTO - 85
+    grafico.data = [[int(valor) for valor in serie.values]]
+    grafico.categoryAxis.categoryNames = [str(categoria)[:18] for categoria in serie.index]
+    grafico.categoryAxis.labels.angle = 30
+    grafico.categoryAxis.labels.boxAnchor = 'ne'
+    grafico.categoryAxis.labels.fontSize = 7
+    grafico.valueAxis.valueMin = 0
+    grafico.valueAxis.labels.fontSize = 7
+    grafico.barLabelFormat = '%d'
+    grafico.barLabels.fontSize = 7
+    grafico.barLabels.nudge = 6
+    grafico.bars[0].fillColor = colors.HexColor(COLOR_PRINCIPAL)
+    grafico.bars[0].strokeColor = None
+
+    if colores_categoria:
+        for i, categoria in enumerate(serie.index):
+            if categoria in colores_categoria:
+                grafico.bars[(0, i)].fillColor = colors.HexColor(colores_categoria[categoria])
+
+    dibujo.add(grafico)
+    return dibujo
+
+
+def grafico_circular(serie, titulo):
+    """Gráfico circular con leyenda (cantidad y porcentaje) a partir de una serie"""
+    if serie is None or serie.empty:
+        return None
+
+    dibujo = _lienzo(titulo)
+    total = int(serie.sum())
+
+    grafico = Pie()
+    grafico.x = 40
+    grafico.y = 25
+    grafico.width = ALTO - 60
+    grafico.height = ALTO - 60
+    grafico.data = [int(valor) for valor in serie.values]
+    grafico.slices.strokeColor = colors.white
+    grafico.slices.strokeWidth = 0.5
+
+    pares = []
+    for i, (categoria, valor) in enumerate(serie.items()):
+        color = colors.HexColor(PALETA[i % len(PALETA)])
+        grafico.slices[i].fillColor = color
+        porcentaje = valor / total * 100 if total else 0
+        pares.append((color, f"{str(categoria)[:25]} ({int(valor)}, {porcentaje:.1f}%)"))
+
+    leyenda = Legend()
+    leyenda.x = grafico.x + grafico.width + 40
+    leyenda.y = ALTO - 40
+    leyenda.alignment = 'right'
+    leyenda.fontSize = 8
+    leyenda.columnMaximum = 12
+    leyenda.colorNamePairs = pares
+
+    dibujo.add(grafico)
+    dibujo.add(leyenda)
+    return dibujo
+
+
+def grafico_tendencia(serie, titulo):
+    """Gráfico de líneas a partir de una serie fecha -> cantidad"""
+    if serie is None or serie.empty:
+        return None
+
+    serie = agrupar_tendencia(serie, MAX_PUNTOS_TENDENCIA)
+    dibujo = _lienzo(titulo)
+
+    grafico = HorizontalLineChart()
+    grafico.x = 45
+    grafico.y = 50
+    grafico.width = ANCHO - 65
+    grafico.height = ALTO - 85
+    grafico.data = [[int(valor) for valor in serie.values]]
+
+    # Mostrar como máximo ~12 etiquetas de fecha
+    paso = max(1, len(serie) // 12)
+    grafico.categoryAxis.categoryNames = [
+        fecha.strftime('%d/%m/%y') if i % paso == 0 else '' for i, fecha in enumerate(serie.index)
+    ]
+    grafico.categoryAxis.labels.angle = 30
+    grafico.categoryAxis.labels.boxAnchor = 'ne'
+    grafico.categoryAxis.labels.fontSize = 7
+    grafico.valueAxis.valueMin = 0
+    grafico.valueAxis.labels.fontSize = 7
+    grafico.lines[0].strokeColor = colors.HexColor(COLOR_PRINCIPAL)
+    grafico.lines[0].strokeWidth = 1.5
+    if len(serie) <= 31:
+        grafico.lines[0].symbol = makeMarker('FilledCircle', size=3)
+
+    dibujo.add(grafico)
+    return dibujo
+
+
+def crear_graficos_reporte(agregados):
+    """Lista de gráficos del reporte completo a partir de los agregados precalculados"""
+    graficos = [
+        grafico_barras(agregados.conteo('periodicidad_reporte'), 'Distribución por Periodicidad'),
+        grafico_circular(agregados.conteo('departamento'), 'Distribución por Departamento'),
+        grafico_barras(agregados.conteo('criticidad', ORDEN_CRITICIDAD), 'Distribución por Nivel de Criticidad',
+                       COLORES_CRITICIDAD),
+        grafico_tendencia(agregados.tendencia, 'Tendencia de Encuestas Recibidas')
+    ]
+    return [grafico for grafico in graficos if grafico is not None]
@@ -0,0 +1,122 @@
+import json
+from datetime import date, timedelta
+import pandas as pd
+from utils.agregaciones import comparar_periodos
+from utils.cache_artefactos import obtener_cache_insights
+
+# Días sin encuestas a partir de los cuales un departamento se considera inactivo
+DIAS_INACTIVIDAD = 30
+
+def calcular_insights(agregados, rollup_reciente, hoy=None, dias_inactividad=DIAS_INACTIVIDAD):
+    """Derivar los insights del dashboard de los agregados y del rollup diario reciente
+
+    Devuelve una lista de diccionarios con 'nivel' (info, warning o success) y 'mensaje'.
+    """
+    hoy = hoy or date.today()
+    insights = []
+    total = agregados.total
+
+    if total == 0:
+        return insights
+
+    # Periodicidad más común
+    if agregados.tiene('periodicidad_reporte'):
+        periodicidad_top, count_top = agregados.moda('periodicidad_reporte')
+        insights.append({
+            'nivel': 'info',
+            'mensaje': f"📊 La periodicidad más común es **{periodicidad_top or 'N/A'}** con {count_top} reportes ({count_top/total*100:.1f}%)"
+        })
+
+    # Departamento con más reportes
+    if agregados.tiene('departamento'):
+        dept_top, count_dept = agregados.moda('departamento')
+        insights.append({
+            'nivel': 'info',
+            'mensaje': f"🏢 **{dept_top or 'N/A'}** es el departamento con más reportes ({count_dept} reportes)"
+        })
+
+    # Nivel de automatización
+    if agregados.tiene('automatizado'):
+        pct_auto = agregados.porcentaje('automatizado', 'Sí')
+        if pct_auto < 50:
+            insights.append({
+                'nivel': 'info',
+                'mensaje': f"⚠️ Solo el {pct_auto:.1f}% de los reportes están automatizados. Considere priorizar la automatización."
+            })
+        else:
+            insights.append({
+                'nivel': 'info',
+                'mensaje': f"✅ El {pct_auto:.1f}% de los reportes están automatizados. ¡Buen trabajo!"
+            })
+
+    # Reportes críticos
+    if agregados.tiene('criticidad'):
+        pct_criticos = agregados.porcentaje('criticidad', 'Alto')
+        if pct_criticos > 30:
+            insights.append({
+                'nivel': 'info',
+                'mensaje': f"🔴 El {pct_criticos:.1f}% de los reportes son de criticidad alta. Asegure procesos robustos para estos."
+            })
+
+    # Sistema más usado
+    if agregados.tiene('sistema_origen'):
+        sistema_top, count_sistema = agregados.moda('sistema_origen')
+        insights.append({
+            'nivel': 'info',
+            'mensaje': f"💻 **{sistema_top or 'N/A'}** es el sistema más utilizado ({count_sistema} reportes)"
+        })
+
+    # Variación semanal
+    semana = comparar_periodos(rollup_reciente, 7, hoy)
+    if semana['anterior'] > 0:
+        tendencia = "📈" if semana['variacion'] >= 0 else "📉"
+        insights.append({
+            'nivel': 'info',
+            'mensaje': f"{tendencia} En los últimos 7 días se recibieron {semana['actual']} encuestas, "
+                       f"{semana['variacion_pct']:+.1f}% frente a los 7 días anteriores ({semana['anterior']})"
+        })
+    elif semana['actual'] > 0:
+        insights.append({
+            'nivel': 'info',
+            'mensaje': f"📈 En los últimos 7 días se recibieron {semana['actual']} encuestas (ninguna en los 7 días anteriores)"
+        })
+
+    # Departamentos sin encuestas recientes
+    if agregados.tiene('departamento'):
+        desde = hoy - timedelta(days=dias_inactividad - 1)
+        activos = set()
+        if not rollup_reciente.empty:
+            dias = pd.to_datetime(rollup_reciente['dia']).dt.date
+            activos = set(rollup_reciente.loc[dias >= desde, 'departamento'])
+
+        inactivos = sorted(dept for dept in agregados.conteo('departamento').index if dept not in activos)
+        if inactivos:
+            insights.append({
+                'nivel': 'warning',
+                'mensaje': f"⏰ Sin encuestas en los últimos {dias_inactividad} días: **{', '.join(inactivos)}**"
+            })
+
+    return insights
+
+
+def obtener_insights(data_manager, df=None, agregados=None, dias_inactividad=DIAS_INACTIVIDAD):
+    """Insights del dashboard, guardados por versión de datos y fecha en su propia caché en disco"""
+    hoy = date.today()
+    version_datos = data_manager.obtener_version_datos()
+    cache = obtener_cache_insights()
+    clave = cache.construir_clave(
+        'insights', {'fecha': hoy.isoformat(), 'dias_inactividad': dias_inactividad}, None, version_datos
+    )
+
+    contenido = cache.obtener(clave)
+    if contenido is not None:
+        return json.loads(contenido.decode('utf-8'))
+
+    if agregados is None:
+        agregados = data_manager.obtener_agregados(df)
+    desde = hoy - timedelta(days=max(14, dias_inactividad) - 1)
+    rollup_reciente = data_manager.obtener_rollup_diario(desde, hoy, df)
+
+    insights = calcular_insights(agregados, rollup_reciente, hoy, dias_inactividad)
+    cache.guardar(clave, json.dumps(insights, ensure_ascii=False).encode('utf-8'))
+    return insights
@@ -5,13 +5,33 @@ from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.units import inch
 from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_RIGHT
 from datetime import datetime
-import pandas as pd
 import io
+import os
+import tempfile
+from utils.agregaciones import calcular_agregados
+from utils.graficos_pdf import crear_graficos_reporte
+
+# Filas por cada Table del listado detallado (una sola Table gigante escala muy mal)
+FILAS_POR_BLOQUE = 500
+
+# A partir de este número de filas el PDF se construye en un archivo temporal
+UMBRAL_MODO_GRANDE = 5000
+
+# Hoja de estilos compartida por todos los PDFExporter del proceso
+_hoja_estilos = None
 
 class PDFExporter:
-    def __init__(self):
-        self.styles = getSampleStyleSheet()
-        self._crear_estilos_personalizados()
+    def __init__(self, cache=None):
+        # Caché opcional de PDFs generados (utils.cache_artefactos.CacheArtefactos)
+        self.cache = cache
+        
+        global _hoja_estilos
+        if _hoja_estilos is None:
+            self.styles = getSampleStyleSheet()
+            self._crear_estilos_personalizados()
+            _hoja_estilos = self.styles
+        else:
+            self.styles = _hoja_estilos
     
     def _crear_estilos_personalizados(self):
         """Crear estilos personalizados para el PDF"""
@@ -40,17 +60,82 @@ class PDFExporter:
             spaceAfter=6
         ))
     
-    def generar_reporte_completo(self, df, filename=None, incluir_estadisticas=True):
-        """Generar reporte PDF completo con todas las encuestas"""
+    def generar_reporte_completo(self, df, filename=None, incluir_estadisticas=True, modo_grande=None,
+                                 filtros=None, version_datos=None, incluir_graficos=True):
+        """Generar reporte PDF completo con todas las encuestas.
+        
+        Si hay caché y se indica version_datos, filtros debe describir cómo se obtuvo df:
+        el PDF se reutiliza mientras no cambien los datos, los filtros ni las columnas.
+        """
         if filename is None:
             filename = f"reporte_encuestas_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
         
+        clave_cache = None
+        if self.cache is not None and version_datos is not None:
+            clave_cache = self.cache.construir_clave(
+                'pdf_completo',
+                {'filtros': filtros, 'incluir_estadisticas': incluir_estadisticas, 'incluir_graficos': incluir_graficos},
+                df.columns,
+                version_datos
+            )
+            pdf_content = self.cache.obtener(clave_cache)
+            if pdf_content is not None:
+                return pdf_content, filename
+        
+        pdf_content = self._generar_reporte_completo_bytes(df, incluir_estadisticas, modo_grande, incluir_graficos)
+        
+        if clave_cache is not None:
+            self.cache.guardar(clave_cache, pdf_content)
+        
+        return pdf_content, filename
+    
+    def _generar_reporte_completo_bytes(self, df, incluir_estadisticas, modo_grande, incluir_graficos):
+        """Construir el reporte completo y devolver su contenido"""
+        if modo_grande is None:
+            modo_grande = len(df) > UMBRAL_MODO_GRANDE
+        
+        if modo_grande:
+            # Construir en disco y leer una sola vez, sin duplicar el PDF en memoria
+            ruta, _ = self.generar_reporte_completo_en_archivo(
+                df, incluir_estadisticas=incluir_estadisticas, incluir_graficos=incluir_graficos
+            )
+            try:
+                with open(ruta, 'rb') as archivo:
+                    pdf_content = archivo.read()
+            finally:
+                os.remove(ruta)
+            
+            return pdf_content
+        
         # Crear buffer para el PDF
         buffer = io.BytesIO()
+        self._construir_reporte_completo(buffer, df, incluir_estadisticas, incluir_graficos)
         
+        # Obtener contenido del buffer
+        pdf_content = buffer.getvalue()
+        buffer.close()
+        
+        return pdf_content
+    
+    def generar_reporte_completo_en_archivo(self, df, ruta=None, filename=None, incluir_estadisticas=True,
+                                            incluir_graficos=True):
+        """Generar reporte PDF completo escribiéndolo directamente a disco (reportes grandes)"""
+        if filename is None:
+            filename = f"reporte_encuestas_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
+        
+        if ruta is None:
+            descriptor, ruta = tempfile.mkstemp(prefix="reporte_encuestas_", suffix=".pdf")
+            os.close(descriptor)
+        
+        self._construir_reporte_completo(ruta, df, incluir_estadisticas, incluir_graficos)
+        
+        return ruta, filename
+    
+    def _construir_reporte_completo(self, destino, df, incluir_estadisticas, incluir_graficos=True):
+        """Maquetar el reporte completo en un buffer o ruta de archivo"""
         # Crear documento
         doc = SimpleDocTemplate(
-            buffer,
+            destino,
             pagesize=A4,
             rightMargin=0.5*inch,
             leftMargin=0.5*inch,
@@ -101,6 +186,16 @@ class PDFExporter:
             story.append(stats_table)
             story.append(Spacer(1, 0.3*inch))
         
+        # Gráficos vectoriales a partir de agregados calculados una sola vez
+        if incluir_graficos and not df.empty:
+            graficos = crear_graficos_reporte(calcular_agregados(df))
+            if graficos:
+                story.append(PageBreak())
+                story.append(Paragraph("Análisis Gráfico", self.styles['CustomHeading']))
+                for grafico in graficos:
+                    story.append(grafico)
+                    story.append(Spacer(1, 0.2*inch))
+        
         # Tabla de encuestas
         story.append(PageBreak())
         story.append(Paragraph("Listado Detallado de Reportes", self.styles['CustomHeading']))
@@ -130,28 +225,14 @@ class PDFExporter:
                 }
                 
                 headers = [headers_map.get(col, col) for col in columnas_existentes]
-                
-                # Convertir dataframe a lista de listas
-                tabla_data = [headers]
-                
-                for _, row in df_tabla.iterrows():
-                    fila = []
-                    for col in columnas_existentes:
-                        valor = str(row[col]) if pd.notna(row[col]) else ''
-                        # Limitar longitud de texto
-                        if len(valor) > 30:
-                            valor = valor[:27] + '...'
-                        fila.append(valor)
-                    tabla_data.append(fila)
+                filas = self._formatear_celdas(df_tabla)
                 
                 # Calcular anchos de columna
                 num_cols = len(columnas_existentes)
                 col_width = 6.5 * inch / num_cols
                 col_widths = [col_width] * num_cols
                 
-                # Crear tabla
-                tabla = Table(tabla_data, colWidths=col_widths)
-                tabla.setStyle(TableStyle([
+                estilo_tabla = TableStyle([
                     ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#2E86AB')),
                     ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
                     ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
@@ -163,9 +244,17 @@ class PDFExporter:
                     ('BOTTOMPADDING', (0, 1), (-1, -1), 6),
                     ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
                     ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.lightgrey])
-                ]))
+                ])
                 
-                story.append(tabla)
+                # Crear una tabla por bloque de filas, repitiendo el encabezado en cada página
+                for inicio in range(0, len(filas), FILAS_POR_BLOQUE):
+                    tabla = Table(
+                        [headers] + filas[inicio:inicio + FILAS_POR_BLOQUE],
+                        colWidths=col_widths,
+                        repeatRows=1
+                    )
+                    tabla.setStyle(estilo_tabla)
+                    story.append(tabla)
         else:
             story.append(Paragraph("No hay datos disponibles", self.styles['CustomBody']))
         
@@ -178,12 +267,17 @@ class PDFExporter:
         
         # Construir PDF
         doc.build(story)
+    
+    def _formatear_celdas(self, df_tabla, max_longitud=30):
+        """Convertir las celdas a texto (vacío para nulos) y recortar textos largos, por columnas"""
+        texto = df_tabla.astype(object).where(df_tabla.notna(), '').astype(str)
         
-        # Obtener contenido del buffer
-        pdf_content = buffer.getvalue()
-        buffer.close()
+        for col in texto.columns:
+            serie = texto[col]
+            # Limitar longitud de texto
+            texto[col] = serie.where(serie.str.len() <= max_longitud, serie.str.slice(0, max_longitud - 3) + '...')
         
-        return pdf_content, filename
+        return texto.values.tolist()
     
     def generar_reporte_individual(self, encuesta_data, filename=None):
         """Generar reporte PDF de una encuesta individual"""
@@ -194,15 +288,41 @@ class PDFExporter:
         
         buffer = io.BytesIO()
         
-        doc = SimpleDocTemplate(
-            buffer,
+        doc = self._crear_documento_individual(buffer)
+        doc.build(self._contenido_individual(encuesta_data))
+        
+        pdf_content = buffer.getvalue()
+        buffer.close()
+        
+        return pdf_content, filename
+    
+    def generar_reportes_individuales_combinados(self, encuestas, destino):
+        """Generar un único PDF con la ficha de cada encuesta (una por página)"""
+        story = []
+        
+        for i, encuesta_data in enumerate(encuestas):
+            if i > 0:
+                story.append(PageBreak())
+            story.extend(self._contenido_individual(encuesta_data))
+        
+        doc = self._crear_documento_individual(destino)
+        doc.build(story)
+        
+        return len(encuestas)
+    
+    def _crear_documento_individual(self, destino):
+        """Documento con los márgenes de la ficha individual"""
+        return SimpleDocTemplate(
+            destino,
             pagesize=A4,
             rightMargin=0.75*inch,
             leftMargin=0.75*inch,
             topMargin=inch,
             bottomMargin=0.75*inch
         )
-        
+    
+    def _contenido_individual(self, encuesta_data):
+        """Flowables de la ficha de una encuesta"""
         story = []
         
         # Título
@@ -284,14 +404,9 @@ class PDFExporter:
             self.styles['CustomBody']
         ))
         
-        doc.build(story)
-        
-        pdf_content = buffer.getvalue()
-        buffer.close()
-        
-        return pdf_content, filename
+        return story
     
-    def generar_reporte_por_departamento(self, df, departamento, filename=None):
+    def generar_reporte_por_departamento(self, df, departamento, filename=None, filtros=None, version_datos=None):
         """Generar reporte PDF filtrado por departamento"""
         df_filtrado = df[df['departamento'] == departamento].copy()
         
@@ -299,4 +414,9 @@ class PDFExporter:
             dept_safe = departamento.replace(' ', '_')
             filename = f"reporte_{dept_safe}_{datetime.now().strftime('%Y%m%d')}.pdf"
         
-        return self.generar_reporte_completo(df_filtrado, filename, incluir_estadisticas=True)
+        filtros_departamento = dict(filtros or {}, departamento=departamento)
+        
+        return self.generar_reporte_completo(
+            df_filtrado, filename, incluir_estadisticas=True,
+            filtros=filtros_departamento, version_datos=version_datos
+        )
@@ -0,0 +1,295 @@
+"""Generación masiva de reportes PDF (cierre de mes y fichas individuales).
+
+Parte el catálogo una sola vez con groupby, genera los PDF en un pool de procesos
+(compartido entre lotes y con un número acotado de workers) y los escribe en un único ZIP a medida que terminan. Las fichas individuales, de
+un DataFrame o de una lista de IDs, se pueden obtener también como un único PDF
+combinado. Se puede ejecutar directamente:
+
+    python -m utils.reportes_lote --salida reportes_cierre.zip --workers 4
+    python -m utils.reportes_lote --ids 12 40 73 --formato pdf --salida fichas.pdf
+"""
+import argparse
+import multiprocessing
+import os
+import re
+import threading
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
+from datetime import datetime
+from utils.pdf_exporter import PDFExporter
+
+# Columnas que usa generar_reporte_completo; solo éstas viajan a los procesos
+COLUMNAS_REPORTE = [
+    'fecha_envio', 'nombre_reporte', 'persona_responsable', 'departamento',
+    'periodicidad_reporte', 'criticidad', 'automatizado', 'sistema_origen'
+]
+
+# Fichas individuales que procesa cada tarea del pool (reduce el coste de comunicación)
+FICHAS_POR_TAREA = 50
+
+# Procesos del pool compartido: acotados, porque cada uno carga su propia copia de reportlab
+MAX_WORKERS_LOTE = min(4, os.cpu_count() or 1)
+
+# Pool de procesos compartido por todas las exportaciones del proceso (se crea al primer uso).
+# Se usa "spawn": hacer fork del servidor de Streamlit, que tiene varios hilos, puede dejar
+# a un hijo bloqueado en un lock que tenía otro hilo (logging, imports)
+_pool = None
+_pool_lock = threading.Lock()
+
+# Un exportador por proceso (los estilos se crean una sola vez por worker del pool compartido)
+_pdf_exporter = None
+
+
+def _obtener_exporter():
+    global _pdf_exporter
+    if _pdf_exporter is None:
+        _pdf_exporter = PDFExporter()
+    return _pdf_exporter
+
+
+def _crear_pool(max_workers):
+    # El inicializador crea el exportador (estilos y fuentes) al arrancar cada worker, una sola vez
+    return ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context("spawn"),
+                               initializer=_obtener_exporter)
+
+
+@contextmanager
+def _pool_procesos(max_workers=None):
+    """Pool para un lote: el compartido, o uno propio si se pide un número de workers concreto"""
+    global _pool
+
+    if max_workers is not None:
+        with _crear_pool(max_workers) as executor:
+            yield executor, max_workers
+        return
+
+    with _pool_lock:
+        if _pool is None:
+            _pool = _crear_pool(MAX_WORKERS_LOTE)
+        executor = _pool
+
+    try:
+        yield executor, MAX_WORKERS_LOTE
+    except BrokenProcessPool:
+        # Un worker murió: se descarta el pool para que el siguiente lote cree otro
+        with _pool_lock:
+            if _pool is executor:
+                _pool = None
+        executor.shutdown(wait=False, cancel_futures=True)
+        raise
+
+
+def _nombre_seguro(texto):
+    """Convertir un valor en un nombre de archivo seguro"""
+    nombre = re.sub(r'[^\w\-]+', '_', str(texto)).strip('_')
+    return nombre[:60] or 'sin_nombre'
+
+
+def _renderizar_grupo(nombre_archivo, df_grupo):
+    """Renderizar el PDF de un grupo (se ejecuta en un proceso del pool)"""
+    inicio = time.perf_counter()
+    contenido, _ = _obtener_exporter().generar_reporte_completo(df_grupo, nombre_archivo, incluir_estadisticas=True)
+    return nombre_archivo, contenido, len(df_grupo), time.perf_counter() - inicio
+
+
+def _renderizar_fichas(fichas):
+    """Renderizar un bloque de fichas individuales (se ejecuta en un proceso del pool)"""
+    pdf_exporter = _obtener_exporter()
+    resultados = []
+    for nombre_archivo, encuesta_data in fichas:
+        inicio = time.perf_counter()
+        contenido, _ = pdf_exporter.generar_reporte_individual(encuesta_data, nombre_archivo)
+        resultados.append((nombre_archivo, contenido, time.perf_counter() - inicio))
+    return resultados
+
+
+def _registros_encuestas(df):
+    """Convertir el DataFrame en diccionarios, con texto vacío en lugar de NaN"""
+    return df.astype(object).where(df.notna(), "").to_dict('records')
+
+
+def particionar(df, incluir_responsables=True):
+    """Partir el catálogo en un grupo por departamento (y por responsable) en una sola pasada"""
+    columnas = [col for col in COLUMNAS_REPORTE if col in df.columns]
+    df_reducido = df[columnas]
+    fecha = datetime.now().strftime('%Y%m%d')
+
+    dimensiones = [('departamento', 'departamentos')]
+    if incluir_responsables:
+        dimensiones.append(('persona_responsable', 'responsables'))
+
+    grupos = []
+    for columna, carpeta in dimensiones:
+        if columna not in df_reducido.columns:
+            continue
+
+        usados = set()
+        for valor, df_grupo in df_reducido.groupby(columna, sort=True):
+            base = f"{carpeta}/reporte_{_nombre_seguro(valor)}_{fecha}"
+            nombre = f"{base}.pdf"
+            sufijo = 2
+            while nombre in usados:
+                nombre = f"{base}_{sufijo}.pdf"
+                sufijo += 1
+            usados.add(nombre)
+            grupos.append((nombre, df_grupo))
+
+    return grupos
+
+
+def generar_lote_departamentos(df, ruta_zip=None, max_workers=None, incluir_responsables=True,
+                               reportar_progreso=None):
+    """Generar un PDF por departamento y por responsable en paralelo, escritos en un único ZIP"""
+    inicio = time.perf_counter()
+
+    if ruta_zip is None:
+        ruta_zip = f"reportes_lote_{datetime.now().strftime('%Y%m%d_%H%M%S')}.zip"
+
+    grupos = particionar(df, incluir_responsables)
+    documentos = []
+
+    with zipfile.ZipFile(ruta_zip, 'w', compression=zipfile.ZIP_DEFLATED) as archivo_zip, \
+            _pool_procesos(max_workers) as (executor, workers):
+        futuros = [executor.submit(_renderizar_grupo, nombre, df_grupo) for nombre, df_grupo in grupos]
+
+        for completados, futuro in enumerate(as_completed(futuros), start=1):
+            nombre, contenido, filas, duracion = futuro.result()
+            archivo_zip.writestr(nombre, contenido)
+            documentos.append({
+                'archivo': nombre,
+                'filas': filas,
+                'duracion_s': round(duracion, 3),
+                'tamano_bytes': len(contenido)
+            })
+
+            if reportar_progreso:
+                reportar_progreso(completados / len(futuros), f"{completados}/{len(futuros)} PDFs generados")
+
+    tiempo_total = time.perf_counter() - inicio
+    tiempo_documentos = sum(doc['duracion_s'] for doc in documentos)
+
+    return {
+        'ruta_zip': ruta_zip,
+        'total_documentos': len(documentos),
+        'tiempo_total_s': round(tiempo_total, 3),
+        'tiempo_documentos_s': round(tiempo_documentos, 3),
+        'documentos_por_segundo': round(len(documentos) / tiempo_total, 2) if tiempo_total > 0 else 0.0,
+        'workers': workers,
+        'documentos': sorted(documentos, key=lambda doc: doc['archivo'])
+    }
+
+
+def generar_lote_individual(df_encuestas, ruta_salida=None, formato='zip', max_workers=None,
+                            reportar_progreso=None):
+    """Generar la ficha individual de cada encuesta, en un ZIP (en paralelo) o en un único PDF"""
+    inicio = time.perf_counter()
+    registros = _registros_encuestas(df_encuestas)
+    fecha = datetime.now().strftime('%Y%m%d_%H%M%S')
+
+    if formato == 'pdf':
+        # Un único documento: se maqueta en este proceso, reutilizando los estilos compartidos
+        if ruta_salida is None:
+            ruta_salida = f"fichas_encuestas_{fecha}.pdf"
+        PDFExporter().generar_reportes_individuales_combinados(registros, ruta_salida)
+        if reportar_progreso:
+            reportar_progreso(1.0, f"{len(registros)} fichas generadas")
+        tiempo_total = time.perf_counter() - inicio
+
+        return {
+            'ruta_salida': ruta_salida,
+            'total_fichas': len(registros),
+            'tiempo_total_s': round(tiempo_total, 3),
+            'fichas_por_segundo': round(len(registros) / tiempo_total, 2) if tiempo_total > 0 else 0.0,
+            'workers': 1
+        }
+
+    if ruta_salida is None:
+        ruta_salida = f"fichas_encuestas_{fecha}.zip"
+
+    fichas = []
+    for posicion, encuesta_data in enumerate(registros, start=1):
+        identificador = encuesta_data.get('id') or posicion
+        nombre = f"ficha_{identificador}_{_nombre_seguro(encuesta_data.get('nombre_reporte'))}.pdf"
+        fichas.append((nombre, encuesta_data))
+
+    bloques = [fichas[i:i + FICHAS_POR_TAREA] for i in range(0, len(fichas), FICHAS_POR_TAREA)]
+    generadas = 0
+
+    with zipfile.ZipFile(ruta_salida, 'w', compression=zipfile.ZIP_DEFLATED) as archivo_zip, \
+            _pool_procesos(max_workers) as (executor, workers):
+        futuros = [executor.submit(_renderizar_fichas, bloque) for bloque in bloques]
+
+        for futuro in as_completed(futuros):
+            for nombre, contenido, _ in futuro.result():
+                archivo_zip.writestr(nombre, contenido)
+                generadas += 1
+
+            if reportar_progreso:
+                reportar_progreso(generadas / len(fichas), f"{generadas}/{len(fichas)} fichas generadas")
+
+    tiempo_total = time.perf_counter() - inicio
+
+    return {
+        'ruta_salida': ruta_salida,
+        'total_fichas': generadas,
+        'tiempo_total_s': round(tiempo_total, 3),
+        'fichas_por_segundo': round(generadas / tiempo_total, 2) if tiempo_total > 0 else 0.0,
+        'workers': workers
+    }
+
+
+def generar_fichas_por_ids(ids, ruta_salida=None, formato='zip', max_workers=None,
+                           reportar_progreso=None, data_manager=None):
+    """Generar las fichas de una lista de IDs de encuesta (leídas en una sola consulta)"""
+    from utils.data_manager import DataManager
+
+    data_manager = data_manager or DataManager()
+    if not data_manager.usar_database:
+        raise Exception("La generación de fichas por ID requiere PostgreSQL")
+
+    ids = list(dict.fromkeys(int(i) for i in ids))
+    df_encuestas = data_manager.obtener_encuestas_por_ids(ids)
+
+    resumen = generar_lote_individual(df_encuestas, ruta_salida, formato, max_workers, reportar_progreso)
+    encontrados = set(df_encuestas['id'].tolist()) if not df_encuestas.empty else set()
+    resumen['ids_no_encontrados'] = [i for i in ids if i not in encontrados]
+    return resumen
+
+
+def main():
+    from utils.data_manager import DataManager
+
+    parser = argparse.ArgumentParser(description="Generar los PDF por departamento y responsable en un ZIP")
+    parser.add_argument("--salida", default=None, help="Ruta del ZIP (o del PDF combinado) a generar")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--sin-responsables", action="store_true")
+    parser.add_argument("--ids", type=int, nargs="+", help="generar solo las fichas individuales de estas encuestas")
+    parser.add_argument("--formato", choices=["zip", "pdf"], default="zip", help="formato de las fichas (con --ids)")
+    args = parser.parse_args()
+
+    if args.ids:
+        resumen = generar_fichas_por_ids(args.ids, args.salida, args.formato, args.workers)
+        print(f"{resumen['total_fichas']} fichas en {resumen['tiempo_total_s']} s "
+              f"({resumen['fichas_por_segundo']} fichas/s, {resumen['workers']} workers) -> {resumen['ruta_salida']}")
+        if resumen['ids_no_encontrados']:
+            print(f"IDs no encontrados: {', '.join(str(i) for i in resumen['ids_no_encontrados'])}")
+        return
+
+    df = DataManager().cargar_datos()
+    if df.empty:
+        print("No hay encuestas para generar reportes")
+        return
+
+    resumen = generar_lote_departamentos(df, args.salida, args.workers, not args.sin_responsables)
+
+    for doc in resumen['documentos']:
+        print(f"{doc['duracion_s']:>8.3f} s  {doc['filas']:>7} filas  {doc['archivo']}")
+    print(f"{resumen['total_documentos']} PDFs en {resumen['tiempo_total_s']} s "
+          f"({resumen['documentos_por_segundo']} PDFs/s, {resumen['workers']} workers) -> {resumen['ruta_zip']}")
+
+
+if __name__ == "__main__":
+    main()
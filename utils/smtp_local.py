@@ -0,0 +1,182 @@
+"""Servidor SMTP local que acepta y descarta mensajes.
+
+Permite probar y medir utils/email_sender.py sin un relay real. Se puede usar
+dentro del proceso (ServidorSMTPLocal) o como subproceso:
+
+    python -m utils.smtp_local --puerto 1025 --latencia-ms 5 --tasa-fallos 0.01
+
+Para que EmailSender lo use, configurar SMTP_SERVER=127.0.0.1, SMTP_PORT=<puerto>,
+SMTP_STARTTLS=false y cualquier valor en EMAIL_USER / EMAIL_PASSWORD.
+"""
+import argparse
+import random
+import socketserver
+import threading
+import time
+
+
+class _ManejadorSMTP(socketserver.StreamRequestHandler):
+    """Implementación mínima del diálogo SMTP (EHLO, AUTH, MAIL, RCPT, DATA, QUIT)"""
+
+    # Evita esperas de ~40 ms (Nagle + ACK diferido) en respuestas de varias líneas
+    disable_nagle_algorithm = True
+
+    def _responder(self, linea):
+        self.wfile.write(f"{linea}\r\n".encode("ascii"))
+
+    def _leer_linea(self):
+        return self.rfile.readline().decode("utf-8", "replace").strip()
+
+    def handle(self):
+        servidor = self.server.smtp_local
+        servidor._registrar_conexion()
+        self._responder("220 localhost Servidor SMTP local")
+
+        while True:
+            linea = self.rfile.readline()
+            if not linea:
+                break
+
+            comando = linea.decode("utf-8", "replace").strip()
+            partes = comando.split(" ", 2)
+            verbo = partes[0].upper()
+
+            if verbo == "EHLO":
+                self._responder("250-localhost")
+                self._responder("250 AUTH PLAIN LOGIN")
+            elif verbo == "HELO":
+                self._responder("250 localhost")
+            elif verbo == "AUTH":
+                mecanismo = partes[1].upper() if len(partes) > 1 else ""
+                if mecanismo == "PLAIN" and len(partes) < 3:
+                    self._responder("334 ")
+                    self._leer_linea()
+                elif mecanismo == "LOGIN":
+                    self._responder("334 VXNlcm5hbWU6")
+                    self._leer_linea()
+                    self._responder("334 UGFzc3dvcmQ6")
+                    self._leer_linea()
+                self._responder("235 Autenticacion aceptada")
+            elif verbo in ("MAIL", "RCPT", "RSET", "NOOP"):
+                self._responder("250 OK")
+            elif verbo == "DATA":
+                self._responder("354 Finalice con <CRLF>.<CRLF>")
+                while True:
+                    linea_datos = self.rfile.readline()
+                    if not linea_datos or linea_datos in (b".\r\n", b".\n"):
+                        break
+
+                if servidor._procesar_mensaje():
+                    self._responder("250 Mensaje aceptado")
+                else:
+                    self._responder("451 Fallo simulado")
+            elif verbo == "STARTTLS":
+                self._responder("454 TLS no disponible")
+            elif verbo == "QUIT":
+                self._responder("221 Hasta luego")
+                break
+            else:
+                self._responder("502 Comando no implementado")
+
+
+class _ServidorTCP(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class ServidorSMTPLocal:
+    def __init__(self, host="127.0.0.1", puerto=0, latencia_ms=0, tasa_fallos=0.0, semilla=None):
+        self.host = host
+        self.puerto = puerto
+        self.latencia_ms = latencia_ms
+        self.tasa_fallos = tasa_fallos
+        self._random = random.Random(semilla)
+        self._lock = threading.Lock()
+        self._servidor = None
+        self._hilo = None
+        self.reiniciar_contadores()
+
+    def __enter__(self):
+        self.iniciar()
+        return self
+
+    def __exit__(self, *args):
+        self.detener()
+
+    def iniciar(self):
+        """Iniciar el servidor en un hilo en segundo plano"""
+        self._servidor = _ServidorTCP((self.host, self.puerto), _ManejadorSMTP)
+        self._servidor.smtp_local = self
+        self.puerto = self._servidor.server_address[1]
+
+        self._hilo = threading.Thread(target=self._servidor.serve_forever, daemon=True)
+        self._hilo.start()
+        return self.puerto
+
+    def detener(self):
+        """Detener el servidor"""
+        if self._servidor is not None:
+            self._servidor.shutdown()
+            self._servidor.server_close()
+            self._servidor = None
+
+    def reiniciar_contadores(self):
+        """Poner a cero las estadísticas acumuladas"""
+        with self._lock:
+            self.conexiones_abiertas = 0
+            self.mensajes_aceptados = 0
+            self.mensajes_rechazados = 0
+            self.tiempos_recepcion = []
+
+    def estadisticas(self):
+        """Obtener las estadísticas acumuladas"""
+        with self._lock:
+            return {
+                'conexiones_abiertas': self.conexiones_abiertas,
+                'mensajes_aceptados': self.mensajes_aceptados,
+                'mensajes_rechazados': self.mensajes_rechazados
+            }
+
+    def _registrar_conexion(self):
+        with self._lock:
+            self.conexiones_abiertas += 1
+
+    def _procesar_mensaje(self):
+        """Aplicar latencia y fallos simulados; devuelve True si el mensaje se acepta"""
+        if self.latencia_ms:
+            time.sleep(self.latencia_ms / 1000)
+
+        with self._lock:
+            if self.tasa_fallos and self._random.random() < self.tasa_fallos:
+                self.mensajes_rechazados += 1
+                return False
+
+            self.mensajes_aceptados += 1
+            self.tiempos_recepcion.append(time.perf_counter())
+            return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor SMTP local para pruebas")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--puerto", type=int, default=1025)
+    parser.add_argument("--latencia-ms", type=float, default=0)
+    parser.add_argument("--tasa-fallos", type=float, default=0.0)
+    args = parser.parse_args()
+
+    servidor = ServidorSMTPLocal(args.host, args.puerto, args.latencia_ms, args.tasa_fallos)
+    servidor.iniciar()
+    print(f"Servidor SMTP local escuchando en {args.host}:{servidor.puerto}", flush=True)
+
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servidor.detener()
+        print(f"Estadísticas: {servidor.estadisticas()}")
+
+
+if __name__ == "__main__":
+    main()
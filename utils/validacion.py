@@ -0,0 +1,181 @@
+import numpy as np
+import pandas as pd
+from datetime import datetime
+from utils.busqueda import normalizar_texto, normalizar_serie
+
+# Opciones de los campos de selección del formulario (la opción vacía significa "sin valor")
+OPCIONES_PERIODICIDAD = ["", "Diario", "Semanal", "Quincenal", "Mensual", "Bimestral", "Trimestral", "Semestral", "Anual", "Ad-hoc"]
+OPCIONES_DEPARTAMENTO = ["", "Finanzas", "Recursos Humanos", "Operaciones", "IT", "Ventas", "Marketing", "Legal", "Auditoría Interna", "Otro"]
+OPCIONES_CRITICIDAD = ["", "Alto", "Medio", "Bajo"]
+OPCIONES_AUTOMATIZADO = ["", "Sí", "No", "Parcialmente"]
+OPCIONES_FORMATO_ENTREGA = ["Excel", "PDF", "CSV", "Dashboard", "Email", "Portal Web", "Otro"]
+
+# Columnas de una encuesta, en el orden del CSV
+COLUMNAS_ENCUESTA = [
+    "fecha_envio", "nombre_reporte", "periodicidad_reporte",
+    "sistema_origen", "persona_responsable", "email_responsable",
+    "auditoria_utilizacion", "periodicidad_auditoria",
+    "departamento", "criticidad", "formato_entrega",
+    "descripcion_reporte", "stakeholders", "automatizado", "observaciones"
+]
+
+FORMATO_FECHA = "%Y-%m-%d %H:%M:%S"
+FORMATOS_FECHA_DIA_PRIMERO = ["%d/%m/%Y %H:%M:%S", "%d/%m/%Y %H:%M", "%d/%m/%Y", "%d-%m-%Y"]
+
+# Campos obligatorios del formulario y su etiqueta
+CAMPOS_OBLIGATORIOS = {
+    'nombre_reporte': "Nombre del Reporte",
+    'periodicidad_reporte': "Periodicidad del Reporte",
+    'sistema_origen': "Sistema de Origen",
+    'persona_responsable': "Persona Responsable",
+    'email_responsable': "Email del Responsable",
+    'auditoria_utilizacion': "Auditoría donde se Utiliza",
+    'departamento': "Departamento",
+    'criticidad': "Nivel de Criticidad"
+}
+
+# Etiquetas del formulario del resto de columnas (se aceptan como encabezados al importar)
+ETIQUETAS_COLUMNAS = {
+    **CAMPOS_OBLIGATORIOS,
+    'fecha_envio': "Fecha de Envío",
+    'periodicidad_auditoria': "Periodicidad de la Auditoría",
+    'formato_entrega': "Formato de Entrega",
+    'descripcion_reporte': "Descripción del Reporte",
+    'stakeholders': "Stakeholders/Usuarios",
+    'automatizado': "¿Está Automatizado?",
+    'observaciones': "Observaciones"
+}
+
+# Campos que solo admiten las opciones del formulario
+OPCIONES_CAMPOS = {
+    'periodicidad_reporte': OPCIONES_PERIODICIDAD,
+    'periodicidad_auditoria': OPCIONES_PERIODICIDAD,
+    'departamento': OPCIONES_DEPARTAMENTO,
+    'criticidad': OPCIONES_CRITICIDAD,
+    'automatizado': OPCIONES_AUTOMATIZADO
+}
+
+# Opción canónica a partir del texto sin acentos ni mayúsculas ("finanzas" -> "Finanzas")
+_OPCIONES_NORMALIZADAS = {
+    campo: {normalizar_texto(opcion): opcion for opcion in opciones}
+    for campo, opciones in OPCIONES_CAMPOS.items()
+}
+
+def email_valido(email):
+    """Misma regla que el formulario: el email debe contener '@' y '.'"""
+    return "@" in email and "." in email
+
+def validar_encuesta(datos):
+    """Errores de validación de una encuesta (diccionario campo -> valor); lista vacía si es válida"""
+    errores = []
+    valores = {campo: str(datos.get(campo) or "").strip() for campo in CAMPOS_OBLIGATORIOS}
+
+    faltantes = [nombre for campo, nombre in CAMPOS_OBLIGATORIOS.items() if valores[campo] == ""]
+    if faltantes:
+        errores.append(f"Complete los campos obligatorios: {', '.join(faltantes)}")
+
+    if valores['email_responsable'] and not email_valido(valores['email_responsable']):
+        errores.append("Email no válido")
+
+    for campo, opciones in OPCIONES_CAMPOS.items():
+        valor = str(datos.get(campo) or "").strip()
+        if valor not in opciones:
+            errores.append(f"{ETIQUETAS_COLUMNAS[campo]} no válido: {valor}")
+
+    fecha = str(datos.get('fecha_envio') or "").strip()
+    if fecha and convertir_fecha(fecha) is None:
+        errores.append(f"Fecha de envío no válida: {fecha}")
+
+    return errores
+
+def convertir_fecha(texto):
+    """Fecha ISO o con el día primero (dd/mm/aaaa [hh:mm[:ss]]); None si no se reconoce"""
+    try:
+        return datetime.fromisoformat(texto)
+    except ValueError:
+        pass
+    for formato in FORMATOS_FECHA_DIA_PRIMERO:
+        try:
+            return datetime.strptime(texto, formato)
+        except ValueError:
+            pass
+    return None
+
+def formatear_fecha(texto):
+    """Fecha en FORMATO_FECHA si se reconoce; si no (o si está vacía), el texto tal cual"""
+    fecha = convertir_fecha(texto) if texto else None
+    return fecha.strftime(FORMATO_FECHA) if fecha is not None else texto
+
+def normalizar_encuesta(datos):
+    """Una encuesta (diccionario) con las mismas normalizaciones que normalizar_lote"""
+    encuesta = {}
+    for columna in COLUMNAS_ENCUESTA:
+        valor = datos.get(columna)
+        if isinstance(valor, list):
+            # Formatos de entrega enviados como lista, igual que en el multiselect del formulario
+            valor = ", ".join(str(v) for v in valor)
+        encuesta[columna] = "" if valor is None else str(valor).strip()
+
+    for campo, opciones in _OPCIONES_NORMALIZADAS.items():
+        encuesta[campo] = opciones.get(normalizar_texto(encuesta[campo]), encuesta[campo])
+
+    encuesta['fecha_envio'] = formatear_fecha(encuesta['fecha_envio'])
+    return encuesta
+
+def normalizar_lote(df):
+    """Encuestas de un archivo con las columnas de COLUMNAS_ENCUESTA como texto sin espacios extremos
+
+    Acepta como encabezado el nombre de la columna o la etiqueta del formulario y
+    lleva las opciones a su forma canónica. Devuelve el DataFrame y las columnas
+    obligatorias que no están en el archivo.
+    """
+    por_encabezado = {normalizar_texto(columna): columna for columna in COLUMNAS_ENCUESTA}
+    por_encabezado.update({normalizar_texto(etiqueta.rstrip(' *')): columna for columna, etiqueta in ETIQUETAS_COLUMNAS.items()})
+
+    renombres = {}
+    for encabezado in df.columns:
+        columna = por_encabezado.get(normalizar_texto(str(encabezado)).strip().rstrip(' *'))
+        if columna and columna not in renombres.values():
+            renombres[encabezado] = columna
+
+    origen = df[list(renombres)].rename(columns=renombres)
+    faltantes = [columna for columna in CAMPOS_OBLIGATORIOS if columna not in origen.columns]
+
+    lote = pd.DataFrame(index=df.index)
+    for columna in COLUMNAS_ENCUESTA:
+        if columna in origen.columns:
+            lote[columna] = origen[columna].fillna("").astype(str).str.strip()
+        else:
+            lote[columna] = ""
+
+    for campo, opciones in _OPCIONES_NORMALIZADAS.items():
+        canonicas = normalizar_serie(lote[campo]).map(opciones)
+        lote[campo] = canonicas.fillna(lote[campo])
+
+    # Fechas en el formato del formulario; las que no se reconocen quedan como vienen
+    # (cada valor distinto se convierte una sola vez)
+    lote['fecha_envio'] = lote['fecha_envio'].map({texto: formatear_fecha(texto) for texto in lote['fecha_envio'].unique()})
+
+    return lote, faltantes
+
+def validar_lote(lote):
+    """Errores por fila de un lote normalizado (texto vacío si la fila es válida), sin recorrer fila a fila"""
+    errores = pd.Series("", index=lote.index, dtype=object)
+
+    def agregar(mascara, mensaje):
+        nonlocal errores
+        errores = errores + np.where(mascara, mensaje + "; ", "")
+
+    for campo, nombre in CAMPOS_OBLIGATORIOS.items():
+        agregar(lote[campo] == "", f"falta {nombre}")
+
+    email = lote['email_responsable']
+    agregar((email != "") & ~(email.str.contains("@", regex=False) & email.str.contains(".", regex=False)), "email no válido")
+
+    for campo, opciones in OPCIONES_CAMPOS.items():
+        agregar(~lote[campo].isin(opciones), f"{ETIQUETAS_COLUMNAS[campo]} no válido")
+
+    fechas = pd.to_datetime(lote['fecha_envio'].where(lote['fecha_envio'] != ""), errors='coerce', format=FORMATO_FECHA)
+    agregar((lote['fecha_envio'] != "") & fechas.isna(), "fecha de envío no válida")
+
+    return errores.str.rstrip("; ")